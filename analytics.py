@@ -0,0 +1,173 @@
+import calendar
+from datetime import datetime, timedelta
+import numpy as np
+from config import Config
+from records import BurnForecast, YearComparison, as_number
+
+# --- BURN RATE & EXHAUSTION FORECAST ---
+# "At this rate, when do we run out?" for every department in one pass over the
+# cached ledger columns: each quantity is a bincount keyed on the department.
+
+_DAYS_PER_MONTH = 365 / 12
+
+
+def month_labels(today, months):
+    """Labels of the `months` calendar months ending with today's, e.g. ['May 26', 'Jun 26']."""
+    first = today.year * 12 + today.month - months
+    return [f"{calendar.month_abbr[m % 12 + 1]} {str(m // 12)[2:]}" for m in range(first, first + months)]
+
+
+def _code_map(departments, names):
+    """Array mapping column department codes -> index in `names` (-1 if absent)."""
+    index = {name: i for i, name in enumerate(names)}
+    return np.array([index.get(d, -1) for d in departments], dtype=np.int64)
+
+
+def monthly_spend(cols, names, today, months):
+    """(len(names) x months) expenditure per calendar month, oldest first, ending with today's month."""
+    valid = cols.has_date() & cols.has_amount()
+    rows = _code_map(cols.departments, names)[cols.dept[valid]]
+    month = cols.dates[valid].astype("datetime64[M]").astype(np.int64)
+    offset = month - (np.datetime64(today, "M").astype(np.int64) - months + 1)
+    keep = (rows >= 0) & (offset >= 0) & (offset < months)
+    flat = rows[keep] * months + offset[keep]
+    totals = np.bincount(flat, weights=cols.amounts[valid][keep], minlength=len(names) * months)
+    return totals.reshape(len(names), months)
+
+
+def trailing_spend(cols, names, today, days):
+    """Expenditure per department over the `days` days up to and including today."""
+    valid = cols.has_date() & cols.has_amount()
+    rows = _code_map(cols.departments, names)[cols.dept[valid]]
+    day = cols.dates[valid].astype("datetime64[D]")
+    end = np.datetime64(today, "D")
+    keep = (rows >= 0) & (day > end - days) & (day <= end)
+    return np.bincount(rows[keep], weights=cols.amounts[valid][keep], minlength=len(names))
+
+
+def allocation_cadence(allocs, names):
+    """
+    (mean days between dated allocations, last allocation day as datetime64[D])
+    per department; NaN / NaT where there are fewer than two / no allocations.
+    """
+    valid = allocs.has_date()
+    rows = _code_map(allocs.departments, names)[allocs.dept[valid]]
+    days = allocs.dates[valid].astype("datetime64[D]").astype(np.int64)
+    keep = rows >= 0
+    rows, days = rows[keep], days[keep]
+    order = np.lexsort((days, rows))
+    rows, days = rows[order], days[order]
+
+    same = rows[1:] == rows[:-1]
+    gap_rows = rows[1:][same]
+    gap_total = np.bincount(gap_rows, weights=np.diff(days)[same], minlength=len(names))
+    gap_count = np.bincount(gap_rows, minlength=len(names))
+    cadence = np.full(len(names), np.nan)
+    np.divide(gap_total, gap_count, out=cadence, where=gap_count > 0)
+
+    last = np.full(len(names), np.datetime64("NaT"), dtype="datetime64[D]")
+    if len(rows):
+        # Sorted by (department, day): the last entry of each run is its latest allocation
+        ends = np.append(~same, True)
+        last[rows[ends]] = days[ends].astype("datetime64[D]")
+    return cadence, last
+
+
+def _date_or_none(day):
+    return None if np.isnat(day) else datetime.combine(day.item(), datetime.min.time())
+
+
+def forecast(cols, allocs, balances, today=None, window_days=None, months=None):
+    """
+    One BurnForecast per department of `balances` ({name: remaining balance}).
+    Burn rate is the last `window_days` of spending scaled to a month; the
+    balance runs out after balance / daily rate days.
+    """
+    today = today or datetime.now()
+    window_days = window_days or Config.BURN_WINDOW_DAYS
+    months = months or Config.BURN_HISTORY_MONTHS
+    names = list(balances)
+    balance = np.array([balances[n] for n in names], dtype=np.float64)
+
+    monthly = monthly_spend(cols, names, today, months)
+    daily = trailing_spend(cols, names, today, window_days) / window_days
+    cadence, last_alloc = allocation_cadence(allocs, names)
+
+    days_left = np.full(len(names), np.nan)
+    np.divide(balance, daily, out=days_left, where=daily > 0)
+    days_left[balance <= 0] = 0
+
+    start = datetime.combine(today.date(), datetime.min.time())
+    result = []
+    for r, name in enumerate(names):
+        left = None if np.isnan(days_left[r]) else int(days_left[r])
+        try: runs_out = None if left is None else start + timedelta(days=left)
+        except OverflowError: runs_out = None  # Centuries away at this rate
+        result.append(BurnForecast((
+            name, *[as_number(v) for v in monthly[r]],
+            as_number(round(daily[r] * _DAYS_PER_MONTH)), as_number(balance[r]), left, runs_out,
+            None if np.isnan(cadence[r]) else int(round(cadence[r])), _date_or_none(last_alloc[r]))))
+    return result
+
+
+
+# --- YEAR-OVER-YEAR COMPARISON ---
+# Built from the per-sheet FY aggregates of LedgerCache.fy_totals: the entries
+# themselves are not looked at here, so a year of history costs one small
+# (departments x quarters) matrix per sheet.
+
+def compare_years(sheet_totals, limits_rows, allocs, years, cal):
+    """
+    YearComparison rows per Limits department, oldest of `years` (consecutive
+    FY start years) first. Balances run on from year to year; each year's Net
+    Opening = (Col 2 - allocations from that FY on) - expenditure before it,
+    as in the detailed report. Changes are against the FY before each row's.
+    """
+    years = list(years)
+    first, last = years[0] - 1, years[-1]   # One year earlier for the first changes
+    span, num_q = last - first + 1, cal.num_periods()
+    names, grand = [], {}
+    for sub_name, col2_val, _ in limits_rows:
+        if sub_name in grand: continue
+        names.append(sub_name)
+        grand[sub_name] = int(col2_val) if isinstance(col2_val, (int, float)) else 0
+    index = {name: r for r, name in enumerate(names)}
+
+    # Expenditure per (department, year, quarter); older years only count towards the opening
+    exp = np.zeros((len(names), span, num_q))
+    spent_before = np.zeros(len(names))
+    for totals in sheet_totals:
+        for year, by_dept in totals.items():
+            for name, quarters in by_dept.items():
+                r = index.get(name)
+                if r is None: continue
+                if year < first: spent_before[r] += quarters.sum()
+                elif year <= last: exp[r, year - first] += quarters
+
+    # Dated allocations by (department, year, quarter); later ones only reduce the opening
+    valid = allocs.has_date() & allocs.has_amount()
+    rows = _code_map(allocs.departments, names)[allocs.dept[valid]]
+    alloc_years, alloc_q = cal.bucket(allocs.dates[valid])
+    amounts = allocs.amounts[valid]
+    alloc = np.zeros_like(exp)
+    keep = (rows >= 0) & (alloc_years >= first) & (alloc_years <= last)
+    np.add.at(alloc, (rows[keep], alloc_years[keep] - first, alloc_q[keep]), amounts[keep])
+    later = (rows >= 0) & (alloc_years > last)
+    alloc_later = np.bincount(rows[later], weights=amounts[later], minlength=len(names))
+
+    grand_totals = np.array([grand[n] for n in names], dtype=np.float64)
+    opening = grand_totals - alloc.sum(axis=(1, 2)) - alloc_later - spent_before
+    bal = opening[:, None] + np.cumsum((alloc - exp).reshape(len(names), -1), axis=1)
+    bal = bal.reshape(exp.shape)
+
+    result = []
+    for r, name in enumerate(names):
+        for y in range(1, span):
+            row = [name, cal.fy_label(first + y), as_number(bal[r, y - 1, -1])]
+            for q in range(num_q):
+                row += [as_number(alloc[r, y, q]), as_number(exp[r, y, q]), as_number(bal[r, y, q])]
+            row += [as_number(alloc[r, y].sum() - alloc[r, y - 1].sum()),
+                    as_number(exp[r, y].sum() - exp[r, y - 1].sum()),
+                    as_number(bal[r, y, -1] - bal[r, y - 1, -1])]
+            result.append(YearComparison(row))
+    return result
@@ -1,49 +1,88 @@
-import pandas as pd
+import numpy as np
 import os
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
 import openpyxl
-from openpyxl.styles import Font, Alignment, Border, Side
-from doc_gen import generate_payment_advice, generate_summary_pdf
+from doc_gen import (generate_payment_advice, generate_summary_pdf, generate_statement_pdf, generate_report_xlsx,
+                     generate_comparison_pdf, summary_pdf_name, statement_pdf_name, report_xlsx_name,
+                     comparison_pdf_name)
+from exporter import export_ledger
+import ledger
+import analytics
+import shards
+import xlsx_styles
+from ledger_cache import LedgerCache, read_sheet_parts
+from parse_cache import ParseCache
+import backup
+from ppa_index import PPAIndex
+from report_cache import ReportCache, report_key
+from records import DepartmentSummary, QuarterBreakdown, ResultSet, RowIndex, LedgerColumns, as_number
+from fiscal import get_calendar, PERIOD_QUARTER
 from config import Config
 
 class BookkeepingSystem:
-    def __init__(self):
+    def __init__(self, db_path=None, create=True):
+        # Any ledger file can be opened (e.g. other offices' copies for consolidation).
+        # create=False opens it strictly for reading: nothing is created or saved.
+        self.db_path = db_path or Config.DB_FILENAME
         # Default active sheet is based on TODAY
         self.active_sheet_name = self.get_sheet_name_for_date(datetime.now())
-        self.ensure_file_exists()
+        if create: self.ensure_file_exists()
+        # Parsed sheets kept in memory (and on disk for the next start); refreshed per changed sheet on each read
+        folder = os.path.dirname(os.path.abspath(self.db_path))
+        parse_cache = ParseCache(os.path.join(folder, Config.PARSE_CACHE_DIR), self.db_path) if create else None
+        self.cache = LedgerCache(self.db_path, parse_cache)
+        self._ppa_index = (None, None)     # (ledger version, PPAIndex), replaced only by a newer version
+        self._ppa_lock = threading.Lock()
+        # Generated reports; files only for ledgers we may write next to
+        cache_dir = os.path.join(folder, Config.REPORT_CACHE_DIR)
+        self.reports = ReportCache(cache_dir if create else None, Config.REPORT_CACHE_MAX_MB * 1024 * 1024)
+        # Versioned backups of the changed parts, taken around every save
+        self.backups = backup.store_for(self.db_path) if create else None
+
+    def snapshot(self):
+        """
+        The current ledger version (LedgerSnapshot), read-only and consistent
+        for as long as it is held, whatever is saved meanwhile.
+        """
+        self.cache.refresh()
+        return self.cache.snapshot()
+
+    def _backup(self, label):
+        if self.backups: self.backups.backup(label)
 
     def get_sheet_name_for_date(self, date_obj):
         """
         Determines the correct sheet name based on the specific transaction date.
         Format: Transactions_YYYY_YY (e.g., Transactions_2026_27)
         """
-        if date_obj.month >= 4: # April to Dec
-            start_year = date_obj.year
-            end_year = date_obj.year + 1
-        else: # Jan to March
-            start_year = date_obj.year - 1
-            end_year = date_obj.year
-            
-        short_end = str(end_year)[-2:]
-        return f"{Config.TXN_PREFIX}{start_year}_{short_end}"
+        return get_calendar().sheet_name_for_date(date_obj)
 
     def ensure_file_exists(self):
-        if not os.path.exists(Config.DB_FILENAME):
+        if not os.path.exists(self.db_path):
             wb = openpyxl.Workbook()
             ws_limits = wb.active
             ws_limits.title = Config.SHEET_LIMITS
             # Defines the column for Opening Balance / Previous Balance
             ws_limits.append(["Department", "Previous_balance"]) 
             
-            wb.create_sheet(self.active_sheet_name)
-            wb.save(Config.DB_FILENAME)
+            if not shards.is_sharded(self.db_path): wb.create_sheet(self.active_sheet_name)
+            wb.save(self.db_path)
+        elif shards.is_sharded(self.db_path):
+            # Split by year: the active year's file is created on first use
+            if not os.path.exists(shards.shard_path(self.db_path, self.active_sheet_name)):
+                try:
+                    wb, path = shards.open_sheet_book(self.db_path, self.active_sheet_name)
+                    wb.save(path)
+                except: pass
         else:
-            # Check if active sheet exists
+            # Check if active sheet exists (zip directory only; loaded just to add it)
             try:
-                wb = openpyxl.load_workbook(Config.DB_FILENAME)
+                if self.active_sheet_name in read_sheet_parts(self.db_path): return
+                wb = openpyxl.load_workbook(self.db_path)
                 if self.active_sheet_name not in wb.sheetnames:
                     wb.create_sheet(self.active_sheet_name)
-                    wb.save(Config.DB_FILENAME)
+                    wb.save(self.db_path)
             except: pass
 
     def _ensure_fy_sheet_exists(self, wb, sheet_name):
@@ -52,19 +91,11 @@ class BookkeepingSystem:
         return wb[sheet_name]
 
     def get_subsidiaries(self):
-        try:
-            wb = openpyxl.load_workbook(Config.DB_FILENAME, data_only=True)
-            ws = wb[Config.SHEET_LIMITS]
-            subs = []
-            for row in range(2, ws.max_row + 1):
-                val = ws.cell(row=row, column=1).value
-                if val: subs.append(val)
-            return subs
-        except: return []
+        return [sub_name for sub_name, _, _ in self.snapshot().limits.rows]
 
     def get_limit_info(self, subsidiary):
         try:
-            wb = openpyxl.load_workbook(Config.DB_FILENAME, data_only=True)
+            wb = openpyxl.load_workbook(self.db_path, data_only=True)
             ws = wb[Config.SHEET_LIMITS]
             for row in range(2, ws.max_row + 1):
                 if ws.cell(row=row, column=1).value == subsidiary:
@@ -73,12 +104,33 @@ class BookkeepingSystem:
             return 0
         except: return 0
 
-    def _get_or_create_subsidiary_columns(self, wb, ws, subsidiary):
-        bold_font = Font(bold=True)
-        center_align = Alignment(horizontal="center", vertical="center")
-        thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), 
-                             top=Side(style='thin'), bottom=Side(style='thin'))
+    def get_ppa_index(self, snap=None):
+        """PPA lookup index over all FY sheets, rebuilt only when the ledger changes."""
+        snap = snap or self.snapshot()
+        version, index = self._ppa_index
+        if version == snap.version: return index
+        index = PPAIndex((ref, name) for name, cols in snap.sheet_columns().items() for ref in cols.refs)
+        with self._ppa_lock:
+            # The idle thread may be indexing an older snapshot than the entry form
+            if self._ppa_index[0] is None or snap.version > self._ppa_index[0]: self._ppa_index = (snap.version, index)
+        return index
+
+    def precheck_limit(self, subsidiary, pending_total=0, date_obj=None):
+        """
+        Same test as save_batch's limit check, answered from the in-memory
+        counters instead of loading the workbook (cheap enough to run per keystroke).
+        save_batch still re-verifies against the file when the batch is saved.
+        Returns {"limit", "spent", "pending", "available", "ok"}.
+        """
+        snap = self.snapshot()
+        sheet_name = self.get_sheet_name_for_date(date_obj or datetime.now())
+        limit = snap.approved_limit(subsidiary)
+        spent = snap.spent(sheet_name, subsidiary)
+        available = limit - spent - pending_total
+        return {"limit": limit, "spent": spent, "pending": pending_total,
+                "available": available, "ok": available >= 0}
 
+    def _get_or_create_subsidiary_columns(self, wb, ws, subsidiary):
         for col in range(1, ws.max_column + 2, 3):
             cell_value = ws.cell(row=1, column=col).value
             if cell_value == subsidiary:
@@ -86,18 +138,13 @@ class BookkeepingSystem:
             if cell_value is None:
                 start_col = col
                 ws.merge_cells(start_row=1, start_column=start_col, end_row=1, end_column=start_col+2)
-                title_cell = ws.cell(row=1, column=start_col, value=subsidiary)
-                title_cell.font = bold_font
-                title_cell.alignment = center_align
+                ws.cell(row=1, column=start_col, value=subsidiary)
                 for c in range(start_col, start_col+3):
-                    ws.cell(row=1, column=c).border = thin_border
+                    ws.cell(row=1, column=c).style = xlsx_styles.HEADER
 
                 headers = ["PPA_Number", "Date", "Amount"]
                 for i, header in enumerate(headers):
-                    cell = ws.cell(row=2, column=start_col + i, value=header)
-                    cell.font = bold_font
-                    cell.alignment = center_align
-                    cell.border = thin_border
+                    ws.cell(row=2, column=start_col + i, value=header).style = xlsx_styles.HEADER
                 return start_col
         return 1
 
@@ -116,11 +163,16 @@ class BookkeepingSystem:
 
     def save_batch(self, subsidiary, batch_list):
         try:
-            wb = openpyxl.load_workbook(Config.DB_FILENAME)
             first_date = batch_list[0][1]
             target_sheet_name = self.get_sheet_name_for_date(first_date)
+            # Whole ledger, or only that year's workbook when split by year
+            wb, wb_path = shards.open_sheet_book(self.db_path, target_sheet_name)
             ws = self._ensure_fy_sheet_exists(wb, target_sheet_name)
+            xlsx_styles.use_styles(wb)
+            commit = self.cache.begin_commit(wb_path, [target_sheet_name])
         except Exception as e: return False, f"Error: {e}"
+        # Only does work if the file was edited (e.g. in Excel) since the last version
+        self._backup("Changed outside the app")
 
         limit = self.get_limit_info(subsidiary)
         start_col = self._get_or_create_subsidiary_columns(wb, ws, subsidiary)
@@ -152,30 +204,32 @@ class BookkeepingSystem:
                    f"Batch: {self._fmt_money(batch_total)}\nAvailable: {self._fmt_money(remaining)}")
             return False, msg
 
-        thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
         current_row = 3
         while ws.cell(row=current_row, column=col_ppa).value is not None:
             current_row += 1
             
         for (ppa, date_obj, amt) in batch_list:
-            ws.cell(row=current_row, column=col_ppa, value=ppa).border = thin_border
-            d_cell = ws.cell(row=current_row, column=col_ppa+1, value=date_obj)
-            d_cell.number_format = 'DD-MM-YYYY'
-            d_cell.border = thin_border
-            a_cell = ws.cell(row=current_row, column=col_ppa+2, value=amt)
-            a_cell.number_format = '"₹" #,##0'
-            a_cell.border = thin_border
+            # Shared named styles: three style records for the whole ledger, not one set per cell
+            ws.cell(row=current_row, column=col_ppa, value=ppa).style = xlsx_styles.TEXT
+            ws.cell(row=current_row, column=col_ppa+1, value=date_obj).style = xlsx_styles.DATE
+            ws.cell(row=current_row, column=col_ppa+2, value=amt).style = xlsx_styles.AMOUNT
             current_row += 1
 
-        try: wb.save(Config.DB_FILENAME)
+        try: wb.save(wb_path)
         except PermissionError: return False, "Error: File open."
+        # Next version: only this FY sheet (and Limits) is new, other sheets carry over
+        self.cache.commit(wb_path, commit, {target_sheet_name})
+        self._backup(f"{subsidiary}: {len(batch_list)} PPA(s) saved to {target_sheet_name}")
         return True, f"Saved to {target_sheet_name}."
 
     def save_allocation_batch(self, subsidiary, batch_list):
         try:
-            wb = openpyxl.load_workbook(Config.DB_FILENAME)
+            wb = openpyxl.load_workbook(self.db_path)
             ws = wb[Config.SHEET_LIMITS]
+            xlsx_styles.use_styles(wb)
+            commit = self.cache.begin_commit(self.db_path, [])
         except Exception as e: return False, str(e)
+        self._backup("Changed outside the app")
 
         target_row = None
         for r in range(2, ws.max_row + 1):
@@ -190,6 +244,8 @@ class BookkeepingSystem:
 
         curr_limit_cell = ws.cell(row=target_row, column=2)
         current_limit = curr_limit_cell.value if curr_limit_cell.value else 0
+        if not isinstance(current_limit, (int, float)):
+            return False, f"Error: Limit of {subsidiary} in {Config.SHEET_LIMITS} is not a number ({current_limit})."
         
         current_col = 3
         while ws.cell(row=target_row, column=current_col).value is not None:
@@ -210,263 +266,305 @@ class BookkeepingSystem:
             header_date = f"Date_{alloc_num}"
             
             if ws.cell(row=1, column=current_col).value is None:
-                ws.cell(row=1, column=current_col, value=header_title).font = Font(bold=True)
-                ws.cell(row=1, column=current_col+1, value=header_date).font = Font(bold=True)
+                ws.cell(row=1, column=current_col, value=header_title).style = xlsx_styles.BOLD_HEADING
+                ws.cell(row=1, column=current_col+1, value=header_date).style = xlsx_styles.BOLD_HEADING
 
             ws.cell(row=target_row, column=current_col, value=amt)
-            d_cell = ws.cell(row=target_row, column=current_col+1, value=date_obj)
-            d_cell.number_format = 'DD-MM-YYYY'
+            ws.cell(row=target_row, column=current_col+1, value=date_obj).style = xlsx_styles.PLAIN_DATE
             current_col += 2
 
         # Update Column 2 to reflect total accumulated limit
         curr_limit_cell.value = current_limit + total_added
 
-        try: wb.save(Config.DB_FILENAME)
+        try: wb.save(self.db_path)
         except PermissionError: return False, "File open."
+        self.cache.commit(self.db_path, commit, set())
+        self._backup(f"{subsidiary}: allocation of {self._fmt_money(total_added)}")
         return True, f"Allocated {self._fmt_money(total_added)}."
 
-    def get_summary_report(self):
-        try:
-            df_limits = pd.read_excel(Config.DB_FILENAME, sheet_name=Config.SHEET_LIMITS)
-            active_sheet = self.get_sheet_name_for_date(datetime.now())
-            wb = openpyxl.load_workbook(Config.DB_FILENAME, data_only=True) 
-            if active_sheet in wb.sheetnames:
-                ws = wb[active_sheet]
-            else:
-                return []
-        except: return []
+    # --- REPORT CACHE KEYS ---
+    # Each report lists the sheets it reads, so a save only invalidates those reports.
+    # Key and build use the same snapshot, so a dataset is always stored under its own version.
+    # Files that print a "Generated on" date (the PDFs) also key on today's date.
+    def _summary_key(self, period, snap):
+        active_sheet = self.get_sheet_name_for_date(datetime.now())
+        deps = snap.signature([Config.SHEET_LIMITS, active_sheet])
+        return report_key("summary", (active_sheet, period, Config.FY_START_MONTH), deps)
+
+    def _detailed_key(self, snap):
+        fy_start = get_calendar().fy_start(datetime.now())
+        return report_key("detailed", (fy_start, Config.FY_START_MONTH), snap.signature())
+
+    def _forecast_sheets(self):
+        # FY sheets covering the burn window and the monthly history (at most two years)
+        now = datetime.now()
+        days = max(Config.BURN_WINDOW_DAYS, Config.BURN_HISTORY_MONTHS * 31)
+        return sorted({self.get_sheet_name_for_date(now - timedelta(days=days)), self.get_sheet_name_for_date(now)})
+
+    def _forecast_key(self, snap):
+        params = (datetime.now().date(), Config.BURN_WINDOW_DAYS, Config.BURN_HISTORY_MONTHS, Config.FY_START_MONTH)
+        deps = snap.signature([Config.SHEET_LIMITS] + self._forecast_sheets())
+        return report_key("forecast", params, deps)
 
-        sub_col_map = {}
-        for col in range(1, ws.max_column + 2):
-            val = ws.cell(row=1, column=col).value
-            if val: sub_col_map[val] = col
+    def _drilldown_key(self, period, snap):
+        return report_key("drilldown", (self._summary_key(period, snap),), ())
+
+    def _comparison_key(self, num_years, snap):
+        fy_start = get_calendar().fy_start(datetime.now())
+        return report_key("comparison", (fy_start, num_years, Config.FY_START_MONTH), snap.signature())
+
+    def get_summary_report(self, period=PERIOD_QUARTER, snap=None):
+        """
+        One DepartmentSummary row per department for the active FY sheet:
+        (Name, Limit, *period totals, Total Spent, Balance)
+        `period` selects quarterly (4), half-yearly (2) or monthly (12) columns.
+        All report getters read `snap` when given, else the latest version.
+        """
+        snap = snap or self.snapshot()
+        return self.reports.dataset(self._summary_key(period, snap), lambda: self._build_summary_report(period, snap))
+
+    def _build_summary_report(self, period, snap):
+        active_sheet = self.get_sheet_name_for_date(datetime.now())
+        if active_sheet not in snap.sheet_names: return []
+
+        # All rows bucketed in one vectorized pass over the cached columns
+        cal = get_calendar()
+        cols = snap.columns([active_sheet], with_allocations=True)
+        dated = cols.has_date() & cols.has_amount()
+        valid = dated & cols.is_type(ledger.TYPE_PPA)
+        period_totals = cal.totals(cols.dept[valid], cols.dates[valid], cols.amounts[valid],
+                                   len(cols.departments), period)
+        num_periods = period_totals.shape[1]
+
+        # Drill-down index: the PPAs counted above plus this FY's allocations, by (department, period)
+        alloc_rows = np.flatnonzero(dated & cols.is_type(ledger.TYPE_ALLOC))
+        alloc_years, _ = cal.bucket(cols.dates[alloc_rows])
+        rows = np.sort(np.concatenate((np.flatnonzero(valid),
+                                       alloc_rows[alloc_years == cal.fy_start_year(datetime.now())])))
+        _, buckets = cal.bucket(cols.dates[rows], period)
+        self.reports.put_data(self._drilldown_key(period, snap), RowIndex(cols, rows, buckets, num_periods))
 
         summary_data = []
-        for index, row in df_limits.iterrows():
-            sub_name = row["Department"] if "Department" in row else row["Subsidiary"]
+        for sub_name, limit_val, _ in snap.limits.rows:
+            # Col 2 (Previous_balance) holds the opening balance plus all allocations
+            limit = int(limit_val) if isinstance(limit_val, (int, float)) else 0
             
-            if "Previous_balance" in row:
-                limit_val = row["Previous_balance"]
-            elif "Approved_Limit" in row:
-                limit_val = row["Approved_Limit"]
-            else:
-                limit_val = 0
-            
-            limit = int(limit_val) if pd.notna(limit_val) else 0
-            
-            q1, q2, q3, q4, total_spent = 0, 0, 0, 0, 0
-            if sub_name in sub_col_map:
-                start_col = sub_col_map[sub_name]
-                col_date = start_col + 1
-                col_amt = start_col + 2
-                for r in range(3, ws.max_row + 1):
-                    amt = ws.cell(row=r, column=col_amt).value
-                    dt = ws.cell(row=r, column=col_date).value
-                    if isinstance(amt, (int, float)) and isinstance(dt, datetime):
-                        total_spent += amt
-                        m = dt.month
-                        if 4 <= m <= 6: q1 += amt
-                        elif 7 <= m <= 9: q2 += amt
-                        elif 10 <= m <= 12: q3 += amt
-                        elif 1 <= m <= 3: q4 += amt
+            code = cols.dept_code(sub_name)
+            buckets = period_totals[code] if code >= 0 else np.zeros(num_periods)
+            total_spent = buckets.sum()
             remaining = limit - total_spent
-            summary_data.append((sub_name, limit, q1, q2, q3, q4, total_spent, remaining))
+            summary_data.append(DepartmentSummary((sub_name, limit, *[as_number(v) for v in buckets],
+                                                   as_number(total_spent), as_number(remaining))))
         return summary_data
 
+    def get_period_entries(self, subsidiary, bucket=None, period=PERIOD_QUARTER):
+        """
+        ResultSet (oldest first) of the PPAs and allocations behind one dashboard
+        cell: `bucket` is the period column (None: the whole year). Served from
+        the row index built with the summary; no sheet is read again.
+        """
+        snap = self.snapshot()
+        key = self._drilldown_key(period, snap)
+        index = self.reports.get_data(key)
+        if index is None:
+            self._build_summary_report(period, snap)
+            index = self.reports.get_data(key)
+        if index is None: return ResultSet(LedgerColumns.empty())
+        return index.rows(subsidiary, bucket).sort_by_date()
+
     # --- UPDATED: DETAILED QUARTERLY PDF DATA ---
-    def get_detailed_report_data(self):
+    def get_detailed_report_data(self, snap=None):
         """
         Calculates Net Opening Balance by stripping current FY allocations from the Total Limit.
         Net Opening = (Col 2 Limit - Current FY Allocations) - Historical Expenditures
         """
-        try:
-            wb = openpyxl.load_workbook(Config.DB_FILENAME, data_only=True)
-            ws_limits = wb[Config.SHEET_LIMITS]
-        except: return []
-        
+        snap = snap or self.snapshot()
+        return self.reports.dataset(self._detailed_key(snap), lambda: self._build_detailed_report(snap))
+
+    def _build_detailed_report(self, snap):
+
         # 1. Determine Financial Year Start
-        now = datetime.now()
-        start_year = now.year if now.month >= 4 else now.year - 1
-        fy_start = datetime(start_year, 4, 1)
-
-        # 2. Scan ALL Transaction Sheets for Expenditures
-        historical_spent_map = {} 
-        current_fy_exp_map = {}   
-
-        for sheet_name in wb.sheetnames:
-            if sheet_name.startswith(Config.TXN_PREFIX):
-                ws_txn = wb[sheet_name]
-                
-                dept_cols = {}
-                for col in range(1, ws_txn.max_column + 1):
-                    val = ws_txn.cell(row=1, column=col).value
-                    if val: dept_cols[col] = val
-                
-                for col, dept_name in dept_cols.items():
-                    if dept_name not in historical_spent_map: historical_spent_map[dept_name] = 0
-                    if dept_name not in current_fy_exp_map: current_fy_exp_map[dept_name] = {'q1':0, 'q2':0, 'q3':0, 'q4':0}
-                    
-                    col_date = col + 1
-                    col_amt = col + 2
-                    
-                    for r in range(3, ws_txn.max_row + 1):
-                        d_val = ws_txn.cell(row=r, column=col_date).value
-                        a_val = ws_txn.cell(row=r, column=col_amt).value
-                        
-                        if isinstance(d_val, datetime) and isinstance(a_val, (int, float)):
-                            if d_val < fy_start:
-                                historical_spent_map[dept_name] += a_val
-                            else:
-                                m = d_val.month
-                                if 4 <= m <= 6: current_fy_exp_map[dept_name]['q1'] += a_val
-                                elif 7 <= m <= 9: current_fy_exp_map[dept_name]['q2'] += a_val
-                                elif 10 <= m <= 12: current_fy_exp_map[dept_name]['q3'] += a_val
-                                elif 1 <= m <= 3: current_fy_exp_map[dept_name]['q4'] += a_val
-
-        # 3. Process Allocations & Calculate Final Balances
-        detailed_data = []
-        
-        for r in range(2, ws_limits.max_row + 1):
-            sub_name = ws_limits.cell(row=r, column=1).value
-            if not sub_name: continue
-            
-            # A. Grand Total Limit (From Column 2)
-            # This includes Opening + ALL Allocations made to date
-            col2_val = ws_limits.cell(row=r, column=2).value
-            grand_total_limit = int(col2_val) if isinstance(col2_val, (int, float)) else 0
-            
-            # B. Identify "Current Year" Allocations
-            current_fy_alloc_sum = 0
-            q_alloc = {'q1':0, 'q2':0, 'q3':0, 'q4':0}
-            
-            curr_col = 3
-            while curr_col <= ws_limits.max_column:
-                amt = ws_limits.cell(row=r, column=curr_col).value
-                dt = ws_limits.cell(row=r, column=curr_col+1).value
-                
-                if isinstance(amt, (int, float)):
-                    if isinstance(dt, datetime):
-                        if dt >= fy_start:
-                            # This is a Current FY Allocation
-                            current_fy_alloc_sum += amt
-                            m = dt.month
-                            if 4 <= m <= 6: q_alloc['q1'] += amt
-                            elif 7 <= m <= 9: q_alloc['q2'] += amt
-                            elif 10 <= m <= 12: q_alloc['q3'] += amt
-                            elif 1 <= m <= 3: q_alloc['q4'] += amt
-                    # Note: No date or old date implies historical, which is fine.
-                    # We only need to subtract Current FY to get Opening Limit.
-                curr_col += 2
-
-            # C. Calculate Net Opening Balance
-            # Opening Limit = Grand Total - Allocations this year
-            opening_limit = grand_total_limit - current_fy_alloc_sum
-            
-            # Net Opening Balance = Opening Limit - Historical Expenditures
-            past_spent = historical_spent_map.get(sub_name, 0)
-            net_opening_balance = opening_limit - past_spent
+        cal = get_calendar()
+        fy_start = cal.fy_start(datetime.now())
+
+        # 2. Expenditures of ALL Transaction Sheets (cached columns)
+        cols = snap.columns()
+        valid = cols.has_date() & cols.has_amount()
+        keys, dates, amounts = cols.dept[valid], cols.dates[valid], cols.amounts[valid]
+        num_depts = len(cols.departments)
+
+        # 3. Read Limits: Grand Total (Col 2) and Current FY Allocations
+        # Grand Total includes Opening + ALL Allocations made to date.
+        # Undated or older allocations are historical and already inside it.
+        sub_names, grand_totals = [], []
+        alloc_keys, alloc_dates, alloc_amounts = [], [], []
+        for sub_name, col2_val, allocs in snap.limits.rows:
+            grand_totals.append(int(col2_val) if isinstance(col2_val, (int, float)) else 0)
+            for _, amt, dt in allocs:
+                if isinstance(dt, datetime) and dt >= fy_start:
+                    alloc_keys.append(len(sub_names))
+                    alloc_dates.append(dt)
+                    alloc_amounts.append(amt)
+            sub_names.append(sub_name)
+
+        # 4. Split expenditures into historical vs current FY quarters
+        is_past = dates.astype("datetime64[D]") < np.datetime64(fy_start.date())
+        past_spent = np.bincount(keys[is_past], weights=amounts[is_past], minlength=num_depts)
+        q_exp_by_dept = cal.totals(keys[~is_past], dates[~is_past], amounts[~is_past], num_depts)
+        q_alloc = cal.totals(alloc_keys, alloc_dates, alloc_amounts, len(sub_names))
+
+        # Map transaction departments onto Limits rows
+        row_dept = np.array([cols.dept_code(name) for name in sub_names], dtype=np.int64)
+        has_txn = row_dept >= 0
+        q_exp = np.zeros_like(q_alloc)
+        q_exp[has_txn] = q_exp_by_dept[row_dept[has_txn]]
+        row_past_spent = np.zeros(len(sub_names))
+        row_past_spent[has_txn] = past_spent[row_dept[has_txn]]
+
+        # 5. Net Opening Balance = (Grand Total - Allocations this year) - Historical Expenditures
+        opening_limit = np.array(grand_totals, dtype=np.float64) - q_alloc.sum(axis=1)
+        net_opening_balance = opening_limit - row_past_spent
+
+        # 6. Current FY running balance at each quarter end
+        q_bal = net_opening_balance[:, None] + np.cumsum(q_alloc - q_exp, axis=1)
 
-            # D. Calculate Current FY Running Balances
-            my_exp = current_fy_exp_map.get(sub_name, {'q1':0, 'q2':0, 'q3':0, 'q4':0})
-            
-            # Q1
-            q1_add = q_alloc['q1']
-            q1_exp = my_exp['q1']
-            q1_bal = (net_opening_balance + q1_add) - q1_exp
-            
-            # Q2
-            q2_add = q_alloc['q2']
-            q2_exp = my_exp['q2']
-            q2_bal = (q1_bal + q2_add) - q2_exp
-            
-            # Q3
-            q3_add = q_alloc['q3']
-            q3_exp = my_exp['q3']
-            q3_bal = (q2_bal + q3_add) - q3_exp
-            
-            # Q4
-            q4_add = q_alloc['q4']
-            q4_exp = my_exp['q4']
-            q4_bal = (q3_bal + q4_add) - q4_exp
-            
-            row_tuple = (
-                sub_name, net_opening_balance,
-                q1_add, q1_exp, q1_bal,
-                q2_add, q2_exp, q2_bal,
-                q3_add, q3_exp, q3_bal,
-                q4_add, q4_exp, q4_bal
-            )
-            detailed_data.append(row_tuple)
-            
+        detailed_data = []
+        for r, sub_name in enumerate(sub_names):
+            row_tuple = [sub_name, as_number(net_opening_balance[r])]
+            for q in range(q_alloc.shape[1]):
+                row_tuple += [as_number(q_alloc[r, q]), as_number(q_exp[r, q]), as_number(q_bal[r, q])]
+            detailed_data.append(QuarterBreakdown(row_tuple))
         return detailed_data
 
+    # --- BURN RATE FORECAST ---
+    def get_burn_forecast(self, snap=None):
+        """
+        BurnForecast per department: recent monthly spend, burn rate, allocation
+        cadence and the date this FY's balance runs out at the current rate.
+        """
+        snap = snap or self.snapshot()
+        return self.reports.dataset(self._forecast_key(snap), lambda: self._build_burn_forecast(snap))
+
+    def _build_burn_forecast(self, snap):
+        balances = {}
+        for row in self.get_summary_report(snap=snap):
+            balances.setdefault(row.name, row.balance)
+        return analytics.forecast(snap.columns(self._forecast_sheets()), snap.allocation_columns(), balances)
+
+    # --- YEAR-OVER-YEAR COMPARISON ---
+    def get_year_comparison(self, num_years=None, snap=None):
+        """
+        YearComparison rows: each department's quarterly allocations, expenditure
+        and balances for the last `num_years` FYs (Config.COMPARE_YEARS), oldest
+        first, with the change against the previous FY.
+        """
+        num_years = num_years or Config.COMPARE_YEARS
+        snap = snap or self.snapshot()
+        return self.reports.dataset(self._comparison_key(num_years, snap),
+                                    lambda: self._build_year_comparison(num_years, snap))
+
+    def _build_year_comparison(self, num_years, snap):
+        cal = get_calendar()
+        current = cal.fy_start_year(datetime.now())
+        # Per-sheet aggregates are cached, only new or changed sheets are summed again
+        sheet_totals = [snap.fy_totals(name, cal) for name in snap.sheet_names]
+        return analytics.compare_years(sheet_totals, snap.limits.rows, snap.allocation_columns(),
+                                       range(current - num_years + 1, current + 1), cal)
+
+    def create_comparison_pdf(self, num_years=None, filename=None):
+        num_years = num_years or Config.COMPARE_YEARS
+        snap = self.snapshot()
+        data = self.get_year_comparison(num_years, snap)
+        if not data: return False, "No data available to export."
+        key = report_key("comparison_pdf", (self._comparison_key(num_years, snap), datetime.now().date()), ())
+        return self.reports.fetch_file(key, ".pdf", filename or comparison_pdf_name(),
+                                       lambda dest: generate_comparison_pdf(data, filename=dest))
+
     def create_word_advice(self, subsidiary, date_str, transaction_list):
         return generate_payment_advice(subsidiary, date_str, transaction_list)
 
-    def create_dashboard_pdf(self, summary_data):
-        return generate_summary_pdf(summary_data)
+    def create_dashboard_pdf(self, summary_data, filename=None, title=None):
+        return generate_summary_pdf(summary_data, filename=filename, title=title)
+
+    def create_detailed_pdf(self, filename=None):
+        """Detailed quarterly PDF; a copy of the cached file while its inputs are unchanged."""
+        job = self._detailed_pdf(self.snapshot())
+        if job is None: return False, "No data available to export."
+        key, generate = job
+        return self.reports.fetch_file(key, ".pdf", filename or summary_pdf_name(), generate)
+
+    def prerender_detailed_pdf(self, snap=None):
+        """Renders the detailed PDF into the report cache only (idle time). True if it is cached."""
+        job = self._detailed_pdf(snap or self.snapshot())
+        return job is not None and self.reports.prepare_file(job[0], ".pdf", job[1])
+
+    def _detailed_pdf(self, snap):
+        """(cache key, generate(dest)) of the detailed PDF, or None without data."""
+        data = self.get_detailed_report_data(snap)
+        if not data: return None
+        forecast = self.get_burn_forecast(snap)
+        labels = analytics.month_labels(datetime.now(), Config.BURN_HISTORY_MONTHS)
+        key = report_key("detailed_pdf", (self._detailed_key(snap), self._forecast_key(snap), datetime.now().date()), ())
+        return key, lambda dest: generate_summary_pdf(data, filename=dest, forecast=forecast, forecast_labels=labels)
+
+    def get_statement_rows(self, subsidiary, snap=None):
+        """
+        (opening balance, ResultSet) for a department statement: allocations and
+        PPAs of all FY sheets, oldest first (undated entries last).
+        Opening balance is the Col 2 limit less every allocation recorded in it.
+        """
+        snap = snap or self.snapshot()
+        cols = snap.columns(with_allocations=True)
+        mask = cols.dept == cols.dept_code(subsidiary)
+        allocs = snap.allocation_columns()
+        alloc_mask = (allocs.dept == allocs.dept_code(subsidiary)) & allocs.has_amount()
+        opening = snap.approved_limit(subsidiary) - allocs.amounts[alloc_mask].sum()
+        return as_number(opening), ResultSet(cols).filter(mask).sort_by_date()
+
+    def create_report_xlsx(self, period=PERIOD_QUARTER, filename=None):
+        """Dashboard (selected period), quarterly and year-over-year tables as one Excel file, cached like the PDFs."""
+        snap = self.snapshot()
+        summary = self.get_summary_report(period, snap)
+        detailed = self.get_detailed_report_data(snap)
+        if not summary and not detailed: return False, "No data available to export."
+        comparison = self.get_year_comparison(Config.COMPARE_YEARS, snap)
+        key = report_key("report_xlsx", (self._summary_key(period, snap), self._detailed_key(snap),
+                                         self._comparison_key(Config.COMPARE_YEARS, snap)), ())
+        labels = get_calendar().period_labels(period)
+        return self.reports.fetch_file(key, ".xlsx", filename or report_xlsx_name(),
+                                       lambda dest: generate_report_xlsx(summary, labels, detailed, filename=dest,
+                                                                         comparison_rows=comparison))
+
+    def create_statement_pdf(self, subsidiary, filename=None):
+        snap = self.snapshot()
+        key = report_key("statement", (subsidiary, datetime.now().date()), snap.signature())
+
+        def generate(dest):
+            opening, rows = self.get_statement_rows(subsidiary, snap)
+            return generate_statement_pdf(subsidiary, opening, rows, filename=dest)
+        return self.reports.fetch_file(key, ".pdf", filename or statement_pdf_name(subsidiary), generate)
+
+    def export_ledger(self, dest, subsidiary=None, ppa_text=None, quarter=None):
+        return export_ledger(dest, path=self.db_path, subsidiary=subsidiary, ppa_text=ppa_text, quarter=quarter)
+
+    def get_ledger_frame(self, snap=None):
+        """
+        The whole ledger, allocations and the PPAs of every FY, as a pandas
+        DataFrame for ad-hoc analysis (see LedgerColumns.to_dataframe). Built
+        from the parsed columns already in memory; nothing is read again.
+        """
+        return (snap or self.snapshot()).columns(with_allocations=True).to_dataframe()
 
     # --- UNIFIED LEDGER SEARCH ---
-    def search_transactions(self, subsidiary=None, ppa_text=None, quarter=None):
-        results = []
-        try:
-            wb = openpyxl.load_workbook(Config.DB_FILENAME, data_only=True)
-            ws_limits = wb[Config.SHEET_LIMITS]
-            for row in range(2, ws_limits.max_row + 1):
-                sub_name = ws_limits.cell(row=row, column=1).value
-                if not sub_name: continue
-                if subsidiary and subsidiary != "All Departments" and sub_name != subsidiary:
-                    continue
-                current_col = 3
-                while current_col <= ws_limits.max_column:
-                    amt = ws_limits.cell(row=row, column=current_col).value
-                    date_val = ws_limits.cell(row=row, column=current_col+1).value
-                    if isinstance(amt, (int, float)) and isinstance(date_val, datetime):
-                        if ppa_text:
-                            if "ALLOC" not in ppa_text.upper(): pass 
-                        if quarter and quarter != "All":
-                            m = date_val.month
-                            row_q = ""
-                            if 4 <= m <= 6: row_q = "Q1"
-                            elif 7 <= m <= 9: row_q = "Q2"
-                            elif 10 <= m <= 12: row_q = "Q3"
-                            elif 1 <= m <= 3: row_q = "Q4"
-                            if row_q != quarter: 
-                                current_col += 2
-                                continue
-                        alloc_num = int((current_col - 1) / 2)
-                        ref_text = f"Allocation ({alloc_num})"
-                        results.append({"sub": sub_name, "ref": ref_text, "date": date_val, "amt": amt, "type": "ALLOC"})
-                    current_col += 2
-        except: pass
-
-        try:
-            active_sheet = self.get_sheet_name_for_date(datetime.now())
-            if active_sheet in wb.sheetnames:
-                ws_txn = wb[active_sheet]
-                for col in range(1, ws_txn.max_column + 1, 3):
-                    sub_name = ws_txn.cell(row=1, column=col).value
-                    if not sub_name: continue
-                    if subsidiary and subsidiary != "All Departments" and sub_name != subsidiary: continue
-                    for row in range(3, ws_txn.max_row + 1):
-                        ppa = ws_txn.cell(row=row, column=col).value
-                        date_val = ws_txn.cell(row=row, column=col+1).value
-                        amt = ws_txn.cell(row=row, column=col+2).value
-                        if not ppa: continue 
-                        if ppa_text and str(ppa_text).upper() not in str(ppa).upper(): continue
-                        if quarter and quarter != "All":
-                            if not isinstance(date_val, datetime): continue
-                            m = date_val.month
-                            row_q = ""
-                            if 4 <= m <= 6: row_q = "Q1"
-                            elif 7 <= m <= 9: row_q = "Q2"
-                            elif 10 <= m <= 12: row_q = "Q3"
-                            elif 1 <= m <= 3: row_q = "Q4"
-                            if row_q != quarter: continue
-                        results.append({"sub": sub_name, "ref": str(ppa), "date": date_val, "amt": amt, "type": "PPA"})
-        except: pass
-        results.sort(key=lambda x: x["date"], reverse=True)
-        final_output = []
-        for item in results:
-            final_output.append((item["sub"], item["ref"], item["date"], item["amt"]))
-        return final_output
\ No newline at end of file
+    def search_transactions(self, subsidiary=None, ppa_text=None, quarter=None, snap=None):
+        """
+        Allocations (all years) plus PPAs of the active FY sheet, newest first,
+        as a ResultSet of LedgerEntry rows. Uses the same filters as the ledger export.
+        """
+        active_sheet = self.get_sheet_name_for_date(datetime.now())
+        cols = (snap or self.snapshot()).columns([active_sheet], with_allocations=True)
+        mask = ledger.search_mask(cols, subsidiary, ppa_text, quarter)
+        # Undated allocations and amount-only PPA rows are not listed
+        is_alloc = cols.is_type(ledger.TYPE_ALLOC)
+        mask &= np.where(is_alloc, cols.has_date(), cols.has_ref())
+        return ResultSet(cols).filter(mask).sort_by_date(reverse=True)
@@ -0,0 +1,242 @@
+import os
+import json
+import zlib
+import hashlib
+import zipfile
+import argparse
+from datetime import datetime, timedelta
+from config import Config
+import shards
+
+# --- VERSIONED BACKUPS ---
+# An .xlsx file is a zip of parts (one XML per sheet, shared strings, styles,
+# ...), and a save only changes the parts it touched. Each backup version is a
+# small JSON manifest listing every part of every ledger file by the SHA-1 of
+# its content; the content itself is stored once in objects/, zlib-compressed.
+# A part whose zip CRC and size match the previous version is not even read,
+# so a backup costs in proportion to what changed, not to the ledger size.
+# Every manifest is complete, so restoring any version is a direct rebuild.
+#
+# Layout: <store>/versions/v000001.json, <store>/objects/ab/abcdef...
+
+
+def _write_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f: f.write(data)
+    os.replace(tmp, path)
+
+
+class BackupStore:
+    """Backups of the ledger at `db_path` (and its per-year files) kept in `store_dir`."""
+    def __init__(self, store_dir, db_path):
+        self.store_dir = store_dir
+        self.db_path = db_path
+        self.base = os.path.dirname(os.path.abspath(db_path))
+        self._latest = None     # Manifest of the newest version, read once
+
+    # --- STORAGE ---
+    def _version_path(self, number):
+        return os.path.join(self.store_dir, "versions", f"v{number:06d}.json")
+
+    def _object_path(self, sha):
+        return os.path.join(self.store_dir, "objects", sha[:2], sha)
+
+    def _put_object(self, data):
+        """Stores one part's content (once). Returns (sha, bytes written)."""
+        sha = hashlib.sha1(data).hexdigest()
+        path = self._object_path(sha)
+        if os.path.exists(path): return sha, 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        packed = zlib.compress(data, 6)
+        _write_atomic(path, packed)
+        return sha, len(packed)
+
+    def _get_object(self, sha):
+        with open(self._object_path(sha), "rb") as f: return zlib.decompress(f.read())
+
+    def version_numbers(self):
+        try: names = os.listdir(os.path.join(self.store_dir, "versions"))
+        except OSError: return []
+        return sorted(int(n[1:-5]) for n in names if n.startswith("v") and n.endswith(".json"))
+
+    def manifest(self, number):
+        with open(self._version_path(number), encoding="utf-8") as f: return json.load(f)
+
+    def versions(self):
+        """Manifests of every version, oldest first."""
+        return [self.manifest(n) for n in self.version_numbers()]
+
+    def latest(self):
+        if self._latest is None:
+            numbers = self.version_numbers()
+            self._latest = self.manifest(numbers[-1]) if numbers else {}
+        return self._latest
+
+    # --- BACKUP ---
+    def _store_file(self, path, prev):
+        """{"members": [[part, sha, crc, size], ...]} of one workbook, plus the bytes newly stored."""
+        known = {m[0]: m for m in prev["members"]} if prev else {}
+        members, written = [], 0
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                old = known.get(info.filename)
+                if old and old[2] == info.CRC and old[3] == info.file_size: sha = old[1]
+                else:
+                    sha, size = self._put_object(zf.read(info))
+                    written += size
+                members.append([info.filename, sha, info.CRC, info.file_size])
+        return {"members": members}, written
+
+    def backup(self, label=""):
+        """
+        Records the ledger as a new version if it changed since the last one.
+        Returns the version number, or None (unchanged, or it could not be read).
+        """
+        try:
+            last = self.latest()
+            prev_files = last.get("files", {})
+            files, written = {}, 0
+            for path in shards.ledger_files(self.db_path):
+                rel = os.path.relpath(os.path.abspath(path), self.base)
+                st = os.stat(path)
+                stat_key = [st.st_mtime_ns, st.st_size]
+                prev = prev_files.get(rel)
+                if prev and prev["stat"] == stat_key:
+                    files[rel] = prev
+                    continue
+                entry, size = self._store_file(path, prev)
+                entry["stat"] = stat_key
+                files[rel] = entry
+                written += size
+
+            if last and {k: v["members"] for k, v in files.items()} == \
+                    {k: v["members"] for k, v in prev_files.items()}:
+                # Touched but identical: remember the new stats so it is not read again
+                if files != prev_files:
+                    last["files"] = files
+                    self._save_manifest(last)
+                return None
+
+            number = last.get("version", 0) + 1
+            manifest = {"version": number, "time": datetime.now().isoformat(timespec="seconds"),
+                        "label": label, "bytes": written, "files": files}
+            self._save_manifest(manifest)
+        except (OSError, zipfile.BadZipFile, ValueError, KeyError): return None
+        if number % Config.BACKUP_PRUNE_EVERY == 0: self.prune()
+        return number
+
+    def _save_manifest(self, manifest):
+        os.makedirs(os.path.dirname(self._version_path(manifest["version"])), exist_ok=True)
+        _write_atomic(self._version_path(manifest["version"]), json.dumps(manifest).encode("utf-8"))
+        self._latest = manifest
+
+    # --- RESTORE ---
+    def restore(self, number, dest_dir=None):
+        """
+        Rebuilds the ledger files of version `number` into `dest_dir`, or in
+        place (the current state is backed up first, so a restore can be
+        undone). Returns (ok, message).
+        """
+        try: manifest = self.manifest(number)
+        except (OSError, ValueError): return False, f"Error: no backup version {number}."
+        in_place = dest_dir is None
+        base = self.base if in_place else dest_dir
+        if in_place: self.backup(f"Before restoring version {number}")
+        try:
+            for rel, entry in manifest["files"].items():
+                target = os.path.join(base, rel)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                tmp = target + ".restore.tmp"
+                with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as zf:
+                    for name, sha, _, _ in entry["members"]: zf.writestr(name, self._get_object(sha))
+                os.replace(tmp, target)
+            if in_place:
+                # Years saved after that version (per-year files) go too
+                restored = {os.path.normpath(os.path.join(base, rel)) for rel in manifest["files"]}
+                for path in shards.shard_files(self.db_path):
+                    if os.path.normpath(path) not in restored: os.remove(path)
+                folder = shards.shard_dir(self.db_path)
+                if os.path.isdir(folder) and not os.listdir(folder): os.rmdir(folder)
+        except PermissionError: return False, "Error: File open."
+        except (OSError, zlib.error) as e: return False, f"Error: {e}"
+        return True, f"Restored version {number} ({manifest['time']})."
+
+    # --- RETENTION ---
+    def prune(self, now=None):
+        """
+        Drops old versions: every version of the last BACKUP_KEEP_ALL_DAYS days
+        is kept, then the last one of each day up to BACKUP_KEEP_DAILY_DAYS; the
+        oldest go first while the store is over BACKUP_MAX_MB. The newest
+        version is always kept. Objects no version uses are deleted.
+        Returns the number of versions dropped.
+        """
+        now = now or datetime.now()
+        manifests = self.versions()
+        if len(manifests) < 2: return 0
+        keep, last_of_day = [], {}
+        for m in manifests:
+            last_of_day[m["time"][:10]] = m["version"]
+        for m in manifests[:-1]:
+            age = now - datetime.fromisoformat(m["time"])
+            if age <= timedelta(days=Config.BACKUP_KEEP_ALL_DAYS): keep.append(m)
+            elif age <= timedelta(days=Config.BACKUP_KEEP_DAILY_DAYS) and last_of_day[m["time"][:10]] == m["version"]:
+                keep.append(m)
+        keep.append(manifests[-1])
+
+        refs, sizes = {}, {}
+        for m in keep:
+            for sha in {member[1] for entry in m["files"].values() for member in entry["members"]}:
+                refs[sha] = refs.get(sha, 0) + 1
+        for sha in refs:
+            try: sizes[sha] = os.path.getsize(self._object_path(sha))
+            except OSError: sizes[sha] = 0
+        total = sum(sizes.values())
+        while len(keep) > 1 and total > Config.BACKUP_MAX_MB * 1024 * 1024:
+            for sha in {member[1] for entry in keep.pop(0)["files"].values() for member in entry["members"]}:
+                refs[sha] -= 1
+                if not refs[sha]: total -= sizes[sha]
+
+        kept = {m["version"] for m in keep}
+        dropped = [m["version"] for m in manifests if m["version"] not in kept]
+        for number in dropped:
+            try: os.remove(self._version_path(number))
+            except OSError: pass
+        live = {sha for sha, count in refs.items() if count}
+        objects = os.path.join(self.store_dir, "objects")
+        for folder in os.listdir(objects) if os.path.isdir(objects) else []:
+            for name in os.listdir(os.path.join(objects, folder)):
+                if name not in live:
+                    try: os.remove(os.path.join(objects, folder, name))
+                    except OSError: pass
+        return len(dropped)
+
+
+def store_for(db_path):
+    """The BackupStore kept next to `db_path`."""
+    folder = os.path.dirname(os.path.abspath(db_path))
+    return BackupStore(os.path.join(folder, Config.BACKUP_DIR), db_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List, take and restore versioned backups of the ledger.")
+    parser.add_argument("action", choices=["list", "backup", "restore", "prune"])
+    parser.add_argument("version", nargs="?", type=int, help="Version to restore")
+    parser.add_argument("--db", default=Config.DB_FILENAME, help="Ledger workbook")
+    parser.add_argument("--to", help="Restore into this folder instead of over the ledger")
+    args = parser.parse_args()
+
+    store = store_for(args.db)
+    if args.action == "list":
+        for m in store.versions():
+            print(f"{m['version']:>6}  {m['time']}  {m['bytes'] / 1024:8.1f} KB new  {m['label']}")
+    elif args.action == "backup":
+        number = store.backup("Manual backup")
+        print(f"Version {number} recorded." if number else "Unchanged since the last version.")
+    elif args.action == "prune":
+        print(f"{store.prune()} version(s) removed.")
+    else:
+        if args.version is None: parser.error("restore needs a version number (see: list)")
+        if args.to: os.makedirs(args.to, exist_ok=True)
+        ok, msg = store.restore(args.version, args.to)
+        print(msg)
+        raise SystemExit(0 if ok else 1)
@@ -0,0 +1,40 @@
+import os
+import time
+import argparse
+from config import Config
+import ledger_cache
+from ledger_cache import LedgerCache
+
+# --- PARALLEL PARSE BENCHMARK ---
+# Full ledger load (every Transactions_ sheet) with 1..N worker processes.
+# The first load of each pool size includes starting the workers; the second
+# shows the steady state (pools are kept for the life of the app).
+# Usage: python bench_parse.py [--db data.xlsx] [--workers 1 2 4]
+
+
+def _load(db_path, workers):
+    Config.PARSE_WORKERS = workers
+    cache = LedgerCache(db_path)
+    cache.refresh()
+    snap = cache.snapshot()
+    t = time.perf_counter()
+    cols = snap.columns()
+    return time.perf_counter() - t, len(cols), len(snap.sheet_names)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parallel sheet parsing against worker count.")
+    parser.add_argument("--db", default=Config.DB_FILENAME, help="Ledger workbook")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    Config.PARALLEL_PARSE_MIN_MB = 0    # Always use the pool when there is more than one worker
+    print(f"{os.cpu_count()} CPU(s)")
+    base = None
+    for workers in args.workers:
+        cold, rows, sheets = _load(args.db, workers)
+        warm, _, _ = _load(args.db, workers)
+        base = base or warm
+        print(f"{workers:>3} worker(s)  {sheets} sheets  {rows:>8} rows  "
+              f"first {cold:6.2f} s  again {warm:6.2f} s  speedup {base / warm:4.2f}x")
+    for pool in ledger_cache._pools.values(): pool.shutdown()
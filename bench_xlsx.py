@@ -0,0 +1,66 @@
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+import openpyxl
+from openpyxl.styles import Border, Side
+from doc_gen import write_ledger_xlsx
+from ledger import LEDGER_FIELDS
+
+# --- EXCEL EXPORT BENCHMARK ---
+# write_only export (doc_gen.write_ledger_xlsx) against a normal-mode workbook
+# filled cell by cell and saved, the way backend.py writes data.xlsx.
+# Usage: python bench_xlsx.py [--rows 20000]
+
+
+def _sample_rows(n):
+    start = datetime(2024, 4, 1)
+    for i in range(n):
+        yield (f"DEPT {i % 12}", f"PPA{i:08d}", start + timedelta(days=i % 730), 100 + i % 5000, "PPA",
+               "Transactions_2024_25")
+
+
+def _normal_mode(rows, dest):
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(LEDGER_FIELDS)
+    r = 2
+    for sub_name, ref, date_val, amt, row_type, sheet in rows:
+        ws.cell(row=r, column=1, value=sub_name)
+        ws.cell(row=r, column=2, value=ref).border = border
+        d_cell = ws.cell(row=r, column=3, value=date_val)
+        d_cell.number_format = 'DD-MM-YYYY'
+        d_cell.border = border
+        a_cell = ws.cell(row=r, column=4, value=amt)
+        a_cell.number_format = '"₹" #,##0'
+        a_cell.border = border
+        ws.cell(row=r, column=5, value=row_type)
+        ws.cell(row=r, column=6, value=sheet)
+        r += 1
+    wb.save(dest)
+
+
+def _measure(label, writer, n, dest):
+    # Timed without tracing (tracemalloc slows allocation-heavy code down a lot)
+    t = time.perf_counter()
+    writer(_sample_rows(n), dest)
+    elapsed = time.perf_counter() - t
+    tracemalloc.start()
+    writer(_sample_rows(n), dest)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<12} {n:>8} rows  {elapsed:7.2f} s  peak {peak / 1e6:7.1f} MB  {os.path.getsize(dest) / 1e6:5.1f} MB file")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark write_only vs normal-mode Excel export.")
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _measure("write_only", write_ledger_xlsx, args.rows, os.path.join(tmp, "write_only.xlsx"))
+        _measure("normal", _normal_mode, args.rows, os.path.join(tmp, "normal.xlsx"))
@@ -0,0 +1,88 @@
+import re
+from collections import namedtuple
+from datetime import date
+
+# --- BULK PASTE OF PPAs ---
+# Clerks get PPA lists for one department in an email or a spreadsheet. Each
+# pasted line holds a PPA number, an amount and optionally a date, separated by
+# tabs (copied cells), commas, semicolons or spaces. The whole list is checked
+# in one pass against the same rules as the entry form: 13 letters/digits,
+# whole-rupee amount, valid date, not already in the ledger, the session or
+# earlier in the list, and within the department's remaining limit.
+
+PastedRow = namedtuple("PastedRow", ["line", "ppa", "amount", "date"])
+Rejected = namedtuple("Rejected", ["line", "text", "reason"])
+PasteResult = namedtuple("PasteResult", ["rows", "rejected", "total", "sheet_name", "available"])
+
+_PPA = re.compile(r"^\s*([A-Za-z0-9]+)")
+_DATE = re.compile(r"\b(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})\b|\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_CURRENCY = re.compile(r"₹|\bRs\.?|\bINR\b", re.IGNORECASE)
+_AMOUNT = re.compile(r"^(\d+)(?:\.0*)?$")
+
+
+def _parse_date(match):
+    d, m, y = match.group(1, 2, 3) if match.group(1) else match.group(6, 5, 4)
+    return date(int(y), int(m), int(d))
+
+
+def parse_line(text, default_date=None):
+    """(ppa, amount, date) of one pasted line. Raises ValueError with the reason."""
+    m = _PPA.match(text)
+    if not m: raise ValueError("no PPA number")
+    ppa, rest = m.group(1).upper(), text[m.end():]
+    if len(ppa) != 13: raise ValueError(f"PPA must be 13 letters/digits (has {len(ppa)})")
+
+    found = _DATE.search(rest)
+    if found:
+        try: date_obj = _parse_date(found)
+        except ValueError: raise ValueError(f"invalid date {found.group(0)}")
+        rest = rest[:found.start()] + " " + rest[found.end():]
+    elif default_date: date_obj = default_date
+    else: raise ValueError("no date")
+
+    # What is left is the amount, possibly as "₹ 1,20,000" between separators
+    amount = re.sub(r"[\s,;|]", "", _CURRENCY.sub("", rest))
+    if not amount: raise ValueError("no amount")
+    m = _AMOUNT.match(amount)
+    if not m: raise ValueError(f"amount {amount} is not a whole number of rupees")
+    if int(m.group(1)) <= 0: raise ValueError("amount must be more than 0")
+    return ppa, int(m.group(1)), date_obj
+
+
+def check_paste(system, subsidiary, text, session_ppas=(), session_total=0, batch_date=None, default_date=None):
+    """
+    Parses and validates every line of `text` for `subsidiary`. `batch_date` is
+    the date of the session's first row (its FY sheet is where the batch is
+    saved); without one, the first valid pasted row decides. Rows are accepted
+    in order while the limit allows. Returns a PasteResult.
+    """
+    lines = text.splitlines()
+    parsed, rejected = [], []
+    for number, line in enumerate(lines, start=1):
+        # Blank lines and column headings ("PPA No  Amount  Date") have no digits
+        if not any(ch.isdigit() for ch in line): continue
+        try: parsed.append(PastedRow(number, *parse_line(line, default_date)))
+        except ValueError as e: rejected.append(Rejected(number, line.strip(), str(e)))
+
+    if batch_date is None and parsed: batch_date = parsed[0].date
+    sheet_name = system.get_sheet_name_for_date(batch_date) if batch_date else None
+    index = system.get_ppa_index()
+    available = system.precheck_limit(subsidiary, session_total, batch_date)["available"] if batch_date else 0
+
+    rows, seen, total = [], set(session_ppas), 0
+    for row in parsed:
+        where = index.lookup(row.ppa)
+        if where: reason = f"already saved in {where}"
+        elif row.ppa in seen: reason = "already in this session" if row.ppa in session_ppas else "repeated in the list"
+        elif system.get_sheet_name_for_date(row.date) != sheet_name: reason = f"date is not in {sheet_name}"
+        elif row.amount > available: reason = "exceeds the remaining limit"
+        else: reason = None
+        seen.add(row.ppa)
+        if reason:
+            rejected.append(Rejected(row.line, lines[row.line - 1].strip(), reason))
+            continue
+        rows.append(row)
+        total += row.amount
+        available -= row.amount
+    rejected.sort(key=lambda r: r.line)
+    return PasteResult(rows, rejected, total, sheet_name, available)
@@ -10,6 +10,62 @@ class Config:
     # SHEET_TXN removed. It is now dynamic based on date.
     TXN_PREFIX = "Transactions_" 
 
+    # --- SHARDED LAYOUT (one workbook per FY, see shards.py) ---
+    SHARD_DIR_SUFFIX = "_years"     # data.xlsx -> data_years/Transactions_YYYY_YY.xlsx
+
+    # --- FISCAL CALENDAR ---
+    FY_START_MONTH = 4              # April; quarters and half-years count from here
+
+    # --- DASHBOARD ---
+    DRILLDOWN_PAGE = 200            # Entries shown per expand of a dashboard cell
+
+    # --- EXPORT ---
+    EXPORT_BATCH_ROWS = 10000       # Rows per Parquet/Arrow record batch
+
+    # --- BURN RATE FORECAST ---
+    BURN_WINDOW_DAYS = 90           # Burn rate = spending of the last N days, per month
+    BURN_HISTORY_MONTHS = 6         # Monthly spend columns shown in the PDF
+
+    # --- YEAR-OVER-YEAR COMPARISON ---
+    COMPARE_YEARS = 3               # Fiscal years side by side, ending with the current one
+
+    # --- PARSE CACHE ---
+    PARSE_CACHE_DIR = ".parse_cache"    # Decoded sheets, next to data.xlsx (safe to delete)
+    PARSE_WORKERS = None                # Processes parsing sheets in parallel (None = one per CPU)
+    PARALLEL_PARSE_MIN_MB = 8           # Sheet XML to parse at once before the pool is used
+
+    # --- MEMORY BUDGET ---
+    CACHE_BUDGET_MB = 256               # Parsed FY sheets kept in memory; least used older years unloaded above this (None = no limit)
+
+    # --- REPORT CACHE ---
+    REPORT_CACHE_DIR = ".report_cache"  # Generated PDFs, next to data.xlsx
+    REPORT_CACHE_MAX_MB = 50            # Least recently used files removed above this
+
+    # --- BACKUPS ---
+    BACKUP_DIR = ".backups"             # Versions of the ledger's changed parts, next to data.xlsx
+    BACKUP_KEEP_ALL_DAYS = 14           # Every version of the last N days is kept ...
+    BACKUP_KEEP_DAILY_DAYS = 365        # ... then the last version of each day, up to N days
+    BACKUP_MAX_MB = 500                 # Oldest versions dropped above this
+    BACKUP_PRUNE_EVERY = 20             # Retention is applied every N versions
+
+    # --- MULTI-OFFICE CONSOLIDATION ---
+    CONSOLIDATION_CACHE_DIR = ".consolidation_cache"   # Created inside the offices folder
+    CONSOLIDATION_WORKERS = None    # Process pool size (None = one per CPU)
+
+    # --- LIVE REFRESH (FILE WATCHER) ---
+    WATCH_INTERVAL = 1.0            # Seconds between checks when polling
+    WATCH_DEBOUNCE = 0.5            # File must be unchanged this long before re-reading
+    WATCH_POLL_MS = 250             # How often the UI picks up watcher results
+
+    # --- IDLE-TIME PRECOMPUTE ---
+    IDLE_DELAY_MS = 1500            # Quiet time after the last key/click before background work resumes
+    IDLE_POLL = 1.0                 # Seconds between checks for a new ledger version
+    IDLE_STATUS_MS = 500            # How often the status line is updated
+    IDLE_PRERENDER_PDF = True       # Also render the detailed PDF into the report cache
+
+    # --- PPA ENTRY ---
+    PPA_SUGGEST_MIN_CHARS = 4       # Start showing existing matches after this many chars
+
     # --- COLORS (THEME) ---
     COLOR_PRIMARY = "#0078D7"       # Main Blue
     COLOR_SECONDARY = "#555555"     # Dark Gray
@@ -42,5 +98,6 @@ class Config:
     FONT_FOOTER = (FONT_FAMILY, 8)
     
     FONT_ENTRY = (FONT_FAMILY, 11)
+    FONT_MONO = (FONT_MONO_FAMILY, 10)
     FONT_MONO_LARGE = (FONT_MONO_FAMILY, 14) 
     FONT_PREVIEW_LARGE = (FONT_FAMILY, 16, "bold")
\ No newline at end of file
@@ -0,0 +1,193 @@
+import os
+import json
+import hashlib
+import argparse
+import openpyxl
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from config import Config
+from backend import BookkeepingSystem
+from doc_gen import generate_summary_pdf
+from fiscal import get_calendar
+from records import DepartmentSummary, QuarterBreakdown
+import shards
+
+# --- MULTI-OFFICE CONSOLIDATION ---
+# Every district office keeps its own data.xlsx. Headquarters points this module
+# at a folder holding those files; each one is parsed by the normal
+# BookkeepingSystem in a worker process and the results are merged by department.
+
+
+_APP_DIRS = {Config.REPORT_CACHE_DIR, Config.BACKUP_DIR, Config.PARSE_CACHE_DIR, Config.CONSOLIDATION_CACHE_DIR}
+
+
+def _is_ledger(path):
+    """Reason `path` is not an office ledger, or None if it is (it has a Limits sheet)."""
+    try: wb = openpyxl.load_workbook(path, read_only=True)
+    except Exception as e: return f"not readable ({e})"
+    try: return None if Config.SHEET_LIMITS in wb.sheetnames else f"no {Config.SHEET_LIMITS} sheet"
+    finally: wb.close()
+
+
+def find_ledgers(directory):
+    """
+    Office ledgers below `directory`: .xlsx files with a Limits sheet. Returns
+    (paths, {path: reason}) for the .xlsx files passed over (exports, ...).
+    """
+    paths, skipped = [], {}
+    for root, dirs, files in os.walk(directory):
+        # Per-year files of a ledger split by year belong to that ledger; the app's
+        # own folders (cached reports, backups) and hidden ones hold no offices
+        dirs[:] = [d for d in dirs if not d.endswith(Config.SHARD_DIR_SUFFIX)
+                   and not d.startswith(".") and d not in _APP_DIRS]
+        for name in files:
+            if not name.lower().endswith(".xlsx") or name.startswith("~$"): continue
+            path = os.path.join(root, name)
+            reason = _is_ledger(path)
+            if reason: skipped[path] = reason
+            else: paths.append(path)
+    return sorted(paths), skipped
+
+
+def _file_key(path):
+    """
+    Cache key of one office file. Reports depend on today's FY, so the active
+    sheet name and FY start month are part of the key along with mtime/size
+    (of every per-year file too, if the ledger is split by year).
+    """
+    stats = []
+    for file_path in shards.ledger_files(path):
+        st = os.stat(file_path)
+        stats.append((os.path.basename(file_path), st.st_mtime_ns, st.st_size))
+    active_sheet = get_calendar().sheet_name_for_date(datetime.now())
+    return (tuple(stats), active_sheet, Config.FY_START_MONTH)
+
+
+def parse_office(path):
+    """Worker entry point: the per-office dashboard and PDF datasets."""
+    system = BookkeepingSystem(path, create=False)
+    return {"summary": system.get_summary_report(), "detailed": system.get_detailed_report_data()}
+
+
+class ConsolidationCache:
+    """
+    One JSON file per office file, reused while the file's key is unchanged.
+    The folder is usually a shared drive other offices write to, so nothing
+    is stored in a format that could run code when read (no pickle).
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def _entry_path(self, path):
+        digest = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def get(self, path, key):
+        try:
+            with open(self._entry_path(path), encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry["key"] != json.loads(json.dumps(key)): return None
+            return {"summary": [DepartmentSummary(_checked_row(r)) for r in entry["summary"]],
+                    "detailed": [QuarterBreakdown(_checked_row(r)) for r in entry["detailed"]]}
+        except Exception: return None
+
+    def put(self, path, key, result):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = self._entry_path(path) + ".tmp"
+            entry = {"key": key, "summary": [list(r) for r in result["summary"]],
+                     "detailed": [list(r) for r in result["detailed"]]}
+            with open(tmp, "w", encoding="utf-8") as f: json.dump(entry, f)
+            os.replace(tmp, self._entry_path(path))
+        except (OSError, TypeError, ValueError): pass
+
+
+def _checked_row(row):
+    """A cached report row: department name, then numbers only."""
+    if not row or not isinstance(row[0], str) or \
+            not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in row[1:]):
+        raise ValueError("not a report row")
+    return row
+
+
+def _merge_rows(row_lists):
+    """
+    Adds up numeric columns of rows sharing a department name; keeps first-seen
+    order and the row type (DepartmentSummary / QuarterBreakdown).
+    """
+    merged, row_types = {}, {}
+    for rows in row_lists:
+        for row in rows:
+            name, values = row[0], row[1:]
+            if name in merged:
+                merged[name] = [a + b for a, b in zip(merged[name], values)]
+            else:
+                merged[name] = list(values)
+                row_types[name] = type(row)
+    return [row_types[name]((name, *values)) for name, values in merged.items()]
+
+
+class ConsolidatedReport:
+    def __init__(self, offices, summary, detailed, errors, reparsed):
+        self.offices = offices      # Paths of all office ledgers included
+        self.summary = summary      # Same rows as get_summary_report()
+        self.detailed = detailed    # Same rows as get_detailed_report_data()
+        self.errors = errors        # {path: error message} of files skipped or not read
+        self.reparsed = reparsed    # Paths parsed this run (cache misses)
+
+
+def consolidate(directory, max_workers=None):
+    """
+    Parses every office ledger in `directory` (in parallel, cached per file)
+    and merges the departments across offices.
+    """
+    cache = ConsolidationCache(os.path.join(directory, Config.CONSOLIDATION_CACHE_DIR))
+    paths, skipped = find_ledgers(directory)
+    results, errors, pending = {}, dict(skipped), {}
+
+    for path in paths:
+        try: key = _file_key(path)
+        except OSError as e:
+            errors[path] = str(e)
+            continue
+        cached = cache.get(path, key)
+        if cached is not None: results[path] = cached
+        else: pending[path] = key
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers or Config.CONSOLIDATION_WORKERS) as pool:
+            futures = {path: pool.submit(parse_office, path) for path in pending}
+            for path, future in futures.items():
+                try: result = future.result()
+                except Exception as e:
+                    errors[path] = str(e)
+                    continue
+                results[path] = result
+                cache.put(path, pending[path], result)
+
+    offices = [p for p in paths if p in results]
+    summary = _merge_rows(results[p]["summary"] for p in offices)
+    detailed = _merge_rows(results[p]["detailed"] for p in offices)
+    return ConsolidatedReport(offices, summary, detailed, errors, [p for p in pending if p in results])
+
+
+def generate_consolidated_pdf(report, filename=None):
+    filename = filename or f"Consolidated_Report_{datetime.now().strftime('%d-%m-%Y')}.pdf"
+    title = f"Consolidated Financial Status Report ({len(report.offices)} Offices)"
+    return generate_summary_pdf(report.detailed, filename=filename, title=title)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consolidate several office ledgers.")
+    parser.add_argument("directory", help="Folder containing the offices' .xlsx ledgers")
+    parser.add_argument("--pdf", help="Output PDF file name")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    report = consolidate(args.directory, args.workers)
+    print(f"Offices: {len(report.offices)}  (re-parsed: {len(report.reparsed)})")
+    for path, err in report.errors.items():
+        print(f"  Skipped {path}: {err}")
+    ok, res = generate_consolidated_pdf(report, args.pdf)
+    print(res)
+    raise SystemExit(0 if ok else 1)
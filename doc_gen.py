@@ -1,12 +1,18 @@
 import os
 from datetime import datetime
+from itertools import islice
 from docx import Document
 from docx.shared import Pt
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape 
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.pdfgen import canvas
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle, Font, PatternFill, Alignment
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from ledger import TYPE_ALLOC, LEDGER_FIELDS
 
 def _fmt_rupee(value):
     try: value = int(value)
@@ -79,8 +85,39 @@ def generate_payment_advice(subsidiary, date_str, transaction_list):
     except Exception as e: return False, str(e)
 
 # --- PDF GENERATION (UPDATED) ---
-def generate_summary_pdf(data_list):
-    filename = f"Financial_Report_{datetime.now().strftime('%d-%m-%Y')}.pdf"
+def summary_pdf_name():
+    return f"Financial_Report_{datetime.now().strftime('%d-%m-%Y')}.pdf"
+
+def _forecast_table(forecast, labels):
+    """Burn rate table: recent months, burn per month, balance and when it runs out."""
+    header = ["Department", *labels, "Burn /\nMonth", "Balance", "Runs Out", "Alloc\nEvery", "Last\nAlloc"]
+    rows = [header]
+    for f in forecast:
+        if f.days_left == 0: runs_out = "Exhausted"
+        else: runs_out = f.exhaustion.strftime("%d-%m-%Y") if f.exhaustion else "-"
+        cadence = f"{f.cadence} days" if f.cadence is not None else "-"
+        last = f.last_allocation.strftime("%d-%m-%Y") if f.last_allocation else "-"
+        money = [_fmt_rupee(v).replace("₹", "").strip() for v in (*f.monthly, f.burn_rate, f.balance)]
+        rows.append([f.name, *money, runs_out, cadence, last])
+    widths = [140] + [50] * (len(labels) + 2) + [60, 50, 60]
+    t = Table(rows, colWidths=widths, repeatRows=1)
+    t.setStyle(TableStyle([
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+        ('FONTSIZE', (0,0), (-1,0), 8),
+        ('FONTNAME', (0,1), (0,-1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0,1), (-1,-1), 7),
+        ('ALIGN', (1,0), (-1,-1), 'CENTER'),
+        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+        ('GRID', (0,0), (-1,-1), 0.5, colors.black),
+        ('TOPPADDING', (0,0), (-1,-1), 2),
+        ('BOTTOMPADDING', (0,0), (-1,-1), 2),
+    ]))
+    return t
+
+def generate_summary_pdf(data_list, filename=None, title=None, forecast=None, forecast_labels=()):
+    filename = filename or summary_pdf_name()
+    title = title or "Financial Status Report (Running Balance)"
     
     try:
         # 1. Setup A4 Landscape
@@ -91,7 +128,7 @@ def generate_summary_pdf(data_list):
         
         # 2. Title
         title_style = ParagraphStyle('CT', parent=styles['Heading1'], fontSize=16, alignment=TA_CENTER, textColor=colors.black, spaceAfter=15)
-        elements.append(Paragraph("Financial Status Report (Running Balance)", title_style))
+        elements.append(Paragraph(title, title_style))
         
         date_str = datetime.now().strftime("%d-%m-%Y %H:%M %p")
         elements.append(Paragraph(f"Generated on: {date_str}", styles['Normal']))
@@ -120,8 +157,8 @@ def generate_summary_pdf(data_list):
         
         # 4. Data Rows
         for row in data_list:
-            clean_row = [row[0]] # Name
-            for val in row[1:]:
+            clean_row = [row.name]
+            for val in row.values:
                 txt = _fmt_rupee(val).replace("₹", "").strip() 
                 clean_row.append(txt)
             table_data.append(clean_row)
@@ -164,6 +201,268 @@ def generate_summary_pdf(data_list):
         ]))
         
         elements.append(t)
+
+        # 7. Burn rate forecast (optional)
+        if forecast:
+            elements.append(Spacer(1, 15))
+            elements.append(Paragraph("Burn Rate & Forecast", styles['Heading3']))
+            elements.append(_forecast_table(forecast, forecast_labels))
+
         doc.build(elements)
         return True, os.path.abspath(filename)
-    except Exception as e: return False, str(e)
\ No newline at end of file
+    except Exception as e: return False, str(e)
+
+# --- YEAR-OVER-YEAR COMPARISON PDF ---
+def comparison_pdf_name():
+    return f"Year_Comparison_{datetime.now().strftime('%d-%m-%Y')}.pdf"
+
+def _fmt_change(value):
+    text = _fmt_rupee(value).replace("₹", "").strip()
+    return f"+{text}" if isinstance(value, (int, float)) and value > 0 else text
+
+def generate_comparison_pdf(rows, filename=None, title=None):
+    """YearComparison rows: one line per department and FY, department name on its first year only."""
+    filename = filename or comparison_pdf_name()
+    title = title or "Year-over-Year Comparison"
+    try:
+        doc = SimpleDocTemplate(filename, pagesize=landscape(A4),
+                                leftMargin=20, rightMargin=20, topMargin=20, bottomMargin=20)
+        styles = getSampleStyleSheet()
+        title_style = ParagraphStyle('CT', parent=styles['Heading1'], fontSize=16, alignment=TA_CENTER, textColor=colors.black, spaceAfter=15)
+        elements = [Paragraph(title, title_style),
+                    Paragraph(f"Generated on: {datetime.now().strftime('%d-%m-%Y %H:%M %p')}", styles['Normal']),
+                    Spacer(1, 15)]
+
+        row1 = ["Department", "FY", "Opening\nBalance"]
+        for q in range(1, 5): row1 += [f"Quarter {q}", "", ""]
+        row1 += ["Change vs Previous FY", "", ""]
+        row2 = ["", "", ""] + ["Addl\nAlloc", "Expenditure", "Qtr ending\nBalance"] * 4 + ["Allocated", "Spent", "Closing"]
+        table_data = [row1, row2]
+
+        group_starts, prev_name = [], None
+        for row in rows:
+            first_of_dept = row.name != prev_name
+            prev_name = row.name
+            if first_of_dept: group_starts.append(len(table_data))
+            money = [_fmt_rupee(v).replace("₹", "").strip() for v in row.values[:-3]]
+            table_data.append([row.name if first_of_dept else "", row.year, *money,
+                               *[_fmt_change(v) for v in row.deltas]])
+
+        t = Table(table_data, colWidths=[100, 36, 48] + [42] * 12 + [38] * 3, repeatRows=2)
+        style = [
+            ('SPAN', (0,0), (0,1)), ('SPAN', (1,0), (1,1)), ('SPAN', (2,0), (2,1)),
+            ('SPAN', (3,0), (5,0)), ('SPAN', (6,0), (8,0)), ('SPAN', (9,0), (11,0)), ('SPAN', (12,0), (14,0)),
+            ('SPAN', (15,0), (17,0)),
+            ('FONTNAME', (0,0), (-1,1), 'Helvetica-Bold'),
+            ('ALIGN', (0,0), (-1,1), 'CENTER'),
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+            ('BACKGROUND', (0,0), (-1,1), colors.lightgrey),
+            ('FONTSIZE', (0,0), (-1,1), 7),
+            ('FONTNAME', (0,2), (0,-1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0,2), (-1,-1), 6.5),
+            ('ALIGN', (1,2), (-1,-1), 'CENTER'),
+            ('GRID', (0,0), (-1,-1), 0.25, colors.black),
+            ('TOPPADDING', (0,0), (-1,-1), 2),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 2),
+            ('LEFTPADDING', (0,0), (-1,-1), 2),
+            ('RIGHTPADDING', (0,0), (-1,-1), 2),
+        ]
+        # Heavier line between departments
+        for start in group_starts[1:]: style.append(('LINEABOVE', (0,start), (-1,start), 1, colors.black))
+        t.setStyle(TableStyle(style))
+        elements.append(t)
+
+        doc.build(elements)
+        return True, os.path.abspath(filename)
+    except Exception as e: return False, str(e)
+
+
+# --- EXCEL EXPORT (write_only: rows go straight to disk) ---
+_XLSX_MONEY = '"₹" #,##0'
+
+
+def _xlsx_workbook():
+    """write_only workbook with the shared named styles registered once."""
+    wb = Workbook(write_only=True)
+    wb.add_named_style(NamedStyle("report_header", font=Font(bold=True),
+                                  fill=PatternFill("solid", fgColor="D3D3D3"),
+                                  alignment=Alignment(horizontal="center", vertical="center", wrap_text=True)))
+    wb.add_named_style(NamedStyle("report_name", font=Font(bold=True)))
+    wb.add_named_style(NamedStyle("report_money", number_format=_XLSX_MONEY))
+    wb.add_named_style(NamedStyle("report_date", number_format="DD-MM-YYYY"))
+    return wb
+
+
+def _xlsx_row(ws, values, style):
+    cells = []
+    for value in values:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        cells.append(cell)
+    return cells
+
+
+def _xlsx_report_rows(ws, rows):
+    for row in rows:
+        ws.append(_xlsx_row(ws, [row.name], "report_name") + _xlsx_row(ws, row[1:], "report_money"))
+
+
+def report_xlsx_name():
+    return f"Financial_Report_{datetime.now().strftime('%d-%m-%Y')}.xlsx"
+
+
+def generate_report_xlsx(summary_rows, period_labels, detailed_rows, filename=None, comparison_rows=()):
+    """
+    Dashboard (get_summary_report rows, one column per period label), the
+    quarterly running balance table (get_detailed_report_data rows) and, if
+    given, the year-over-year table (get_year_comparison rows) as one Excel
+    file, one sheet each.
+    """
+    filename = filename or report_xlsx_name()
+    try:
+        wb = _xlsx_workbook()
+        ws = wb.create_sheet("Dashboard")
+        ws.column_dimensions["A"].width = 30
+        ws.append(_xlsx_row(ws, ["Department", "Limit", *period_labels, "Total", "Balance"], "report_header"))
+        _xlsx_report_rows(ws, summary_rows)
+
+        ws = wb.create_sheet("Quarterly")
+        ws.column_dimensions["A"].width = 30
+        ws.append(_xlsx_row(ws, ["Department", "Previous Balance"] +
+                            [label for q in range(1, 5) for label in (f"Quarter {q}", "", "")], "report_header"))
+        ws.append(_xlsx_row(ws, ["", ""] + ["Addl Alloc", "Expenditure", "Qtr ending Balance"] * 4, "report_header"))
+        _xlsx_report_rows(ws, detailed_rows)
+
+        if comparison_rows:
+            ws = wb.create_sheet("Year-over-Year")
+            ws.column_dimensions["A"].width = 30
+            ws.append(_xlsx_row(ws, ["Department", "FY", "Opening Balance"] +
+                                [label for q in range(1, 5) for label in (f"Quarter {q}", "", "")] +
+                                ["Change vs Previous FY", "", ""], "report_header"))
+            ws.append(_xlsx_row(ws, ["", "", ""] + ["Addl Alloc", "Expenditure", "Qtr ending Balance"] * 4 +
+                                ["Allocated", "Spent", "Closing"], "report_header"))
+            _xlsx_report_rows(ws, comparison_rows)
+
+        wb.save(filename)
+        return True, os.path.abspath(filename)
+    except PermissionError: return False, "Error: File open."
+    except Exception as e: return False, str(e)
+
+
+def write_ledger_xlsx(rows, dest):
+    """Long format ledger rows into one sheet; returns the row count (exporter writer)."""
+    wb = _xlsx_workbook()
+    ws = wb.create_sheet("Ledger")
+    ws.append(_xlsx_row(ws, [f.title() for f in LEDGER_FIELDS], "report_header"))
+    count = 0
+    for sub_name, ref, date_val, amt, row_type, sheet in rows:
+        date_cell = WriteOnlyCell(ws, value=date_val)
+        if isinstance(date_val, datetime): date_cell.style = "report_date"
+        amt_cell = WriteOnlyCell(ws, value=amt)
+        if isinstance(amt, (int, float)): amt_cell.style = "report_money"
+        ws.append([sub_name, ref, date_cell, amt_cell, row_type, sheet])
+        count += 1
+    wb.save(dest)
+    return count
+
+
+# --- STREAMING DEPARTMENT STATEMENT ---
+_STMT_HEADER = ["Date", "Particulars", "Reference", "Allocation", "Expenditure", "Balance"]
+_STMT_WIDTHS = [60, 65, 150, 85, 85, 100]
+_STMT_ROW_HEIGHT = 14
+_STMT_MARGIN = 30
+_STMT_TOP = 70  # Title block above the table
+
+_STMT_STYLE = TableStyle([
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+    ('FONTNAME', (0,1), (-1,1), 'Helvetica-Oblique'),
+    ('FONTNAME', (0,-1), (-1,-1), 'Helvetica-Bold'),
+    ('BACKGROUND', (0,-1), (-1,-1), colors.whitesmoke),
+    ('FONTSIZE', (0,0), (-1,-1), 7),
+    ('ALIGN', (3,0), (-1,-1), 'RIGHT'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('GRID', (0,0), (-1,-1), 0.25, colors.black),
+    ('TOPPADDING', (0,0), (-1,-1), 1),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 1),
+])
+
+
+def _stmt_amount(value):
+    if value is None or value == "": return ""
+    return _fmt_rupee(value).replace("₹", "").strip()
+
+
+def statement_pdf_name(subsidiary):
+    safe_name = "".join(c for c in subsidiary if c.isalnum() or c in " -_").strip()
+    return f"Statement_{safe_name}_{datetime.now().strftime('%d-%m-%Y')}.pdf"
+
+
+def generate_statement_pdf(subsidiary, opening_balance, entries, filename=None, title=None):
+    """
+    Department statement: every allocation and PPA with a running balance.
+    `entries` (LedgerEntry rows, oldest first) is read one page at a time and
+    each page is drawn straight onto the canvas, so memory does not grow with
+    the number of rows. Every page repeats the column headers and starts/ends
+    with the brought/carried forward totals.
+    """
+    filename = filename or statement_pdf_name(subsidiary)
+    title = title or f"Statement of Account - {subsidiary}"
+
+    try:
+        c = canvas.Canvas(filename, pagesize=A4, pageCompression=1)
+        width, height = A4
+        usable = height - _STMT_TOP - 2 * _STMT_MARGIN
+        per_page = int(usable // _STMT_ROW_HEIGHT) - 3  # Header, b/f and c/f rows
+        generated = datetime.now().strftime("%d-%m-%Y %H:%M %p")
+
+        entries = iter(entries)
+        balance = opening_balance
+        alloc_total = exp_total = 0
+        page_no = 0
+        # One row of look-ahead tells whether this is the last page
+        pending = list(islice(entries, per_page + 1))
+        while True:
+            chunk, pending = pending[:per_page], pending[per_page:]
+            pending += islice(entries, per_page + 1 - len(pending))
+            last_page = not pending
+            page_no += 1
+            if page_no == 1:
+                brought = ["", "Opening Balance", "", "", "", _stmt_amount(balance)]
+            else:
+                brought = ["", "Brought Forward", "", _stmt_amount(alloc_total), _stmt_amount(exp_total), _stmt_amount(balance)]
+            table_data = [_STMT_HEADER, brought]
+
+            for entry in chunk:
+                amt = entry.amount if isinstance(entry.amount, (int, float)) else 0
+                if entry.type == TYPE_ALLOC:
+                    alloc_total += amt
+                    balance += amt
+                    cols = [_stmt_amount(entry.amount), ""]
+                else:
+                    exp_total += amt
+                    balance -= amt
+                    cols = ["", _stmt_amount(entry.amount)]
+                dt = entry.date.strftime("%d-%m-%Y") if isinstance(entry.date, datetime) else str(entry.date or "")
+                particulars = "Allocation" if entry.type == TYPE_ALLOC else "PPA"
+                table_data.append([dt, particulars, str(entry.reference or "")] + cols + [_stmt_amount(balance)])
+            label = "Closing Balance" if last_page else "Carried Forward"
+            table_data.append(["", label, "", _stmt_amount(alloc_total), _stmt_amount(exp_total), _stmt_amount(balance)])
+
+            # Title block
+            c.setFont("Helvetica-Bold", 13)
+            c.drawCentredString(width / 2, height - _STMT_MARGIN - 10, title)
+            c.setFont("Helvetica", 8)
+            c.drawString(_STMT_MARGIN, height - _STMT_MARGIN - 30, f"Generated on: {generated}")
+            c.drawRightString(width - _STMT_MARGIN, height - _STMT_MARGIN - 30, f"Page {page_no}")
+
+            t = Table(table_data, colWidths=_STMT_WIDTHS, rowHeights=_STMT_ROW_HEIGHT)
+            t.setStyle(_STMT_STYLE)
+            _, t_height = t.wrapOn(c, width - 2 * _STMT_MARGIN, usable)
+            t.drawOn(c, _STMT_MARGIN, height - _STMT_MARGIN - _STMT_TOP - t_height)
+            c.showPage()
+            if last_page: break
+
+        c.save()
+        return True, os.path.abspath(filename)
+    except Exception as e: return False, str(e)
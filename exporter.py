@@ -0,0 +1,142 @@
+import os
+import csv
+import json
+import argparse
+from datetime import datetime
+from config import Config
+from fiscal import get_calendar
+import ledger
+from doc_gen import write_ledger_xlsx
+
+# Parquet / Arrow output is only available when pyarrow is installed.
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.ipc as pa_ipc
+except ImportError:
+    pa = None
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet", "arrow", "xlsx")
+_EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".json": "jsonl",
+               ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow", ".xlsx": "xlsx"}
+
+
+def _fmt_date(value):
+    if isinstance(value, datetime): return value.strftime("%Y-%m-%d")
+    return "" if value is None else str(value)
+
+
+# --- WRITERS (each consumes the row generator and returns the row count) ---
+def _write_csv(rows, dest):
+    count = 0
+    with open(dest, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(ledger.LEDGER_FIELDS)
+        for sub_name, ref, date_val, amt, row_type, sheet in rows:
+            writer.writerow((sub_name, ref, _fmt_date(date_val), amt, row_type, sheet))
+            count += 1
+    return count
+
+
+def _write_jsonl(rows, dest):
+    count = 0
+    with open(dest, "w", encoding="utf-8") as f:
+        for sub_name, ref, date_val, amt, row_type, sheet in rows:
+            record = {"department": sub_name, "reference": ref, "date": _fmt_date(date_val) or None,
+                      "amount": amt, "type": row_type, "sheet": sheet}
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def _arrow_schema():
+    return pa.schema([
+        ("department", pa.string()),
+        ("reference", pa.string()),
+        ("date", pa.timestamp("s")),
+        ("amount", pa.float64()),
+        ("type", pa.string()),
+        ("sheet", pa.string()),
+    ])
+
+
+def _iter_record_batches(rows, schema):
+    """Groups rows into fixed-size Arrow record batches so only one batch is ever held."""
+    size = Config.EXPORT_BATCH_ROWS
+    cols = [[] for _ in ledger.LEDGER_FIELDS]
+    for sub_name, ref, date_val, amt, row_type, sheet in rows:
+        cols[0].append(str(sub_name))
+        cols[1].append(ref)
+        cols[2].append(date_val if isinstance(date_val, datetime) else None)
+        cols[3].append(float(amt) if isinstance(amt, (int, float)) else None)
+        cols[4].append(row_type)
+        cols[5].append(sheet)
+        if len(cols[0]) >= size:
+            yield pa.RecordBatch.from_arrays([pa.array(c, type=f.type) for c, f in zip(cols, schema)], schema=schema)
+            cols = [[] for _ in ledger.LEDGER_FIELDS]
+    if cols[0]:
+        yield pa.RecordBatch.from_arrays([pa.array(c, type=f.type) for c, f in zip(cols, schema)], schema=schema)
+
+
+def _write_parquet(rows, dest):
+    schema = _arrow_schema()
+    count = 0
+    with pq.ParquetWriter(dest, schema) as writer:
+        for batch in _iter_record_batches(rows, schema):
+            writer.write_batch(batch)
+            count += batch.num_rows
+    return count
+
+
+def _write_arrow(rows, dest):
+    schema = _arrow_schema()
+    count = 0
+    with pa.OSFile(dest, "wb") as sink, pa_ipc.new_file(sink, schema) as writer:
+        for batch in _iter_record_batches(rows, schema):
+            writer.write_batch(batch)
+            count += batch.num_rows
+    return count
+
+
+_WRITERS = {"csv": _write_csv, "jsonl": _write_jsonl, "parquet": _write_parquet, "arrow": _write_arrow,
+            "xlsx": write_ledger_xlsx}
+
+
+def detect_format(dest):
+    return _EXTENSIONS.get(os.path.splitext(dest)[1].lower())
+
+
+def export_ledger(dest, fmt=None, path=None, subsidiary=None, ppa_text=None, quarter=None):
+    """
+    Streams every allocation and transaction (all FYs) from the ledger into `dest`.
+    Pipeline: read_only workbook -> ledger rows -> search filter -> writer.
+    """
+    fmt = fmt or detect_format(dest)
+    if fmt not in _WRITERS: return False, f"Unsupported export format: {fmt}"
+    if fmt in ("parquet", "arrow") and pa is None:
+        return False, "Parquet/Arrow export needs the 'pyarrow' package."
+    source = ledger.iter_ledger_files(path)
+    try:
+        rows = source
+        if subsidiary or ppa_text or quarter:
+            rows = ledger.filter_rows(rows, subsidiary, ppa_text, quarter)
+        count = _WRITERS[fmt](rows, dest)
+    except PermissionError: return False, "Error: File open."
+    except Exception as e: return False, f"Error: {e}"
+    finally: source.close()
+    return True, f"Exported {count} rows to {os.path.abspath(dest)}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the ledger in long format.")
+    parser.add_argument("dest", help="Output file (.csv, .jsonl, .parquet, .arrow)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS)
+    parser.add_argument("--db", default=Config.DB_FILENAME, help="Ledger workbook")
+    parser.add_argument("--department")
+    parser.add_argument("--ppa")
+    parser.add_argument("--quarter", choices=get_calendar().period_names())
+    args = parser.parse_args()
+    ok, msg = export_ledger(args.dest, args.format, args.db, args.department, args.ppa, args.quarter)
+    print(msg)
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,100 @@
+import calendar
+from datetime import datetime
+import numpy as np
+from config import Config
+
+# --- REPORTING PERIODS ---
+PERIOD_MONTH = "month"
+PERIOD_QUARTER = "quarter"
+PERIOD_HALF = "half"
+
+# Months covered by one bucket of each period type
+_PERIOD_MONTHS = {PERIOD_MONTH: 1, PERIOD_QUARTER: 3, PERIOD_HALF: 6}
+_PERIOD_PREFIX = {PERIOD_QUARTER: "Q", PERIOD_HALF: "H"}
+
+
+class FiscalCalendar:
+    """
+    Maps dates to fiscal years and to month / quarter / half-year buckets.
+    The year starts on the 1st of `start_month` (Config.FY_START_MONTH, April by default).
+    """
+    def __init__(self, start_month=None):
+        self.start_month = start_month or Config.FY_START_MONTH
+
+    # --- SCALAR HELPERS ---
+    def fy_start_year(self, date_obj):
+        return date_obj.year if date_obj.month >= self.start_month else date_obj.year - 1
+
+    def fy_start(self, date_obj):
+        return datetime(self.fy_start_year(date_obj), self.start_month, 1)
+
+    def sheet_name_for_date(self, date_obj):
+        """Format: Transactions_YYYY_YY (e.g., Transactions_2026_27)"""
+        return f"{Config.TXN_PREFIX}{self.fy_label(self.fy_start_year(date_obj), '_')}"
+
+    def fy_label(self, start_year, sep="-"):
+        """Year as written in sheet names and reports, e.g. '2026-27'."""
+        end_year = start_year + 1 if self.start_month > 1 else start_year
+        return f"{start_year}{sep}{str(end_year)[-2:]}"
+
+    def period_index(self, date_obj, period=PERIOD_QUARTER):
+        return ((date_obj.month - self.start_month) % 12) // _PERIOD_MONTHS[period]
+
+    def period_name(self, date_obj, period=PERIOD_QUARTER):
+        return self.period_names(period)[self.period_index(date_obj, period)]
+
+    # --- LABELS ---
+    def num_periods(self, period=PERIOD_QUARTER):
+        return 12 // _PERIOD_MONTHS[period]
+
+    def _month_abbr(self, offset):
+        return calendar.month_abbr[(self.start_month - 1 + offset) % 12 + 1]
+
+    def period_names(self, period=PERIOD_QUARTER):
+        """Short names: Q1..Q4, H1..H2 or month abbreviations in fiscal order."""
+        if period == PERIOD_MONTH:
+            return [self._month_abbr(i) for i in range(12)]
+        return [f"{_PERIOD_PREFIX[period]}{i+1}" for i in range(self.num_periods(period))]
+
+    def period_labels(self, period=PERIOD_QUARTER):
+        """Names with month ranges for headings, e.g. 'Q1 (Apr-Jun)'."""
+        size = _PERIOD_MONTHS[period]
+        if size == 1: return self.period_names(period)
+        return [f"{name} ({self._month_abbr(i*size)}-{self._month_abbr(i*size + size - 1)})"
+                for i, name in enumerate(self.period_names(period))]
+
+    # --- VECTORIZED BUCKETING ---
+    def split(self, dates):
+        """
+        Splits an array of dates into (fiscal start year, month offset within the year).
+        Accepts datetime64 arrays or any sequence of datetime objects.
+        """
+        months = np.asarray(dates, dtype="datetime64[M]").astype(np.int64)
+        shifted = months - (self.start_month - 1)
+        return shifted // 12 + 1970, shifted % 12
+
+    def bucket(self, dates, period=PERIOD_QUARTER):
+        """Returns (fiscal start year, bucket index) arrays for every date in one pass."""
+        fy_year, offset = self.split(dates)
+        return fy_year, offset // _PERIOD_MONTHS[period]
+
+    def totals(self, keys, dates, amounts, num_keys, period=PERIOD_QUARTER):
+        """
+        Sums `amounts` into a (num_keys x num_periods) matrix, where `keys` is an
+        integer row index per entry (e.g. department number).
+        """
+        n = self.num_periods(period)
+        if len(amounts) == 0: return np.zeros((num_keys, n))
+        _, idx = self.bucket(dates, period)
+        flat = np.asarray(keys, dtype=np.int64) * n + idx
+        return np.bincount(flat, weights=np.asarray(amounts, dtype=np.float64), minlength=num_keys * n).reshape(num_keys, n)
+
+
+_calendars = {}
+
+def get_calendar():
+    """The calendar configured through Config.FY_START_MONTH (cached)."""
+    start_month = Config.FY_START_MONTH
+    if start_month not in _calendars:
+        _calendars[start_month] = FiscalCalendar(start_month)
+    return _calendars[start_month]
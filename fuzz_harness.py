@@ -0,0 +1,532 @@
+import os
+import time
+import random
+import shutil
+import string
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+import openpyxl
+from config import Config
+from fiscal import get_calendar, PERIOD_QUARTER, PERIOD_HALF, PERIOD_MONTH
+import ledger_cache
+import shards
+import xlsx_styles
+from backend import BookkeepingSystem
+
+# --- DIFFERENTIAL FUZZ HARNESS ---
+# Every cache, index and alternate reader behind BookkeepingSystem must give
+# the same figures as reading the workbook cell by cell. This builds random
+# ledgers (several FYs, allocations, departments missing from Limits, dates
+# in the wrong FY, text in date/amount cells), changes them step by step
+# (save_batch, save_allocation_batch, edits made directly to the file as in
+# Excel) and after every step compares get_summary_report (all periods),
+# get_detailed_report_data and search_transactions against the reference
+# below on each fast path, timing both.
+# Usage: python fuzz_harness.py [--seed 1] [--rounds 20] [--ops 12] [--rows 200]
+
+_PERIOD_MONTHS = {PERIOD_QUARTER: 3, PERIOD_HALF: 6, PERIOD_MONTH: 1}
+_PPA_CHARS = string.ascii_uppercase + string.digits
+OUTPUTS = ("summary", "detailed", "search")
+_TIGHT_BUDGET_MB = 0.01     # Every year but the current one unloaded after each read
+_COLUMNS = ("open",) + OUTPUTS
+
+
+# --- REFERENCE: CELL BY CELL ---
+# The report logic as originally written against openpyxl: every call loads
+# the whole workbook and walks the cells. No cache, no parsed columns.
+def _fy_start(now):
+    m = Config.FY_START_MONTH
+    return datetime(now.year if now.month >= m else now.year - 1, m, 1)
+
+
+def _bucket(date_val, period=PERIOD_QUARTER):
+    return ((date_val.month - Config.FY_START_MONTH) % 12) // _PERIOD_MONTHS[period]
+
+
+def _load_sheets(db_path):
+    """{sheet name: worksheet} over the main workbook and any per-year files."""
+    sheets = {}
+    for i, path in enumerate(shards.ledger_files(db_path)):
+        wb = openpyxl.load_workbook(path, data_only=True)
+        for ws in wb.worksheets:
+            if i and not ws.title.startswith(Config.TXN_PREFIX): continue
+            sheets.setdefault(ws.title, ws)
+    return sheets
+
+
+def _limit(value):
+    return int(value) if isinstance(value, (int, float)) else 0
+
+
+def reference_summary(db_path, period=PERIOD_QUARTER):
+    try: sheets = _load_sheets(db_path)
+    except Exception: return []
+    active_sheet = get_calendar().sheet_name_for_date(datetime.now())
+    if active_sheet not in sheets or Config.SHEET_LIMITS not in sheets: return []
+    ws, ws_limits = sheets[active_sheet], sheets[Config.SHEET_LIMITS]
+
+    sub_col_map = {}
+    for col in range(1, ws.max_column + 2):
+        val = ws.cell(row=1, column=col).value
+        if val: sub_col_map[val] = col
+
+    summary_data = []
+    for r in range(2, ws_limits.max_row + 1):
+        sub_name = ws_limits.cell(row=r, column=1).value
+        if not sub_name: continue
+        limit = _limit(ws_limits.cell(row=r, column=2).value)
+        buckets = [0] * (12 // _PERIOD_MONTHS[period])
+        if sub_name in sub_col_map:
+            col_date = sub_col_map[sub_name] + 1
+            col_amt = sub_col_map[sub_name] + 2
+            for row in range(3, ws.max_row + 1):
+                amt = ws.cell(row=row, column=col_amt).value
+                dt = ws.cell(row=row, column=col_date).value
+                if isinstance(amt, (int, float)) and isinstance(dt, datetime):
+                    buckets[_bucket(dt, period)] += amt
+        total_spent = sum(buckets)
+        summary_data.append((sub_name, limit, *buckets, total_spent, limit - total_spent))
+    return summary_data
+
+
+def reference_detailed(db_path):
+    try:
+        sheets = _load_sheets(db_path)
+        ws_limits = sheets[Config.SHEET_LIMITS]
+    except Exception: return []
+    fy_start = _fy_start(datetime.now())
+
+    past_spent, q_exp = {}, {}
+    for sheet_name, ws in sheets.items():
+        if not sheet_name.startswith(Config.TXN_PREFIX): continue
+        for col in range(1, ws.max_column + 1):
+            dept_name = ws.cell(row=1, column=col).value
+            if not dept_name: continue
+            past_spent.setdefault(dept_name, 0)
+            q_exp.setdefault(dept_name, [0, 0, 0, 0])
+            for r in range(3, ws.max_row + 1):
+                d_val = ws.cell(row=r, column=col + 1).value
+                a_val = ws.cell(row=r, column=col + 2).value
+                if isinstance(d_val, datetime) and isinstance(a_val, (int, float)):
+                    if d_val < fy_start: past_spent[dept_name] += a_val
+                    else: q_exp[dept_name][_bucket(d_val)] += a_val
+
+    detailed_data = []
+    for r in range(2, ws_limits.max_row + 1):
+        sub_name = ws_limits.cell(row=r, column=1).value
+        if not sub_name: continue
+        grand_total = _limit(ws_limits.cell(row=r, column=2).value)
+        q_alloc = [0, 0, 0, 0]
+        for col in range(3, ws_limits.max_column + 1, 2):
+            amt = ws_limits.cell(row=r, column=col).value
+            dt = ws_limits.cell(row=r, column=col + 1).value
+            if isinstance(amt, (int, float)) and isinstance(dt, datetime) and dt >= fy_start:
+                q_alloc[_bucket(dt)] += amt
+
+        balance = grand_total - sum(q_alloc) - past_spent.get(sub_name, 0)
+        row_tuple = [sub_name, balance]
+        for q, spent in enumerate(q_exp.get(sub_name, [0, 0, 0, 0])):
+            balance = balance + q_alloc[q] - spent
+            row_tuple += [q_alloc[q], spent, balance]
+        detailed_data.append(tuple(row_tuple))
+    return detailed_data
+
+
+def _in_quarter(date_val, quarter):
+    if not quarter or quarter == "All": return True
+    return isinstance(date_val, datetime) and f"Q{_bucket(date_val) + 1}" == quarter
+
+
+def reference_search(db_path, subsidiary=None, ppa_text=None, quarter=None):
+    try: sheets = _load_sheets(db_path)
+    except Exception: return []
+    wanted = lambda name: not subsidiary or subsidiary == "All Departments" or name == subsidiary
+    results = []
+
+    ws_limits = sheets.get(Config.SHEET_LIMITS)
+    for r in range(2, ws_limits.max_row + 1) if ws_limits else ():
+        sub_name = ws_limits.cell(row=r, column=1).value
+        if not sub_name or not wanted(sub_name): continue
+        for col in range(3, ws_limits.max_column + 1, 2):
+            amt = ws_limits.cell(row=r, column=col).value
+            date_val = ws_limits.cell(row=r, column=col + 1).value
+            # The PPA text filter does not apply to allocations
+            if isinstance(amt, (int, float)) and isinstance(date_val, datetime) and _in_quarter(date_val, quarter):
+                results.append((sub_name, f"Allocation ({(col - 1) // 2})", date_val, amt))
+
+    ws = sheets.get(get_calendar().sheet_name_for_date(datetime.now()))
+    for col in range(1, ws.max_column + 1, 3) if ws else ():
+        sub_name = ws.cell(row=1, column=col).value
+        if not sub_name or not wanted(sub_name): continue
+        for r in range(3, ws.max_row + 1):
+            ppa = ws.cell(row=r, column=col).value
+            date_val = ws.cell(row=r, column=col + 1).value
+            amt = ws.cell(row=r, column=col + 2).value
+            if not ppa: continue
+            if ppa_text and str(ppa_text).upper() not in str(ppa).upper(): continue
+            if not _in_quarter(date_val, quarter): continue
+            results.append((sub_name, str(ppa), date_val, amt))
+
+    # Newest first; entries without a real date last, in ledger order
+    results.sort(key=lambda x: (True, x[2]) if isinstance(x[2], datetime) else (False, datetime.min), reverse=True)
+    return results
+
+
+# --- RANDOM LEDGERS ---
+def _ppa(rng):
+    return "".join(rng.choice(_PPA_CHARS) for _ in range(13))
+
+
+def _amount(rng):
+    # Whole rupees, some with quarter paise: binary-exact, so sums do not depend on order
+    amt = rng.randint(1, 50000)
+    return amt + rng.choice((0.25, 0.5, 0.75)) if rng.random() < 0.15 else amt
+
+
+def _date_in_fy(rng, start_year):
+    start = datetime(start_year, Config.FY_START_MONTH, 1)
+    date_val = start + timedelta(days=rng.randrange(365))
+    return date_val + timedelta(hours=rng.randrange(24)) if rng.random() < 0.1 else date_val
+
+
+def _odd_date(rng, fy_year):
+    """A date cell as clerks leave them: wrong FY, typed as text, or blank."""
+    return rng.choice((_date_in_fy(rng, fy_year + rng.choice((-2, -1, 1))),
+                       _date_in_fy(rng, fy_year).strftime("%d-%m-%Y"), None))
+
+
+def _odd_amount(rng):
+    return rng.choice((f"{rng.randint(1, 9)},{rng.randint(100, 999)}", "NIL", None))
+
+
+def _add_department(ws, sub_name):
+    """Adds a department's three columns at the first free header position (as the app does)."""
+    col = 1
+    while ws.cell(row=1, column=col).value is not None: col += 3
+    ws.merge_cells(start_row=1, start_column=col, end_row=1, end_column=col + 2)
+    ws.cell(row=1, column=col, value=sub_name).style = xlsx_styles.HEADER
+    for i, caption in enumerate(("PPA_Number", "Date", "Amount")):
+        ws.cell(row=2, column=col + i, value=caption).style = xlsx_styles.HEADER
+    return col
+
+
+def _fill_rows(rng, ws, col, fy_year, count, first_row=3):
+    for r in range(first_row, first_row + count):
+        odd = rng.random()
+        ws.cell(row=r, column=col, value=None if odd < 0.05 else _ppa(rng))
+        ws.cell(row=r, column=col + 1, value=_odd_date(rng, fy_year) if odd > 0.9 else _date_in_fy(rng, fy_year))
+        ws.cell(row=r, column=col + 2, value=_odd_amount(rng) if 0.05 < odd < 0.09 else _amount(rng))
+
+
+def make_ledger(path, rng, rows):
+    """A random ledger: Limits plus the current and up to three earlier FY sheets."""
+    cal = get_calendar()
+    this_year = cal.fy_start_year(datetime.now())
+    wb = openpyxl.Workbook()
+    xlsx_styles.use_styles(wb)
+    ws_limits = wb.active
+    ws_limits.title = Config.SHEET_LIMITS
+    ws_limits.append(["Department", "Previous_balance"])
+
+    depts = [f"DEPT {i}" for i in range(rng.randint(2, 7))]
+    for sub_name in depts:
+        row = [sub_name, rng.choice((rng.randint(10 ** 6, 10 ** 8),) * 8 + (None, "TBD"))]
+        for _ in range(rng.randint(0, 4)):
+            row += [_amount(rng), rng.choice((_date_in_fy(rng, this_year), _date_in_fy(rng, this_year - 1),
+                                              _date_in_fy(rng, this_year).strftime("%d/%m/%Y"), None))]
+        ws_limits.append(row)
+
+    for year in range(this_year - rng.randint(0, 3), this_year + 1):
+        ws = wb.create_sheet(cal.sheet_name_for_date(datetime(year, Config.FY_START_MONTH, 1)))
+        names = rng.sample(depts, rng.randint(1, len(depts)))
+        if rng.random() < 0.4: names.append(f"UNLISTED {year}")    # Not in Limits
+        for sub_name in names:
+            _fill_rows(rng, ws, _add_department(ws, sub_name), year, rng.randint(0, rows))
+    wb.save(path)
+    return depts
+
+
+# --- OPERATIONS ---
+def _touch(path, stat_before):
+    # The cache detects edits by (mtime, size); Excel saves are seconds apart, these are not
+    st = os.stat(path)
+    if stat_before and (st.st_mtime_ns, st.st_size) == stat_before:
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000))
+
+
+def op_batch(rng, system, depts):
+    sub_name = rng.choice(depts)
+    this_year = get_calendar().fy_start_year(datetime.now())
+    year = this_year if rng.random() < 0.75 else this_year - 1
+    batch = [(_ppa(rng), _date_in_fy(rng, year), rng.randint(1, 20000)) for _ in range(rng.randint(1, 5))]
+    if rng.random() < 0.2:
+        # Cross-FY batch: everything goes to the first entry's sheet
+        batch.append((_ppa(rng), _date_in_fy(rng, year + rng.choice((-1, 1))), rng.randint(1, 20000)))
+    if rng.random() < 0.1: batch.append(batch[0])     # Duplicate: must be refused
+    ok, msg = system.save_batch(sub_name, batch)
+    return f"save_batch {sub_name} x{len(batch)}: {msg.splitlines()[0]}"
+
+
+def op_allocation(rng, system, depts):
+    if rng.random() < 0.2: depts.append(f"DEPT {len(depts)}")     # Allocation to a new department
+    sub_name = rng.choice(depts)
+    this_year = get_calendar().fy_start_year(datetime.now())
+    batch = [(None, _date_in_fy(rng, rng.choice((this_year, this_year, this_year - 1))), rng.randint(1000, 10 ** 6))
+             for _ in range(rng.randint(1, 2))]
+    ok, msg = system.save_allocation_batch(sub_name, batch)
+    return f"save_allocation_batch {sub_name} x{len(batch)}: {msg}"
+
+
+def op_hand_edit(rng, system, depts):
+    """Changes the file directly, the way an edit in Excel would."""
+    db_path = system.db_path
+    cal = get_calendar()
+    snap = system.snapshot()
+    txn_sheets = [n for n in snap.sheet_names if n.startswith(Config.TXN_PREFIX)]
+    kind = rng.choice(("cell", "cell", "cell", "department", "amount only", "limit", "allocation", "new year"))
+    if not txn_sheets and kind != "new year": kind = "limit"
+    if kind in ("limit", "allocation"): sheet_name = Config.SHEET_LIMITS
+    elif kind == "new year":
+        sheet_name = cal.sheet_name_for_date(datetime(cal.fy_start_year(datetime.now()) - 4 - rng.randrange(3),
+                                                      Config.FY_START_MONTH, 1))
+        if sheet_name in snap.sheet_names: kind, sheet_name = "cell", rng.choice(txn_sheets)
+    else: sheet_name = rng.choice(txn_sheets)
+
+    wb, path = shards.open_sheet_book(db_path, sheet_name)
+    st = os.stat(path) if os.path.exists(path) else None
+    xlsx_styles.use_styles(wb)
+    ws = wb[sheet_name] if sheet_name in wb.sheetnames else wb.create_sheet(sheet_name)
+    fy_year = int(sheet_name[len(Config.TXN_PREFIX):][:4]) if sheet_name != Config.SHEET_LIMITS else 0
+    heads = [c for c in range(1, ws.max_column + 1, 3) if ws.cell(row=1, column=c).value]
+
+    if kind == "limit":
+        r = rng.randint(2, max(2, ws.max_row))
+        ws.cell(row=r, column=2, value=rng.choice((rng.randint(10 ** 5, 10 ** 8), "TBD", None)))
+        what = f"Limits!B{r}"
+    elif kind == "allocation":
+        r = rng.randint(2, max(2, ws.max_row))
+        col = 3 + 2 * rng.randrange(3)
+        this_year = cal.fy_start_year(datetime.now())
+        ws.cell(row=r, column=col, value=rng.choice((_amount(rng), _odd_amount(rng))))
+        ws.cell(row=r, column=col + 1, value=rng.choice((_date_in_fy(rng, this_year), _odd_date(rng, this_year))))
+        what = f"Limits row {r} col {col}"
+    elif kind in ("department", "new year") or not heads:
+        sub_name = rng.choice(depts + [f"UNLISTED {rng.randrange(100)}"])
+        names = {ws.cell(row=1, column=c).value for c in heads}
+        if sub_name in names: sub_name = f"UNLISTED {len(names)}-{rng.randrange(1000)}"
+        _fill_rows(rng, ws, _add_department(ws, sub_name), fy_year, rng.randint(1, 30))
+        what = f"{sub_name} added"
+    elif kind == "amount only":
+        col = rng.choice(heads)
+        r = max(3, ws.max_row + 1)
+        ws.cell(row=r, column=col + 1, value=rng.choice((_date_in_fy(rng, fy_year), None)))
+        ws.cell(row=r, column=col + 2, value=_amount(rng))
+        what = f"row {r} col {col} without PPA"
+    else:
+        col = rng.choice(heads) + rng.randrange(3)
+        r = rng.randint(3, max(3, ws.max_row))
+        value = {0: lambda: rng.choice((_ppa(rng), None, 12345)),
+                 1: lambda: rng.choice((_date_in_fy(rng, fy_year), _odd_date(rng, fy_year))),
+                 2: lambda: rng.choice((_amount(rng), _odd_amount(rng)))}[(col - 1) % 3]()
+        ws.cell(row=r, column=col, value=value)
+        what = f"cell r{r} c{col} = {value!r}"
+    wb.save(path)
+    _touch(path, (st.st_mtime_ns, st.st_size) if st else None)
+    return f"edit {sheet_name}: {what}"
+
+
+OPERATIONS = (op_batch, op_batch, op_batch, op_allocation, op_hand_edit, op_hand_edit)
+
+
+# --- COMPARISON ---
+def _search_args(rng, depts):
+    args = [dict(), dict(quarter=rng.choice(("Q1", "Q2", "Q3", "Q4"))), dict(subsidiary=rng.choice(depts))]
+    args.append(dict(subsidiary=rng.choice(depts + ["All Departments"]), quarter=rng.choice(("All", "Q1", "Q4")),
+                     ppa_text=rng.choice(_PPA_CHARS) + rng.choice(("", rng.choice(_PPA_CHARS)))))
+    return args
+
+
+def _reference(db_path, search_args):
+    return {"summary": lambda: [reference_summary(db_path, p) for p in _PERIOD_MONTHS],
+            "detailed": lambda: reference_detailed(db_path),
+            "search": lambda: [reference_search(db_path, **a) for a in search_args]}
+
+
+def _fast(system, search_args, snap=None):
+    return {"summary": lambda: [[tuple(r) for r in system.get_summary_report(p, snap=snap)] for p in _PERIOD_MONTHS],
+            "detailed": lambda: [tuple(r) for r in system.get_detailed_report_data(snap)],
+            "search": lambda: [[tuple(r)[:4] for r in system.search_transactions(snap=snap, **a)]
+                               for a in search_args]}
+
+
+def _run(outputs, timings):
+    results = {}
+    for name, fn in outputs.items():
+        t = time.perf_counter()
+        results[name] = fn()
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - t
+    return results
+
+
+def _first_difference(expected, got, where=""):
+    for i, (a, b) in enumerate(zip(expected, got)):
+        if a == b: continue
+        if isinstance(a, list) and isinstance(b, list): return _first_difference(a, b, f"{where}[{i}]")
+        return f"{where}[{i}]: expected {a!r}, got {b!r}"
+    return f"{where} length: expected {len(expected)}, got {len(got)}"
+
+
+def _parallel_system(db_path):
+    workers, min_mb = Config.PARSE_WORKERS, Config.PARALLEL_PARSE_MIN_MB
+    Config.PARSE_WORKERS, Config.PARALLEL_PARSE_MIN_MB = 2, 0
+    try:
+        system = BookkeepingSystem(db_path, create=False)
+        system.snapshot().columns()     # Every sheet parsed in the pool now, while forced
+        return system
+    finally: Config.PARSE_WORKERS, Config.PARALLEL_PARSE_MIN_MB = workers, min_mb
+
+
+def run_round(seed, ops, rows, fy_starts, timings, keep=False):
+    """
+    One random ledger and `ops` operations on it, checked after every step.
+    Returns a list of mismatch descriptions (empty when every path agreed).
+    """
+    rng = random.Random(seed)
+    Config.FY_START_MONTH = rng.choice(fy_starts)
+    folder = tempfile.mkdtemp(prefix=f"fuzz_{seed}_")
+    db_path = os.path.join(folder, Config.DB_FILENAME)
+    depts = make_ledger(db_path, rng, rows)
+    log = [f"seed {seed}: FY from month {Config.FY_START_MONTH}, departments {depts}"]
+    if rng.random() < 0.3:
+        shards.split(db_path)
+        log.append("split by year")
+
+    failures = []
+    system = BookkeepingSystem(db_path)     # Kept across steps: commits, report cache, carry-over
+    tight = BookkeepingSystem(db_path)      # Also kept, sees the saves as outside edits; unloads and reloads years
+    held, held_expected, held_args = None, None, None
+    for step in range(ops + 1):
+        if step:
+            op = rng.choice(OPERATIONS)
+            try: log.append(op(rng, system, depts))
+            except Exception as e: failures.append(f"{op.__name__} at step {step} raised {e!r}")
+        search_args = _search_args(rng, depts)
+        expected = _run(_reference(db_path, search_args), timings.setdefault("reference (cells)", {}))
+
+        budget = Config.CACHE_BUDGET_MB
+        paths = [("warm (after commits)", lambda: system, None, budget),
+                 ("cold (no caches)", lambda: BookkeepingSystem(db_path, create=False), None, budget),
+                 ("parse cache (disk)", lambda: BookkeepingSystem(db_path), None, budget),
+                 ("parallel parse", lambda: _parallel_system(db_path), None, budget),
+                 ("tight memory budget", lambda: tight, None, _TIGHT_BUDGET_MB)]
+        if held is not None:
+            paths.append(("held snapshot", lambda: system, held, budget))
+        for label, make, snap, budget_mb in paths:
+            Config.CACHE_BUDGET_MB = budget_mb
+            args = held_args if snap is not None else search_args
+            want = held_expected if snap is not None else expected
+            t = time.perf_counter()
+            path_system = make()
+            timing = timings.setdefault(label, {})
+            timing["open"] = timing.get("open", 0.0) + time.perf_counter() - t
+            got = _run(_fast(path_system, args, snap), timing)
+            for name in OUTPUTS:
+                if got[name] != want[name]:
+                    failures.append(f"{label} / {name} after step {step}: {_first_difference(want[name], got[name])}")
+        Config.CACHE_BUDGET_MB = budget
+        # A snapshot taken now must still give these results after the next step
+        held, held_expected, held_args = system.snapshot(), expected, search_args
+
+    mem = tight.cache.memory_status()
+    log.append(f"tight budget: {mem['evictions']} unloads, {mem['reloads']} reloads")
+    if failures:
+        failures.insert(0, "\n  ".join(log + [f"ledger kept in {folder}"]))
+    elif not keep:
+        shutil.rmtree(folder, ignore_errors=True)
+    return failures
+
+
+def check_layout_rollback(seed, rows):
+    """
+    shards.split and shards.merge with data.xlsx refusing to be replaced (open
+    in Excel): the ledger must stay as it was, in its old layout, with no
+    temporary files left and the same figures. Returns a list of failures.
+    """
+    rng = random.Random(seed)
+    folder = tempfile.mkdtemp(prefix=f"fuzz_layout_{seed}_")
+    db_path = os.path.join(folder, Config.DB_FILENAME)
+    search_args = _search_args(rng, make_ledger(db_path, rng, rows))
+    expected = _run(_reference(db_path, search_args), {})
+
+    replace = os.replace
+    def locked_replace(src, dst):
+        if os.path.abspath(dst) == os.path.abspath(db_path): raise PermissionError(13, "File open", dst)
+        return replace(src, dst)
+
+    failures = []
+    for action, sharded in ((shards.split, False), (shards.merge, True)):
+        if sharded: shards.split(db_path)
+        files_before = sorted(os.listdir(folder))
+        sheets_before = openpyxl.load_workbook(db_path, read_only=True).sheetnames
+        os.replace = locked_replace
+        try: ok, msg = action(db_path)
+        finally: os.replace = replace
+
+        label = f"failed {action.__name__}"
+        if ok: failures.append(f"{label} reported success: {msg}")
+        if shards.is_sharded(db_path) != sharded: failures.append(f"{label} changed the layout")
+        if sorted(os.listdir(folder)) != files_before:
+            failures.append(f"{label} left {sorted(os.listdir(folder))}, had {files_before}")
+        if openpyxl.load_workbook(db_path, read_only=True).sheetnames != sheets_before:
+            failures.append(f"{label} changed data.xlsx")
+        got = _run(_fast(BookkeepingSystem(db_path, create=False), search_args), {})
+        for name in OUTPUTS:
+            if got[name] != expected[name]:
+                failures.append(f"{label} / {name}: {_first_difference(expected[name], got[name])}")
+    if failures: failures.insert(0, f"layout rollback (seed {seed}), ledger kept in {folder}")
+    else: shutil.rmtree(folder, ignore_errors=True)
+    return failures
+
+
+def print_timings(timings):
+    base = timings.get("reference (cells)", {})
+    print(f"{'path':<22}" + "".join(f"{name:>12}" for name in _COLUMNS) + f"{'total':>12}{'speedup':>10}")
+    for label, t in timings.items():
+        total = sum(t.values())
+        speedup = sum(base.values()) / total if total else 0
+        print(f"{label:<22}" + "".join(f"{t.get(name, 0):>11.2f}s" for name in _COLUMNS) +
+              f"{total:>11.2f}s{speedup:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the cached report paths against a cell-by-cell reference.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the first round (round i uses seed + i)")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--ops", type=int, default=12, help="Operations per round, checked after each")
+    parser.add_argument("--rows", type=int, default=200, help="Most rows per department column")
+    parser.add_argument("--fy-start", type=int, nargs="+", default=[Config.FY_START_MONTH, 1, 7],
+                        help="FY start months to draw from")
+    parser.add_argument("--keep", action="store_true", help="Keep every generated ledger, not just failing ones")
+    args = parser.parse_args()
+
+    timings, failed = {}, 0
+    fy_start_month = Config.FY_START_MONTH
+    try:
+        failures = check_layout_rollback(args.seed, args.rows)
+        print(f"failed split/merge rolls back: {'OK' if not failures else 'FAILED'}")
+        for line in failures[:6]: print("  " + line)
+        failed += bool(failures)
+        for i in range(args.rounds):
+            failures = run_round(args.seed + i, args.ops, args.rows, args.fy_start, timings, args.keep)
+            print(f"round {i + 1}/{args.rounds} (seed {args.seed + i}): "
+                  f"{'OK' if not failures else f'{len(failures) - 1} MISMATCH(ES)'}")
+            for line in failures[:6]: print("  " + line)
+            failed += bool(failures)
+    finally:
+        Config.FY_START_MONTH = fy_start_month
+        for pool in ledger_cache._pools.values(): pool.shutdown()
+    print()
+    print_timings(timings)
+    print(f"\n{failed} check(s) failed." if failed else f"\nAll {args.rounds} rounds agree.")
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,94 @@
+import time
+import threading
+from datetime import datetime
+from config import Config
+
+# --- IDLE-TIME PRECOMPUTE ---
+# Between clerk actions the app does nothing, yet every view switch used to
+# build its data on demand. IdleScheduler does that work ahead of time on a
+# daemon thread: it warms the ledger cache at startup and, whenever the ledger
+# version changes (a save in the app or in Excel), rebuilds the dashboard,
+# reports, search index and the detailed PDF in that order. Everything lands
+# in the caches the views already read from, so a view switch becomes a
+# lookup. The Tk side only records input times and shows status().
+
+
+class IdleScheduler(threading.Thread):
+    """
+    Precomputes while the user is idle. Work is split into small steps (one
+    sheet, one report); before each step the thread waits until there has been
+    no key press or click for IDLE_DELAY_MS, so input never waits behind more
+    than the step already running. A newer ledger version restarts the round.
+    """
+    def __init__(self, system):
+        super().__init__(daemon=True)
+        self.system = system
+        self._stop_event = threading.Event()
+        self._wake = threading.Event()
+        self._last_input = 0.0      # monotonic time of the last key/click (0: start warming at once)
+        self._done_for = None       # (ledger version, date) of the last finished round
+        self._warm = ()             # labels of the steps finished for the current version
+        self._pending = None        # label of the step running or waiting
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+
+    def kick(self):
+        """Checks for a new ledger version now instead of at the next poll."""
+        self._wake.set()
+
+    def user_input(self, event=None):
+        # Bound to every key press and click (Tk thread): background work pauses
+        self._last_input = time.monotonic()
+
+    def is_idle(self):
+        return time.monotonic() - self._last_input >= Config.IDLE_DELAY_MS / 1000
+
+    def status(self):
+        """Status line text: what is ready and what is being prepared."""
+        text = f"Ready: {', '.join(self._warm)}" if self._warm else ""
+        if self._pending:
+            state = f"preparing {self._pending}" if self.is_idle() else f"{self._pending} paused"
+            text = f"{text}  ·  {state}" if text else state.capitalize()
+        return text
+
+    def _steps(self, snap):
+        """(label, step) pairs in the order the views are likely to need them."""
+        system = self.system
+        unloaded = set(snap.unloaded_sheets())
+        for name in snap.sheet_names:
+            # Years unloaded to save memory are read again only when a report needs them
+            if name not in unloaded: yield "ledger", lambda name=name: snap.sheet_columns([name])
+        yield "dashboard", lambda: system.get_summary_report(snap=snap)
+        yield "quarterly report", lambda: system.get_detailed_report_data(snap)
+        yield "forecast", lambda: system.get_burn_forecast(snap)
+        yield "year-over-year", lambda: system.get_year_comparison(snap=snap)
+        yield "search", lambda: (system.get_ppa_index(snap), system.search_transactions(snap=snap))
+        if Config.IDLE_PRERENDER_PDF: yield "PDF", lambda: system.prerender_detailed_pdf(snap)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            # Precompute is only an optimisation: a failed step is retried next round
+            try: self._precompute()
+            except Exception: pass
+            self._pending = None
+            self._wake.wait(Config.IDLE_POLL)
+            self._wake.clear()
+
+    def _precompute(self):
+        snap = self.system.snapshot()
+        state = (snap.version, datetime.now().date())
+        if state == self._done_for: return
+        self._warm = ()
+        for label, step in self._steps(snap):
+            if self._pending not in (None, label): self._warm += (self._pending,)
+            self._pending = label
+            while not self.is_idle():
+                if self._stop_event.wait(0.05): return
+            # Saved meanwhile: start over with the new version
+            if self.system.cache.version != snap.version: return
+            step()
+        if self._pending: self._warm += (self._pending,)
+        self._pending = None
+        self._done_for = state
@@ -0,0 +1,216 @@
+import os
+import re
+import argparse
+from collections import namedtuple
+from datetime import datetime
+import openpyxl
+from openpyxl.utils import get_column_letter
+from config import Config
+from fiscal import get_calendar
+import ledger
+import shards
+import xlsx_styles
+
+# --- LEDGER INTEGRITY CHECK ---
+# Hand edits in Excel make data.xlsx drift from what the app writes. check()
+# reads every file of the ledger once, in read_only mode (one row in memory at
+# a time plus one entry per PPA number for the duplicate test), and reports each
+# problem with its cell. Problems with an unambiguous fix carry the corrected
+# value; repair() writes those back.
+
+Issue = namedtuple("Issue", ["file", "sheet", "cell", "kind", "message", "fix"])
+
+_DATE_FORMATS = ("%d-%m-%Y", "%d/%m/%Y", "%d.%m.%Y", "%Y-%m-%d", "%d-%m-%y", "%d/%m/%y", "%d-%b-%Y", "%d %b %Y")
+_NUMBER = re.compile(r"^-?\d+(\.\d+)?$")
+
+
+def parse_date(value):
+    """datetime for a date typed as text (e.g. '05-04-2026'), else None."""
+    text = str(value).strip()
+    for fmt in _DATE_FORMATS:
+        try: return datetime.strptime(text, fmt)
+        except ValueError: continue
+    return None
+
+
+def parse_amount(value):
+    """int/float for an amount typed as text (e.g. '₹ 1,250'), else None."""
+    text = str(value).replace("₹", "").replace(",", "").strip()
+    if not _NUMBER.match(text): return None
+    number = float(text)
+    return int(number) if number.is_integer() else number
+
+
+def _get(row, idx):
+    return row[idx] if idx < len(row) else None
+
+
+def _kind(value, fixed, prefix):
+    if fixed is not None: return f"{prefix}_text"
+    return f"{prefix}_missing" if value is None else f"{prefix}_invalid"
+
+
+def _norm(name):
+    return " ".join(str(name).split()).upper()
+
+
+def _cell(col_idx, row_num):
+    return f"{get_column_letter(col_idx + 1)}{row_num}"
+
+
+class _Checker:
+    def __init__(self):
+        self.issues = []
+        self.limits = {}        # normalised name -> Limits spelling
+        self.ppas = {}          # PPA -> (file, sheet, cell) of first occurrence
+
+    def add(self, file, sheet, cell, kind, message, fix=None):
+        self.issues.append(Issue(file, sheet, cell, kind, message, fix))
+
+    def check_limits(self, path, ws):
+        name = Config.SHEET_LIMITS
+        seen = {}
+        for row_num, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+            sub_name = _get(row, 0)
+            if not sub_name: continue
+            if sub_name in seen:
+                self.add(path, name, f"A{row_num}", "duplicate_department",
+                         f"{sub_name} is listed again (first in row {seen[sub_name]}); only that row is used.")
+                continue
+            seen[sub_name] = row_num
+            self.limits.setdefault(_norm(sub_name), sub_name)
+
+            alloc_total = 0
+            for i in range(2, len(row), 2):
+                amt, date_val = row[i], _get(row, i + 1)
+                if amt is None and date_val is None: continue
+                if not isinstance(amt, (int, float)):
+                    fixed = parse_amount(amt) if amt is not None else None
+                    self.add(path, name, _cell(i, row_num), _kind(amt, fixed, "amount"),
+                             f"Allocation amount {amt!r} of {sub_name} is not a number; it is ignored.", fixed)
+                    amt = fixed
+                if isinstance(amt, (int, float)): alloc_total += amt
+                if not isinstance(date_val, datetime):
+                    fixed = parse_date(date_val) if date_val is not None else None
+                    self.add(path, name, _cell(i + 1, row_num), _kind(date_val, fixed, "date"),
+                             f"Allocation date {date_val!r} of {sub_name} is not a date.", fixed)
+
+            total = _get(row, 1)
+            if not isinstance(total, (int, float)):
+                fixed = parse_amount(total) if total is not None else None
+                self.add(path, name, f"B{row_num}", _kind(total, fixed, "limit"),
+                         f"Limit {total!r} of {sub_name} is not a number.", fixed)
+                total = fixed
+            if isinstance(total, (int, float)) and total < alloc_total:
+                self.add(path, name, f"B{row_num}", "limit_mismatch",
+                         f"Limit {total} of {sub_name} is less than its allocations ({alloc_total}); "
+                         f"Col 2 must be the opening balance plus every allocation.")
+
+    def check_txn_sheet(self, path, ws, sheet_name):
+        cal = get_calendar()
+        header = next(ws.iter_rows(max_row=1, values_only=True), None) or ()
+        dept_cols = []
+        for i, val in enumerate(header):
+            if not val: continue
+            dept_cols.append((i, val))
+            if self.limits and val not in self.limits.values():
+                match = self.limits.get(_norm(val))
+                self.add(path, sheet_name, _cell(i, 1), "department_name" if match else "department_unknown",
+                         f"Header {val!r} does not match any department in Limits.", match)
+
+        for row_num, row in enumerate(ws.iter_rows(min_row=3, values_only=True), start=3):
+            for i, sub_name in dept_cols:
+                ppa, date_val, amt = _get(row, i), _get(row, i + 1), _get(row, i + 2)
+                if ppa is None and date_val is None and amt is None: continue
+                where = _cell(i, row_num)
+                if ppa:
+                    key = str(ppa).strip().upper()
+                    first = self.ppas.setdefault(key, (path, sheet_name, where))
+                    if first != (path, sheet_name, where):
+                        self.add(path, sheet_name, where, "duplicate_ppa",
+                                 f"PPA {ppa} already entered in {first[1]}!{first[2]}.")
+                else:
+                    self.add(path, sheet_name, where, "ppa_missing", f"{sub_name}: entry without a PPA number.")
+
+                if not isinstance(date_val, datetime):
+                    fixed = parse_date(date_val) if date_val is not None else None
+                    self.add(path, sheet_name, _cell(i + 1, row_num), _kind(date_val, fixed, "date"),
+                             f"{sub_name}: date {date_val!r} is not a date.", fixed)
+                    date_val = fixed
+                if isinstance(date_val, datetime) and cal.sheet_name_for_date(date_val) != sheet_name:
+                    self.add(path, sheet_name, _cell(i + 1, row_num), "wrong_year",
+                             f"{sub_name}: {date_val:%d-%m-%Y} belongs in {cal.sheet_name_for_date(date_val)}.")
+
+                if not isinstance(amt, (int, float)):
+                    fixed = parse_amount(amt) if amt is not None else None
+                    self.add(path, sheet_name, _cell(i + 2, row_num), _kind(amt, fixed, "amount"),
+                             f"{sub_name}: amount {amt!r} is not a number; it is not counted.", fixed)
+
+
+def check(db_path=None):
+    """Every inconsistency of the ledger (all files) as a list of Issue."""
+    db_path = db_path or Config.DB_FILENAME
+    checker = _Checker()
+    for i, path in enumerate(shards.ledger_files(db_path)):
+        try: wb = ledger.open_ledger(path)
+        except Exception as e:
+            checker.add(path, "", "", "unreadable", f"Cannot open: {e}")
+            continue
+        try:
+            # Limits first (data.xlsx comes first), so headers can be compared with it
+            if i == 0 and Config.SHEET_LIMITS in wb.sheetnames:
+                checker.check_limits(path, wb[Config.SHEET_LIMITS])
+            elif i == 0:
+                checker.add(path, Config.SHEET_LIMITS, "", "limits_missing", "No Limits sheet.")
+            for name in wb.sheetnames:
+                if name.startswith(Config.TXN_PREFIX): checker.check_txn_sheet(path, wb[name], name)
+        finally: wb.close()
+    return checker.issues
+
+
+def repair(issues):
+    """
+    Writes the fixes of `issues` (text dates/amounts converted, header names
+    matched to Limits). Each touched file is loaded and saved once.
+    Returns (ok, message).
+    """
+    by_file = {}
+    for issue in issues:
+        if issue.fix is not None: by_file.setdefault(issue.file, []).append(issue)
+    fixed = 0
+    for path, file_issues in by_file.items():
+        try:
+            wb = openpyxl.load_workbook(path)
+            xlsx_styles.use_styles(wb)
+            for issue in file_issues:
+                cell = wb[issue.sheet][issue.cell]
+                cell.value = issue.fix
+                if isinstance(issue.fix, datetime):
+                    cell.style = xlsx_styles.PLAIN_DATE if issue.sheet == Config.SHEET_LIMITS else xlsx_styles.DATE
+                fixed += 1
+            wb.save(path)
+        except PermissionError: return False, f"Error: {os.path.basename(path)} is open."
+        except Exception as e: return False, f"Error: {e}"
+    return True, f"Repaired {fixed} cells."
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the ledger for hand-editing mistakes.")
+    parser.add_argument("--db", default=Config.DB_FILENAME, help="Ledger workbook")
+    parser.add_argument("--repair", action="store_true", help="Fix what can be fixed automatically")
+    args = parser.parse_args()
+
+    issues = check(args.db)
+    for issue in issues:
+        fix = f"  [fix: {issue.fix:%d-%m-%Y}]" if isinstance(issue.fix, datetime) else \
+              (f"  [fix: {issue.fix}]" if issue.fix is not None else "")
+        print(f"{os.path.basename(issue.file)} {issue.sheet}!{issue.cell}  {issue.kind}: {issue.message}{fix}")
+    print(f"{len(issues)} problem(s), {sum(i.fix is not None for i in issues)} fixable.")
+
+    if args.repair and any(i.fix is not None for i in issues):
+        ok, msg = repair(issues)
+        print(msg)
+        if not ok: raise SystemExit(2)
+        issues = check(args.db)
+        print(f"{len(issues)} problem(s) remain.")
+    raise SystemExit(1 if issues else 0)
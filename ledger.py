@@ -0,0 +1,147 @@
+from datetime import datetime
+from itertools import chain
+import numpy as np
+import openpyxl
+from config import Config
+from fiscal import get_calendar
+import shards
+
+# --- LONG FORMAT LEDGER ROWS ---
+# Every row produced by this module is a plain tuple in this field order.
+LEDGER_FIELDS = ("department", "reference", "date", "amount", "type", "sheet")
+
+TYPE_PPA = "PPA"
+TYPE_ALLOC = "ALLOC"
+ALL_DEPARTMENTS = "All Departments"
+
+
+def open_ledger(path=None):
+    """
+    Opens the workbook in openpyxl read_only mode. Rows are then parsed lazily
+    while iterating, so memory does not grow with the size of the ledger.
+    Callers must close() the workbook when done.
+    """
+    return openpyxl.load_workbook(path or Config.DB_FILENAME, read_only=True, data_only=True)
+
+
+def _get(row, idx):
+    return row[idx] if idx < len(row) else None
+
+
+def iter_limits_sheet(ws):
+    """
+    Yields (Department, Total Limit, [(alloc number, Amount, Date), ...]) per Limits row.
+    Layout: Col 1 = Department, Col 2 = Total Limit, then (Amount, Date) pairs.
+    """
+    for row in ws.iter_rows(min_row=2, values_only=True):
+        sub_name = _get(row, 0)
+        if not sub_name: continue
+        allocs = []
+        for i in range(2, len(row), 2):
+            amt = row[i]
+            if not isinstance(amt, (int, float)): continue
+            allocs.append((i // 2, amt, _get(row, i + 1)))
+        yield (sub_name, _get(row, 1), allocs)
+
+
+def allocation_rows(limits_rows):
+    """Long format ledger rows for the allocations of parsed Limits rows."""
+    for sub_name, _, allocs in limits_rows:
+        for alloc_num, amt, date_val in allocs:
+            yield (sub_name, f"Allocation ({alloc_num})", date_val, amt, TYPE_ALLOC, Config.SHEET_LIMITS)
+
+
+def iter_allocations(wb):
+    """Yields one row per allocation recorded in the Limits sheet."""
+    if Config.SHEET_LIMITS not in wb.sheetnames: return
+    yield from allocation_rows(iter_limits_sheet(wb[Config.SHEET_LIMITS]))
+
+
+def iter_txn_sheet(ws, sheet_name, with_rows=False):
+    """
+    Yields one row per PPA of a single Transactions_ sheet.
+    Layout: Row 1 = Department headers (3 columns each), Row 2 = captions, Row 3+ = data.
+    with_rows=True appends the Excel row number to each tuple.
+    """
+    header = next(ws.iter_rows(max_row=1, values_only=True), None)
+    if not header: return
+    dept_cols = [(i, val) for i, val in enumerate(header) if val]
+    if not dept_cols: return
+    for row_num, row in enumerate(ws.iter_rows(min_row=3, values_only=True), start=3):
+        for i, sub_name in dept_cols:
+            ppa = _get(row, i)
+            amt = _get(row, i + 2)
+            if not ppa and not isinstance(amt, (int, float)): continue
+            ref = str(ppa) if ppa else ""
+            if with_rows: yield (sub_name, ref, _get(row, i + 1), amt, TYPE_PPA, sheet_name, row_num)
+            else: yield (sub_name, ref, _get(row, i + 1), amt, TYPE_PPA, sheet_name)
+
+
+def iter_transactions(wb, sheet_names=None):
+    """Yields one row per PPA from every Transactions_ sheet (or only `sheet_names`)."""
+    for sheet_name in wb.sheetnames:
+        if not sheet_name.startswith(Config.TXN_PREFIX): continue
+        if sheet_names is not None and sheet_name not in sheet_names: continue
+        yield from iter_txn_sheet(wb[sheet_name], sheet_name)
+
+
+def iter_ledger(wb, sheet_names=None):
+    """Allocations followed by transactions, in long format."""
+    return chain(iter_allocations(wb), iter_transactions(wb, sheet_names))
+
+
+def iter_ledger_files(path=None):
+    """
+    iter_ledger over the whole ledger: the main workbook, then (if split by
+    year) each FY workbook in turn, with only one file open at a time.
+    """
+    for i, file_path in enumerate(shards.ledger_files(path or Config.DB_FILENAME)):
+        wb = open_ledger(file_path)
+        try: yield from (iter_ledger(wb) if i == 0 else iter_transactions(wb))
+        finally: wb.close()
+
+
+# --- FILTER STAGES ---
+def matches_search(row, subsidiary=None, ppa_text=None, quarter=None):
+    """
+    The History search criteria applied to a single ledger row.
+    The PPA text filter only applies to PPA rows; allocations always pass it.
+    """
+    sub_name, ref, date_val, _, row_type, _ = row
+    if subsidiary and subsidiary != ALL_DEPARTMENTS and sub_name != subsidiary: return False
+    if row_type == TYPE_PPA and ppa_text:
+        if str(ppa_text).upper() not in ref.upper(): return False
+    if quarter and quarter != "All":
+        if not isinstance(date_val, datetime): return False
+        if get_calendar().period_name(date_val) != quarter: return False
+    return True
+
+
+def search_mask(cols, subsidiary=None, ppa_text=None, quarter=None):
+    """
+    matches_search for every row of a LedgerColumns block at once (boolean array).
+    Must agree with matches_search row for row.
+    """
+    mask = np.ones(len(cols), dtype=bool)
+    if subsidiary and subsidiary != ALL_DEPARTMENTS:
+        mask &= cols.dept == cols.dept_code(subsidiary)
+    if quarter and quarter != "All":
+        cal = get_calendar()
+        has_date = cols.has_date()
+        names = cal.period_names()
+        target = names.index(quarter) if quarter in names else -1
+        _, idx = cal.bucket(np.where(has_date, cols.dates, np.datetime64(0, "s")))
+        mask &= has_date & (idx == target)
+    if ppa_text:
+        needle = str(ppa_text).upper()
+        candidates = np.flatnonzero(mask & cols.is_type(TYPE_PPA))
+        hits = np.fromiter((needle in cols.refs[i].upper() for i in candidates), dtype=bool, count=len(candidates))
+        mask[candidates[~hits]] = False
+    return mask
+
+
+def filter_rows(rows, subsidiary=None, ppa_text=None, quarter=None):
+    """Generator stage: passes through only the rows matching the search criteria."""
+    for row in rows:
+        if matches_search(row, subsidiary, ppa_text, quarter):
+            yield row
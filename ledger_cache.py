@@ -0,0 +1,579 @@
+import os
+import zipfile
+import itertools
+import threading
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import xml.etree.ElementTree as ET
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from config import Config
+from fiscal import get_calendar
+import numpy as np
+import ledger
+import shards
+from records import LedgerColumns, as_number
+
+_NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_STYLES_PART = "xl/styles.xml"
+
+
+def _date_styles(styles_xml):
+    """
+    Which cell styles (by index) display a date. This is the only part of
+    styles.xml that changes how a sheet decodes, so it is all we compare.
+    """
+    root = ET.fromstring(styles_xml)
+    codes = dict(BUILTIN_FORMATS)
+    for fmt in root.iter(f"{_NS_MAIN}numFmt"):
+        codes[int(fmt.get("numFmtId"))] = fmt.get("formatCode", "")
+    cell_xfs = root.find(f"{_NS_MAIN}cellXfs")
+    if cell_xfs is None: return ()
+    return tuple(is_date_format(codes.get(int(xf.get("numFmtId", 0)), "")) for xf in cell_xfs)
+
+
+def read_sheet_parts(path):
+    """
+    {sheet name: (XML part, signature)} in workbook order. Only the zip
+    directory, workbook.xml and styles.xml are read; no sheet is decompressed.
+    The signature is the part's CRC-32 plus the date-style table.
+    Excel and openpyxl number shared strings in sheet order, so a sheet whose
+    XML is byte-identical still decodes to the same values.
+    """
+    with zipfile.ZipFile(path) as zf:
+        crcs = {info.filename: info.CRC for info in zf.infolist()}
+        workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+        rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+        date_styles = _date_styles(zf.read(_STYLES_PART)) if _STYLES_PART in crcs else ()
+
+    targets = {}
+    for rel in rels.iter(f"{_NS_PKG_REL}Relationship"):
+        target = rel.get("Target", "")
+        targets[rel.get("Id")] = target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+
+    parts = {}
+    for sheet in workbook.iter(f"{_NS_MAIN}sheet"):
+        part = targets.get(sheet.get(f"{_NS_REL}id"))
+        parts[sheet.get("name")] = (part, (crcs.get(part), date_styles))
+    return parts
+
+
+class LimitsTable:
+    """Parsed Limits sheet: the header row plus (Department, Col 2, allocations) rows."""
+    def __init__(self, header, rows):
+        self.header = header
+        self.rows = rows
+        # Approved limit (Col 2) per department; first row wins, as in get_limit_info
+        self.approved = {}
+        for sub_name, col2_val, _ in rows:
+            if sub_name in self.approved: continue
+            # Text typed over the limit in Excel counts as 0, as in get_limit_info
+            try: self.approved[sub_name] = int(col2_val) if col2_val else 0
+            except (TypeError, ValueError): self.approved[sub_name] = 0
+
+
+def _spent_by_department(cols):
+    """Sum of every numeric Amount per department column (what save_batch checks)."""
+    valid = cols.has_amount()
+    totals = np.bincount(cols.dept[valid], weights=cols.amounts[valid], minlength=len(cols.departments))
+    return {name: as_number(total) for name, total in zip(cols.departments, totals)}
+
+
+def _quarter_totals_by_fy(cols, cal):
+    """
+    {FY start year: {department: quarterly expenditure array}} of one sheet,
+    bucketed by each entry's own date (a sheet normally holds one year only).
+    """
+    valid = cols.has_date() & cols.has_amount()
+    keys, amounts = cols.dept[valid], cols.amounts[valid]
+    years, idx = cal.bucket(cols.dates[valid])
+    num_depts, num_q = len(cols.departments), cal.num_periods()
+    result = {}
+    for year in np.unique(years).tolist():
+        sel = years == year
+        totals = np.bincount(keys[sel] * num_q + idx[sel], weights=amounts[sel],
+                             minlength=num_depts * num_q).reshape(num_depts, num_q)
+        result[year] = dict(zip(cols.departments, totals))
+    return result
+
+
+def parse_txn_sheet(ws, name):
+    """LedgerColumns of one Transactions_ sheet."""
+    cols = LedgerColumns.from_rows(ledger.iter_txn_sheet(ws, name, with_rows=True))
+    if not len(cols): return cols
+    # Stored department by department (header order), then by row, which is
+    # the order the sheet's columns are laid out in
+    header = next(ws.iter_rows(max_row=1, values_only=True), ())
+    header_pos = {}
+    for i, val in enumerate(header):
+        if val: header_pos.setdefault(val, i)
+    dept_pos = np.array([header_pos.get(d, 0) for d in cols.departments], dtype=np.int64)
+    return cols.take(np.lexsort((cols.rows, dept_pos[cols.dept])))
+
+
+# --- PARALLEL PARSING ---
+# Sheets are independent, so a load that needs several of them (first start,
+# all-years reports) hands one sheet to each worker process. A worker opens
+# the file read_only, parses its sheet and sends back the LedgerColumns
+# (a few numpy arrays and short lists). Small loads stay in this process,
+# where starting the pool would cost more than it saves, and so does every
+# load made inside a worker process.
+_pools = {}
+
+
+def _worker_count():
+    # Already a worker (e.g. one office of consolidate.py, which runs its own
+    # pool): parse here rather than start a pool in every such process
+    if multiprocessing.parent_process() is not None: return 1
+    return Config.PARSE_WORKERS or os.cpu_count() or 1
+
+
+def _pool(workers):
+    """One pool per size, kept for the life of the app."""
+    if workers not in _pools: _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _pools[workers]
+
+
+def parse_sheet_file(path, name):
+    """Parses sheet `name` of `path` (runs in a worker process)."""
+    wb = ledger.open_ledger(path)
+    try: return parse_txn_sheet(wb[name], name)
+    finally: wb.close()
+
+
+def _xml_size(path, parts):
+    """Uncompressed size of the given sheet parts of one file."""
+    with zipfile.ZipFile(path) as zf:
+        return sum(zf.getinfo(part).file_size for part in parts)
+
+
+class StaleSnapshotError(Exception):
+    """A sheet of a held snapshot is needed, but the file no longer holds that version of it."""
+
+
+class _Partition:
+    """
+    One parsed version of a Transactions_ sheet, shared by every ledger version
+    it is unchanged in. Unloaded to save memory, it keeps its counters and FY
+    totals but not the columns (cols is None) until the sheet is read again.
+    """
+    __slots__ = ("cols", "spent", "fy_totals", "nbytes")
+
+    def __init__(self, cols, like=None):
+        self.cols = cols
+        # Reloading an unloaded version: what was worked out from it still holds
+        self.spent = like.spent if like else _spent_by_department(cols)
+        self.fy_totals = like.fy_totals if like else {}     # {FY start month: _quarter_totals_by_fy}, built on first use
+        self.nbytes = cols.nbytes() if cols is not None else 0
+
+    def unloaded(self):
+        return _Partition(None, self)
+
+
+class LedgerSnapshot:
+    """
+    One immutable version of the ledger (LedgerCache.snapshot()). A reader
+    holding it keeps seeing this version whatever is saved meanwhile: an
+    unchanged sheet is the same partition object in every version, a changed
+    one is a new partition in the next version only. Sheets are parsed on
+    first use; a parsed sheet version never changes, so filling it in is not
+    a change a reader can see. Reading takes no lock, only a first parse does.
+    A sheet first read (or read again after being unloaded to save memory)
+    comes from the parse cache or the file only while either still holds this
+    version's data; once it was edited outside the app (e.g. in Excel) the read
+    raises StaleSnapshotError and the caller takes a new snapshot.
+    """
+    def __init__(self, owner, version, parts, tokens, limits, allocs, partitions):
+        self._owner = owner
+        self.version = version
+        self._parts = parts             # {sheet name: (file, XML part, signature)} in ledger order
+        self._tokens = tokens           # {sheet name: content token}, same while the data is the same
+        self._limits = limits
+        self._allocs = allocs
+        self._partitions = partitions   # {sheet name: _Partition} parsed so far (replaced, never edited)
+        self._joined = {}               # {(sheet names, with allocations): (LedgerColumns, bytes copied)}
+
+    def _load(self, sheet_names, with_columns=True):
+        """Partitions of the named sheets; with_columns=False settles for unloaded ones (counters only)."""
+        partitions = self._partitions
+        missing = [n for n in sheet_names if n in self._parts and n.startswith(Config.TXN_PREFIX)
+                   and (n not in partitions or (with_columns and partitions[n].cols is None))]
+        self._owner._touch(sheet_names)
+        if missing:
+            merged = dict(partitions, **self._owner._load(self, missing))
+            partitions = self._partitions = {name: merged[name] for name in self._parts if name in merged}
+            # Over the memory budget the least used years are unloaded; this call still has them
+            self._owner._trim()
+        return partitions
+
+    # --- READERS ---
+    @property
+    def limits(self):
+        return self._limits
+
+    @property
+    def sheet_names(self):
+        """Every Transactions_ sheet of the ledger, parsed or not."""
+        return [name for name in self._parts if name.startswith(Config.TXN_PREFIX)]
+
+    def approved_limit(self, sub_name):
+        return self._limits.approved.get(sub_name, 0)
+
+    def spent(self, sheet_name, sub_name):
+        """Running expenditure counter of one department in one FY sheet."""
+        part = self._load([sheet_name], with_columns=False).get(sheet_name)
+        return part.spent.get(sub_name, 0) if part else 0
+
+    def fy_totals(self, sheet_name, cal):
+        """
+        Quarterly expenditure per FY and department of one Transactions_ sheet.
+        Built once per version of the sheet, so reports spanning many years
+        only aggregate the sheets that are new or changed. The totals stay
+        when the sheet is unloaded to save memory.
+        """
+        part = self._load([sheet_name], with_columns=False).get(sheet_name)
+        if part is not None and cal.start_month not in part.fy_totals:
+            part = self._load([sheet_name]).get(sheet_name)
+            if part is not None and part.cols is not None:
+                part.fy_totals[cal.start_month] = _quarter_totals_by_fy(part.cols, cal)
+        if part is None or cal.start_month not in part.fy_totals: return {}  # Unreadable just now; try again next time
+        return part.fy_totals[cal.start_month]
+
+    def signature(self, sheet_names=None):
+        """Content tokens of the named (or all) sheets; changes whenever their data does."""
+        tokens = self._tokens
+        return tuple((name, tokens[name]) for name in self._parts if sheet_names is None or name in sheet_names)
+
+    def sheet_columns(self, sheet_names=None):
+        """{sheet name: LedgerColumns} for every (or the named) Transactions_ sheet, in ledger order."""
+        names = [n for n in self.sheet_names if sheet_names is None or n in sheet_names]
+        partitions = self._load(names)
+        return {n: partitions[n].cols for n in names if n in partitions and partitions[n].cols is not None}
+
+    def unloaded_sheets(self):
+        """Sheets unloaded to stay within the memory budget (read again when needed)."""
+        return [name for name, part in self._partitions.items() if part.cols is None]
+
+    def columns(self, sheet_names=None, with_allocations=False):
+        """
+        Transactions of all (or the named) FY sheets joined into one LedgerColumns,
+        optionally preceded by the allocations. Joins are kept with the snapshot.
+        """
+        sheets = self.sheet_columns(sheet_names)
+        key = (tuple(sheets), with_allocations)
+        entry = self._joined.get(key)
+        if entry is None:
+            blocks = list(sheets.values())
+            if with_allocations: blocks.insert(0, self._allocs)
+            joined = LedgerColumns.concat(blocks)
+            # A join of several blocks is a copy, and counts against the memory budget
+            entry = self._joined.setdefault(key, (joined, 0 if any(joined is b for b in blocks) else joined.nbytes()))
+            self._owner._trim()
+        return entry[0]
+
+    def allocation_columns(self):
+        return self._allocs
+
+    def transactions(self, sheet_names=None):
+        """Row-by-row view of the transactions (long format tuples)."""
+        for cols in self.sheet_columns(sheet_names).values():
+            yield from cols
+
+    def allocations(self):
+        return ledger.allocation_rows(self._limits.rows)
+
+    def ledger_rows(self, sheet_names=None):
+        yield from self.allocations()
+        yield from self.transactions(sheet_names)
+
+
+class LedgerCache:
+    """
+    Parsed ledger, handed out as LedgerSnapshot versions. refresh() only looks
+    at file stats and zip directories and publishes a new version when
+    something changed: Limits is re-parsed, a changed Transactions_ sheet gets
+    a new (still unparsed) partition, every other partition is shared with the
+    previous version. Sheets (or closed-year shard files) that no report needs
+    are never opened. With a ParseCache, parsed sheets are also saved to disk
+    and mapped back in on the next start instead of being re-parsed.
+    """
+    def __init__(self, path, parse_cache=None):
+        self.path = path
+        self.disk = parse_cache
+        self._lock = threading.RLock()  # Writers and first-time parses only
+        self._stats = {}        # {file: (mtime_ns, size)}
+        self._file_parts = {}   # {file: read_sheet_parts(file)}
+        self._current = LedgerSnapshot(self, 0, {}, {}, LimitsTable((), []), LedgerColumns.empty(), {})
+        self._clock = itertools.count(1)
+        self._last_used = {}    # {sheet name: tick of its last read}; the least recent are unloaded first
+        self.evictions = 0      # Sheets unloaded to stay within CACHE_BUDGET_MB ...
+        self.reloads = 0        # ... and read again since
+
+    @property
+    def version(self):
+        return self._current.version
+
+    def snapshot(self):
+        """The latest version; a plain attribute read, never blocks."""
+        return self._current
+
+    def refresh(self, unchanged=()):
+        """
+        Brings the cache up to date with the file(s). Returns the set of sheet
+        names that changed (empty when nothing was touched). Sheets in
+        `unchanged` keep their data even though their XML changed (see commit).
+        """
+        with self._lock:
+            stats, file_parts = {}, {}
+            try:
+                for path in shards.ledger_files(self.path):
+                    st = os.stat(path)
+                    stats[path] = (st.st_mtime_ns, st.st_size)
+                if stats == self._stats: return set()
+                for path, stat_key in stats.items():
+                    if self._stats.get(path) == stat_key: file_parts[path] = self._file_parts[path]
+                    else: file_parts[path] = read_sheet_parts(path)
+            except (OSError, zipfile.BadZipFile, KeyError, ET.ParseError):
+                # Missing or half-written by Excel: keep the old data, retry next time
+                return set()
+
+            parts = {}
+            for path, sheet_parts in file_parts.items():
+                for name, (part, sig) in sheet_parts.items():
+                    # A shard contributes its FY sheet only
+                    if path != self.path and not name.startswith(Config.TXN_PREFIX): continue
+                    parts.setdefault(name, (path, part, sig))
+
+            old = self._current
+            tokens = {}
+            for name, (path, _, sig) in parts.items():
+                prev = old._parts.get(name)
+                same = prev is not None and (prev[0], prev[2]) == (path, sig)
+                tokens[name] = old._tokens[name] if same or (prev and name in unchanged) else (path, sig)
+            changed = {name for name in parts if tokens[name] != old._tokens.get(name)}
+            removed = set(old._parts) - set(parts)
+
+            limits, allocs = old._limits, old._allocs
+            if Config.SHEET_LIMITS in changed:
+                path, _, sig = parts[Config.SHEET_LIMITS]
+                try: limits, allocs = self._parse_limits(path, sig)
+                except Exception: return set()
+            elif Config.SHEET_LIMITS in removed:
+                limits, allocs = LimitsTable((), []), LedgerColumns.empty()
+
+            stale = changed | removed
+            partitions = {name: p for name, p in old._partitions.items() if name in parts and name not in stale}
+            self._current = LedgerSnapshot(self, old.version + (1 if stale else 0), parts, tokens,
+                                           limits, allocs, partitions)
+            self._file_parts = file_parts
+            self._stats = stats
+            if self.disk:
+                # Kept partitions are stored again under their new signature (unloaded ones copied over)
+                for name, part in partitions.items():
+                    path, _, sig = parts[name]
+                    old_path, _, old_sig = old._parts[name]
+                    if old_sig == sig: continue
+                    cols = part.cols if part.cols is not None else self.disk.load_sheet(old_path, name, old_sig)
+                    if cols is not None: self.disk.save_sheet(path, name, sig, cols)
+                self.disk.prune([(path, name, sig) for name, (path, _, sig) in parts.items()])
+            return stale
+
+    # --- COMMITS BY THIS APP ---
+    def begin_commit(self, path, sheet_names):
+        """
+        Call after loading `path` for a save that changes `sheet_names`. Parses
+        those sheets in the current version (so snapshots held by readers keep
+        the data before the save) and returns the file's stat key, or None
+        if the file is not the version the cache last read.
+        """
+        try: self._current._load(sheet_names)
+        except StaleSnapshotError: return None     # Edited outside since the last refresh
+        try: st = os.stat(path)
+        except OSError: return None
+        stat_key = (st.st_mtime_ns, st.st_size)
+        return stat_key if self._stats.get(path) == stat_key else None
+
+    def commit(self, path, stat_before, changed_sheets):
+        """
+        Publishes the version after this app saved `path`. openpyxl renumbers
+        shared strings on save, so every sheet's XML changes; only
+        `changed_sheets` get a new partition, the file's other FY sheets keep
+        theirs instead of being re-parsed.
+        """
+        with self._lock:
+            if stat_before is None or self._stats.get(path) != stat_before: return self.refresh()
+            unchanged = {name for name, (p, _, _) in self._current._parts.items()
+                         if p == path and name not in changed_sheets and name.startswith(Config.TXN_PREFIX)}
+            return self.refresh(unchanged)
+
+    # --- PARSING ---
+    def _parse_limits(self, path, sig):
+        cached = self.disk.load_limits(path, Config.SHEET_LIMITS, sig) if self.disk else None
+        if cached: limits = LimitsTable(*cached)
+        else:
+            wb = ledger.open_ledger(path)
+            try:
+                ws = wb[Config.SHEET_LIMITS]
+                header = next(ws.iter_rows(max_row=1, values_only=True), ())
+                limits = LimitsTable(tuple(header), list(ledger.iter_limits_sheet(ws)))
+            finally: wb.close()
+            self._save_parsed(path, {Config.SHEET_LIMITS: sig}, {Config.SHEET_LIMITS: limits})
+        return limits, LedgerColumns.from_rows(ledger.allocation_rows(limits.rows))
+
+    def _save_parsed(self, path, sigs, parsed):
+        """Writes parsed sheets to the disk cache if the file still holds the versions that were read."""
+        if not self.disk: return
+        try: current = read_sheet_parts(path)
+        except Exception: return
+        for name, data in parsed.items():
+            if current.get(name, (None, None))[1] != sigs[name]: continue
+            if name == Config.SHEET_LIMITS: self.disk.save_limits(path, name, sigs[name], data)
+            else: self.disk.save_sheet(path, name, sigs[name], data)
+
+    def _load(self, snap, sheet_names):
+        """
+        Partitions of `snap` for the named sheets: taken from the current version
+        when it holds the same data, else from the disk cache, else parsed (one
+        open per file). New partitions are shared with the current version too.
+        """
+        with self._lock:
+            current = self._current
+            found, by_file, unloaded = {}, {}, {}
+            for name in sheet_names:
+                same = current._tokens.get(name) == snap._tokens[name]
+                part = current._partitions.get(name) if same else None
+                # An unloaded version gets its columns back and keeps its counters
+                stub = snap._partitions.get(name) or part
+                if stub is not None and stub.cols is None:
+                    unloaded[name] = stub
+                    self.reloads += 1
+                if part is not None and part.cols is None: part = None
+                if part is None:
+                    path, _, sig = snap._parts[name]
+                    cols = self.disk.load_sheet(path, name, sig) if self.disk else None
+                    if cols is not None: part = _Partition(cols, unloaded.get(name))
+                if part is not None: found[name] = part
+                else: by_file.setdefault(snap._parts[name][0], []).append(name)
+
+            # Parse only what still is this version of the sheet, checked before and after reading
+            stale = self._stale_sheets(snap, current, by_file)
+            parsed = self._parse_sheets(snap._parts, by_file) if not stale else {}
+            stale = stale or self._stale_sheets(snap, current, by_file)
+            if stale: raise StaleSnapshotError(f"{', '.join(sorted(stale))} changed since version {snap.version}")
+            for path, names in by_file.items():
+                self._save_parsed(path, {n: snap._parts[n][2] for n in names},
+                                  {n: parsed[n] for n in names if n in parsed})
+            found.update((name, _Partition(cols, unloaded.get(name))) for name, cols in parsed.items())
+
+            if current is not snap:
+                shared = {n: p for n, p in found.items() if current._tokens.get(n) == snap._tokens[n]
+                          and (n not in current._partitions or current._partitions[n].cols is None)}
+                if shared:
+                    merged = dict(current._partitions, **shared)
+                    current._partitions = {n: merged[n] for n in current._parts if n in merged}
+            return found
+
+    def _stale_sheets(self, snap, current, by_file):
+        """Sheets of `by_file` whose file no longer holds the data `snap` has for them."""
+        stale = set()
+        for path, names in by_file.items():
+            try: on_disk = read_sheet_parts(path)
+            except Exception: on_disk = {}
+            for name in names:
+                sig = on_disk.get(name, (None, None))[1]
+                if sig is not None and sig == snap._parts[name][2]: continue
+                # Saved by this app since: the XML changed, the data did not (same token)
+                now = current._parts.get(name)
+                if sig is not None and now == (path, on_disk[name][0], sig) \
+                        and current._tokens[name] == snap._tokens[name]: continue
+                stale.add(name)
+        return stale
+
+    # --- MEMORY BUDGET ---
+    def _touch(self, sheet_names):
+        for name in sheet_names: self._last_used[name] = next(self._clock)
+
+    def _trim(self):
+        """
+        Keeps the current version's parsed sheets within CACHE_BUDGET_MB by
+        unloading the least recently read years; the current FY is never
+        unloaded. The trimmed copy is published under the same version number;
+        snapshots already handed out are not touched and keep what they hold
+        until they are dropped.
+        """
+        budget = (Config.CACHE_BUDGET_MB or 0) * 1024 * 1024
+        if not budget: return
+        with self._lock:
+            snap = self._current
+            loaded = {n: p for n, p in snap._partitions.items() if p.cols is not None}
+            joins = dict(snap._joined)
+            size = sum(p.nbytes for p in loaded.values()) + sum(nbytes for _, nbytes in joins.values())
+            if size <= budget: return
+            # Joins over years already unloaded go first, then the least recently read years (and their joins)
+            unloaded = {n for n, p in snap._partitions.items() if p.cols is None}
+            for key in [k for k in joins if unloaded.intersection(k[0])]: size -= joins.pop(key)[1]
+            pinned = get_calendar().sheet_name_for_date(datetime.now())
+            unload = set()
+            for name in sorted(loaded, key=lambda n: self._last_used.get(n, 0)):
+                if size <= budget: break
+                if name == pinned: continue
+                unload.add(name)
+                size -= loaded[name].nbytes
+                for key in [k for k in joins if name in k[0]]: size -= joins.pop(key)[1]
+            if not unload and len(joins) == len(snap._joined): return
+            trimmed = LedgerSnapshot(self, snap.version, snap._parts, snap._tokens, snap._limits, snap._allocs,
+                                     {n: p.unloaded() if n in unload else p for n, p in snap._partitions.items()})
+            trimmed._joined = joins
+            self._current = trimmed
+            self.evictions += len(unload)
+
+    def memory_status(self):
+        """
+        {"resident": bytes held by the parsed sheets (and joins) of the current
+        version, "budget": bytes (0: no limit), "loaded" / "unloaded": sheet
+        names, "evictions" / "reloads": sheets unloaded / read again since start}.
+        """
+        snap = self._current
+        partitions, joins = snap._partitions, snap._joined
+        resident = sum(p.nbytes for p in partitions.values()) + sum(nbytes for _, nbytes in joins.values())
+        return {"resident": resident, "budget": (Config.CACHE_BUDGET_MB or 0) * 1024 * 1024,
+                "loaded": [n for n, p in partitions.items() if p.cols is not None],
+                "unloaded": [n for n, p in partitions.items() if p.cols is None],
+                "evictions": self.evictions, "reloads": self.reloads}
+
+    def _parse_sheets(self, parts, by_file):
+        """{sheet name: LedgerColumns} for {file: [sheet names]}; in parallel when worth it."""
+        jobs = [(path, name) for path, names in by_file.items() for name in names]
+        workers = min(_worker_count(), len(jobs))
+        if workers > 1:
+            try: size = sum(_xml_size(path, [parts[n][1] for n in names]) for path, names in by_file.items())
+            except Exception: size = 0
+            if size >= Config.PARALLEL_PARSE_MIN_MB * 1024 * 1024:
+                try: return self._parse_parallel(jobs, workers)
+                except (BrokenProcessPool, RuntimeError, OSError):
+                    _pools.pop(workers, None)  # Pool unusable (e.g. a worker was killed): parse here
+        return self._parse_serial(by_file)
+
+    def _parse_serial(self, by_file):
+        parsed = {}
+        for path, names in by_file.items():
+            try: wb = ledger.open_ledger(path)
+            except Exception: continue
+            try:
+                for name in names: parsed[name] = parse_txn_sheet(wb[name], name)
+            except Exception: pass
+            finally: wb.close()
+        return parsed
+
+    def _parse_parallel(self, jobs, workers):
+        pool = _pool(workers)
+        futures = {name: pool.submit(parse_sheet_file, path, name) for path, name in jobs}
+        parsed = {}
+        for name, future in futures.items():
+            try: parsed[name] = future.result()
+            except BrokenProcessPool: raise
+            except Exception: pass
+        return parsed
@@ -1,10 +1,15 @@
+import queue
+import multiprocessing
 import tkinter as tk
 from tkinter import ttk
 from config import Config
+from fiscal import PERIOD_QUARTER, PERIOD_HALF, PERIOD_MONTH
 from backend import BookkeepingSystem
 from ui_entry import EntryView
 from ui_dashboard import DashboardView
 from ui_history import HistoryView
+from watcher import LedgerWatcher
+from idle import IdleScheduler
 
 class App:
     def __init__(self, root):
@@ -28,6 +33,10 @@ class App:
         footer = tk.Frame(self.root, bg="#f0f0f0", height=20)
         footer.place(relx=0, rely=1, anchor="sw", relwidth=1, y=-1)
         tk.Label(footer, text=Config.DEV_NAME, font=Config.FONT_FOOTER, fg="gray", bg="#f0f0f0").pack(side="right", padx=10)
+        self.memory_status = tk.Label(footer, text="", font=Config.FONT_FOOTER, fg="gray", bg="#f0f0f0")
+        self.memory_status.pack(side="right", padx=10)
+        self.idle_status = tk.Label(footer, text="", font=Config.FONT_FOOTER, fg="gray", bg="#f0f0f0")
+        self.idle_status.pack(side="left", padx=10)
 
         # Initialize Views
         self.views = {}
@@ -39,6 +48,63 @@ class App:
 
         self.show_view("EntryView")
 
+        # Live refresh: a background thread re-parses data.xlsx when it is edited
+        # (e.g. Limits changed in Excel) and the UI thread picks up the result.
+        self.ledger_events = queue.Queue()
+        self.watcher = LedgerWatcher(self.system.db_path, self._on_ledger_file_changed)
+        self.watcher.start()
+        self.root.after(Config.WATCH_POLL_MS, self._drain_ledger_events)
+
+        # Idle-time precompute: reports are built in the background between
+        # clerk actions; any key press or click pauses it.
+        self.idle = IdleScheduler(self.system)
+        for sequence in ("<KeyPress>", "<ButtonPress>", "<MouseWheel>"):
+            self.root.bind_all(sequence, self.idle.user_input, add="+")
+        self.idle.start()
+        self.root.after(Config.IDLE_STATUS_MS, self._update_idle_status)
+
+    def _update_idle_status(self):
+        text = self.idle.status()
+        if self.idle_status.cget("text") != text: self.idle_status.config(text=text)
+        text = self._memory_text()
+        if self.memory_status.cget("text") != text: self.memory_status.config(text=text)
+        self.root.after(Config.IDLE_STATUS_MS, self._update_idle_status)
+
+    def _memory_text(self):
+        mem = self.system.cache.memory_status()
+        if not mem["budget"]: return ""
+        text = f"Memory {mem['resident'] / 2**20:.0f} of {mem['budget'] / 2**20:.0f} MB"
+        if mem["evictions"]:
+            text += f"  ·  {len(mem['unloaded'])} older year(s) unloaded ({mem['evictions']} unloads, {mem['reloads']} reloads)"
+        return text
+
+    def _on_ledger_file_changed(self):
+        # Runs on the watcher thread: only sheets whose XML changed are re-read.
+        # They are parsed here, with the data the views show, so the Tk side only re-renders.
+        changed = self.system.cache.refresh()
+        if not changed: return
+        system, snap = self.system, self.system.snapshot()
+        try:
+            snap.sheet_columns(changed)
+            for period in (PERIOD_QUARTER, PERIOD_HALF, PERIOD_MONTH): system.get_summary_report(period, snap=snap)
+            system.get_burn_forecast(snap)
+            system.get_year_comparison(snap=snap)
+            system.search_transactions(snap=snap)
+        except Exception: pass      # Anything that failed is built on demand instead
+        self.ledger_events.put(changed)
+
+    def _drain_ledger_events(self):
+        changed = set()
+        while True:
+            try: changed |= self.ledger_events.get_nowait()
+            except queue.Empty: break
+        if changed:
+            self.idle.kick()
+            for name, view in self.views.items():
+                if hasattr(view, "on_ledger_changed"):
+                    view.on_ledger_changed(changed, name == self.current_view)
+        self.root.after(Config.WATCH_POLL_MS, self._drain_ledger_events)
+
     def show_view(self, view_name):
         # Hide all
         for view in self.views.values():
@@ -47,6 +113,7 @@ class App:
         # Show selected
         view = self.views[view_name]
         view.pack(fill="both", expand=True)
+        self.current_view = view_name
         
         # Trigger refresh if applicable
         if hasattr(view, "refresh"):
@@ -79,6 +146,8 @@ class App:
         except: return 0
 
 if __name__ == "__main__":
+    # Needed for process pools (office consolidation) in the frozen .exe
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = App(root)
     root.mainloop()
\ No newline at end of file
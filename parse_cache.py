@@ -0,0 +1,133 @@
+import os
+import json
+import struct
+import hashlib
+from datetime import datetime
+import numpy as np
+from records import LedgerColumns
+
+# --- ON-DISK PARSE CACHE ---
+# Decoded sheets are kept in a folder next to data.xlsx, one file per sheet
+# version, so a restart with an unchanged workbook never runs openpyxl. A file
+# is named after the sheet's part signature (CRC-32 of its XML plus the date
+# styles, see ledger_cache.read_sheet_parts) and the file it lives in; a
+# changed sheet simply has no file yet. Files are never rewritten in place,
+# which keeps the memory maps of a running app valid (and Windows happy).
+#
+# Layout: MAGIC, header length (uint64 LE), JSON header, then each array's raw
+# little endian bytes at the 8-byte aligned offset given in the header.
+
+MAGIC = b"PPACOLS1"
+_EXT = ".cols"
+_ALIGN = 8
+# LedgerColumns arrays and their on-disk dtypes (dates as int64 seconds)
+_ARRAYS = (("dept", "<i4"), ("dates", "<i8"), ("amounts", "<f8"), ("types", "i1"), ("sheet", "<i4"), ("rows", "<i4"))
+
+
+def _encode(value):
+    if isinstance(value, datetime): return {"$dt": value.isoformat()}
+    raise TypeError(f"{type(value).__name__} is not cached")
+
+
+def _decode(obj):
+    return datetime.fromisoformat(obj["$dt"]) if "$dt" in obj else obj
+
+
+def _write(path, header, arrays):
+    """Header + arrays into a new file (tmp + rename); an existing file is left alone."""
+    if os.path.exists(path): return
+    offset, layout = 0, []
+    for name, arr in arrays:
+        layout.append([name, arr.dtype.str, offset, len(arr)])
+        offset += -(-arr.nbytes // _ALIGN) * _ALIGN
+    header = dict(header, arrays=layout)
+    head = json.dumps(header, default=_encode, ensure_ascii=False).encode("utf-8")
+    start = -(-(len(MAGIC) + 8 + len(head)) // _ALIGN) * _ALIGN
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(head)) + head)
+        f.write(b"\0" * (start - f.tell()))
+        for (_, arr), (_, _, off, _) in zip(arrays, layout):
+            f.write(b"\0" * (start + off - f.tell()))
+            f.write(np.ascontiguousarray(arr).tobytes())
+    os.replace(tmp, path)
+
+
+def _read(path):
+    """(header, {name: read-only array view into the memory map})."""
+    buf = np.memmap(path, dtype=np.uint8, mode="r")
+    if bytes(buf[:len(MAGIC)]) != MAGIC: raise ValueError("not a parse cache file")
+    (head_len,) = struct.unpack("<Q", bytes(buf[len(MAGIC):len(MAGIC) + 8]))
+    head_end = len(MAGIC) + 8 + head_len
+    header = json.loads(bytes(buf[len(MAGIC) + 8:head_end]).decode("utf-8"), object_hook=_decode)
+    start = -(-head_end // _ALIGN) * _ALIGN
+    arrays = {}
+    for name, dtype, off, count in header["arrays"]:
+        dtype = np.dtype(dtype)
+        arrays[name] = buf[start + off:start + off + count * dtype.itemsize].view(dtype=dtype, type=np.ndarray)
+    return header, arrays
+
+
+class ParseCache:
+    """Sheets parsed by LedgerCache, saved to and memory-mapped from `cache_dir`."""
+    def __init__(self, cache_dir, db_path):
+        self.cache_dir = cache_dir
+        self.base = os.path.dirname(os.path.abspath(db_path))
+
+    def _path(self, file, name, sig):
+        rel = os.path.relpath(os.path.abspath(file), self.base)
+        digest = hashlib.sha1(repr((rel, name, sig)).encode("utf-8")).hexdigest()[:20]
+        return os.path.join(self.cache_dir, f"{name}-{digest}{_EXT}")
+
+    # --- TRANSACTIONS_ SHEETS ---
+    def load_sheet(self, file, name, sig):
+        """LedgerColumns of the sheet as last parsed at this signature, or None."""
+        try:
+            header, arrays = _read(self._path(file, name, sig))
+            blob = bytes(arrays["refs"]).decode("utf-8")
+            refs = blob.split("\0") if header["n"] else []
+            extras = {i: (raw_date, raw_amt) for i, raw_date, raw_amt in header["extras"]}
+            return LedgerColumns(header["departments"], arrays["dept"], refs, arrays["dates"].view("datetime64[s]"),
+                                 arrays["amounts"], arrays["types"], header["sheets"], arrays["sheet"],
+                                 arrays["rows"], extras)
+        except (OSError, ValueError, KeyError, TypeError): return None
+
+    def save_sheet(self, file, name, sig, cols):
+        """Stores freshly parsed columns. Failures (disk full, odd cell values) are ignored."""
+        if not self.cache_dir: return
+        try:
+            header = {"sheet": name, "n": len(cols), "departments": cols.departments, "sheets": cols.sheets,
+                      "extras": [[i, raw_date, raw_amt] for i, (raw_date, raw_amt) in cols.extras.items()]}
+            arrays = [(field, getattr(cols, field).astype(dtype) if field != "dates"
+                       else cols.dates.astype("datetime64[s]").view(np.int64)) for field, dtype in _ARRAYS]
+            refs = np.frombuffer("\0".join(cols.refs).encode("utf-8"), dtype=np.uint8)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            _write(self._path(file, name, sig), header, arrays + [("refs", refs)])
+        except (OSError, TypeError, ValueError): pass
+
+    # --- LIMITS ---
+    def load_limits(self, file, name, sig):
+        """(header, rows) of the Limits sheet in the iter_limits_sheet format, or None."""
+        try:
+            header, _ = _read(self._path(file, name, sig))
+            rows = [(sub_name, col2_val, [tuple(a) for a in allocs]) for sub_name, col2_val, allocs in header["rows"]]
+            return tuple(header["header"]), rows
+        except (OSError, ValueError, KeyError, TypeError): return None
+
+    def save_limits(self, file, name, sig, limits):
+        if not self.cache_dir: return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            _write(self._path(file, name, sig), {"sheet": name, "header": limits.header, "rows": limits.rows}, [])
+        except (OSError, TypeError, ValueError): pass
+
+    def prune(self, live):
+        """Deletes files of sheet versions not in `live` [(file, name, sig)]. Mapped files are retried later."""
+        if not self.cache_dir: return
+        keep = {os.path.basename(self._path(*entry)) for entry in live}
+        try: names = os.listdir(self.cache_dir)
+        except OSError: return
+        for n in names:
+            if n in keep: continue
+            try: os.remove(os.path.join(self.cache_dir, n))
+            except OSError: pass
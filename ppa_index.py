@@ -0,0 +1,56 @@
+from bisect import bisect_left
+
+
+class PPAIndex:
+    """
+    Every known PPA number (all FY sheets) in a sorted array, so exact and
+    prefix lookups are a binary search instead of a ledger scan.
+    Keys are upper-cased, matching what EntryView lets the clerk type.
+    """
+    def __init__(self, rows=()):
+        # rows: (PPA, sheet name) pairs; the first sheet seen is reported for duplicates
+        self._where = {}
+        for ppa, sheet_name in rows:
+            if ppa: self._where.setdefault(str(ppa).upper(), sheet_name)
+        self._keys = sorted(self._where)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def lookup(self, ppa):
+        """Sheet name holding `ppa`, or None if it is not in the ledger."""
+        return self._where.get(ppa.upper())
+
+    def complete(self, prefix, limit=5):
+        """Up to `limit` known PPAs starting with `prefix`, in sorted order."""
+        prefix = prefix.upper()
+        i = bisect_left(self._keys, prefix)
+        out = []
+        while i < len(self._keys) and len(out) < limit and self._keys[i].startswith(prefix):
+            out.append(self._keys[i])
+            i += 1
+        return out
+
+    def count_prefix(self, prefix):
+        prefix = prefix.upper()
+        # Every key with this prefix sorts before prefix + the highest character
+        return bisect_left(self._keys, prefix + "\uffff") - bisect_left(self._keys, prefix)
+
+    def nearest(self, ppa, limit=3):
+        """
+        Existing PPAs closest to `ppa` in sort order (sharing the longest prefix).
+        For sequentially issued numbers this surfaces likely typos and neighbours.
+        """
+        ppa = ppa.upper()
+        i = bisect_left(self._keys, ppa)
+        lo, hi = max(0, i - limit), min(len(self._keys), i + limit)
+        candidates = [k for k in self._keys[lo:hi] if k != ppa]
+
+        def shared_prefix(key):
+            n = 0
+            for a, b in zip(key, ppa):
+                if a != b: break
+                n += 1
+            return n
+        candidates.sort(key=shared_prefix, reverse=True)
+        return candidates[:limit]
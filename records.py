@@ -0,0 +1,378 @@
+import sys
+from collections import namedtuple
+from datetime import datetime
+import numpy as np
+
+# --- ROW RECORDS ---
+# All records are tuple-backed with __slots__ = (), so they cost no more than
+# the plain tuples the reports used to return and still index/unpack the same
+# way; the named accessors just stop callers from hard-coding positions.
+
+LedgerEntry = namedtuple("LedgerEntry", ["department", "reference", "date", "amount", "type", "sheet"])
+
+
+class DepartmentSummary(tuple):
+    """Dashboard row: (Name, Limit, *period totals, Total Spent, Balance)."""
+    __slots__ = ()
+
+    @property
+    def name(self): return self[0]
+
+    @property
+    def limit(self): return self[1]
+
+    @property
+    def periods(self): return self[2:-2]
+
+    @property
+    def spent(self): return self[-2]
+
+    @property
+    def balance(self): return self[-1]
+
+
+class QuarterBreakdown(tuple):
+    """
+    Detailed report row: (Name, Net Opening, then per quarter: Addl Alloc, Expenditure, Qtr ending Balance).
+    """
+    __slots__ = ()
+
+    @property
+    def name(self): return self[0]
+
+    @property
+    def opening(self): return self[1]
+
+    @property
+    def allocations(self): return self[2::3]
+
+    @property
+    def expenditure(self): return self[3::3]
+
+    @property
+    def balances(self): return self[4::3]
+
+    @property
+    def values(self): return self[1:]
+
+
+class YearComparison(tuple):
+    """
+    Year-over-year row: (Name, FY, Net Opening, per quarter: Addl Alloc, Expenditure,
+    Qtr ending Balance, then the change against the previous FY in Allocated,
+    Spent and Closing Balance).
+    """
+    __slots__ = ()
+
+    @property
+    def name(self): return self[0]
+
+    @property
+    def year(self): return self[1]
+
+    @property
+    def opening(self): return self[2]
+
+    @property
+    def allocations(self): return self[3:-3:3]
+
+    @property
+    def expenditure(self): return self[4:-3:3]
+
+    @property
+    def balances(self): return self[5:-3:3]
+
+    @property
+    def allocated(self): return sum(self.allocations)
+
+    @property
+    def spent(self): return sum(self.expenditure)
+
+    @property
+    def closing(self): return self[-4]
+
+    @property
+    def deltas(self): return self[-3:]
+
+    @property
+    def values(self): return self[2:]
+
+
+class BurnForecast(tuple):
+    """
+    Burn rate row: (Name, *monthly spend (oldest first), Burn per Month, Balance,
+    Days Left, Exhaustion Date, Days between Allocations, Last Allocation).
+    Days Left / dates are None when there is no spending or allocation history.
+    """
+    __slots__ = ()
+
+    @property
+    def name(self): return self[0]
+
+    @property
+    def monthly(self): return self[1:-6]
+
+    @property
+    def burn_rate(self): return self[-6]
+
+    @property
+    def balance(self): return self[-5]
+
+    @property
+    def days_left(self): return self[-4]
+
+    @property
+    def exhaustion(self): return self[-3]
+
+    @property
+    def cadence(self): return self[-2]
+
+    @property
+    def last_allocation(self): return self[-1]
+
+
+def as_number(value):
+    """Array sums come back as floats; whole rupee amounts are handed out as int."""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+# --- COLUMNAR STORAGE ---
+TYPE_CODES = ("PPA", "ALLOC")
+_NAT = np.datetime64("NaT", "s")
+
+
+class LedgerColumns:
+    """
+    Ledger rows stored column-wise: departments and sheets as integer codes,
+    dates as datetime64[s] (NaT when the cell is not a date), amounts as
+    float64 (NaN when not a number). The rare cells holding text in a date or
+    amount column keep their raw value in `extras` so nothing is lost.
+    """
+    __slots__ = ("departments", "dept", "refs", "dates", "amounts", "types", "sheets", "sheet", "rows", "extras")
+
+    def __init__(self, departments, dept, refs, dates, amounts, types, sheets, sheet, rows, extras):
+        self.departments = departments  # list of names; dept holds indexes into it
+        self.dept = dept
+        self.refs = refs                # list of str (PPA number / "Allocation (n)")
+        self.dates = dates
+        self.amounts = amounts
+        self.types = types              # int8 index into TYPE_CODES
+        self.sheets = sheets            # list of sheet names; sheet holds indexes into it
+        self.sheet = sheet
+        self.rows = rows                # Excel row number of the entry (0 if unknown)
+        self.extras = extras            # {position: (raw date, raw amount)}
+
+    @classmethod
+    def empty(cls):
+        return cls.from_rows(())
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Builds the columns from long format ledger tuples (+ optional Excel row number)."""
+        departments, dept_codes = [], {}
+        sheets, sheet_codes = [], {}
+        dept, refs, dates, amounts, types, sheet, row_nums, extras = [], [], [], [], [], [], [], {}
+        for i, row in enumerate(rows):
+            sub_name, ref, date_val, amt, row_type, sheet_name = row[:6]
+            if sub_name not in dept_codes:
+                dept_codes[sub_name] = len(departments)
+                departments.append(sub_name)
+            if sheet_name not in sheet_codes:
+                sheet_codes[sheet_name] = len(sheets)
+                sheets.append(sheet_name)
+            dept.append(dept_codes[sub_name])
+            sheet.append(sheet_codes[sheet_name])
+            refs.append(ref)
+            types.append(TYPE_CODES.index(row_type))
+            row_nums.append(row[6] if len(row) > 6 else 0)
+            is_date = isinstance(date_val, datetime)
+            is_num = isinstance(amt, (int, float))
+            dates.append(date_val if is_date else _NAT)
+            amounts.append(amt if is_num else np.nan)
+            if (date_val is not None and not is_date) or (amt is not None and not is_num):
+                extras[i] = (None if is_date else date_val, None if is_num else amt)
+        return cls(departments, np.array(dept, dtype=np.int32), refs,
+                   np.array(dates, dtype="datetime64[s]"), np.array(amounts, dtype=np.float64),
+                   np.array(types, dtype=np.int8), sheets, np.array(sheet, dtype=np.int32),
+                   np.array(row_nums, dtype=np.int32), extras)
+
+    @classmethod
+    def concat(cls, blocks):
+        """Joins several blocks (e.g. one per FY sheet), merging the code tables."""
+        blocks = [b for b in blocks if len(b)]
+        if not blocks: return cls.empty()
+        if len(blocks) == 1: return blocks[0]
+        departments, dept_codes, sheets, sheet_codes = [], {}, [], {}
+        dept_parts, sheet_parts, refs, extras = [], [], [], {}
+        offset = 0
+        for b in blocks:
+            remap = []
+            for name in b.departments:
+                if name not in dept_codes:
+                    dept_codes[name] = len(departments)
+                    departments.append(name)
+                remap.append(dept_codes[name])
+            dept_parts.append(np.array(remap, dtype=np.int32)[b.dept])
+            remap = []
+            for name in b.sheets:
+                if name not in sheet_codes:
+                    sheet_codes[name] = len(sheets)
+                    sheets.append(name)
+                remap.append(sheet_codes[name])
+            sheet_parts.append(np.array(remap, dtype=np.int32)[b.sheet])
+            refs.extend(b.refs)
+            for i, raw in b.extras.items(): extras[offset + i] = raw
+            offset += len(b)
+        return cls(departments, np.concatenate(dept_parts), refs,
+                   np.concatenate([b.dates for b in blocks]), np.concatenate([b.amounts for b in blocks]),
+                   np.concatenate([b.types for b in blocks]), sheets, np.concatenate(sheet_parts),
+                   np.concatenate([b.rows for b in blocks]), extras)
+
+    def __len__(self):
+        return len(self.refs)
+
+    def take(self, order):
+        """Rows reordered / selected by an index array (code tables are shared)."""
+        pos = {int(old): new for new, old in enumerate(order)}
+        extras = {pos[i]: raw for i, raw in self.extras.items() if i in pos}
+        return LedgerColumns(self.departments, self.dept[order], [self.refs[i] for i in order],
+                             self.dates[order], self.amounts[order], self.types[order],
+                             self.sheets, self.sheet[order], self.rows[order], extras)
+
+    def nbytes(self):
+        """Approximate memory held: the arrays plus the reference strings."""
+        arrays = (self.dept, self.dates, self.amounts, self.types, self.sheet, self.rows)
+        return sum(a.nbytes for a in arrays) + sys.getsizeof(self.refs) + sum(map(sys.getsizeof, self.refs))
+
+    def to_dataframe(self):
+        """
+        pandas DataFrame of the rows: department, type and sheet as categoricals
+        over the code tables, date (datetime64[s]), amount (float64) and row
+        wrapping the arrays as they are, without a Python object per row. Text
+        in a date/amount cell shows as NaT/NaN (raw values stay in `extras`).
+        Shared columns are read-only: new columns are fine, editing cells in
+        place needs .copy() first.
+        """
+        import pandas as pd     # Only needed for analysis; keeps app start-up light
+
+        def shared(values):
+            # Read-only view, so the frame can never change the cached ledger
+            view = values.view()
+            view.flags.writeable = False
+            return pd.Series(view, copy=False)
+        categorical = pd.Categorical.from_codes
+        return pd.DataFrame({
+            "department": categorical(self.dept, categories=pd.Index(self.departments, dtype=object)),
+            "reference": pd.array(self.refs, dtype=object),
+            "date": shared(self.dates),
+            "amount": shared(self.amounts),
+            "type": categorical(self.types, categories=list(TYPE_CODES)),
+            "sheet": categorical(self.sheet, categories=pd.Index(self.sheets, dtype=object)),
+            "row": shared(self.rows),
+        }, copy=False)
+
+    # --- MASKS USED BY REPORTS ---
+    def has_date(self):
+        return ~np.isnat(self.dates)
+
+    def has_amount(self):
+        return ~np.isnan(self.amounts)
+
+    def has_ref(self):
+        return np.fromiter((bool(r) for r in self.refs), dtype=bool, count=len(self.refs))
+
+    def is_type(self, row_type):
+        return self.types == TYPE_CODES.index(row_type)
+
+    def dept_code(self, sub_name):
+        try: return self.departments.index(sub_name)
+        except ValueError: return -1
+
+    # --- ROW ACCESS ---
+    def date_at(self, i):
+        d = self.dates[i]
+        if np.isnat(d): return self.extras.get(i, (None, None))[0]
+        return d.item()
+
+    def amount_at(self, i):
+        a = self.amounts[i]
+        if np.isnan(a): return self.extras.get(i, (None, None))[1]
+        return as_number(a)
+
+    def entry(self, i):
+        return LedgerEntry(self.departments[self.dept[i]], self.refs[i], self.date_at(i), self.amount_at(i),
+                           TYPE_CODES[self.types[i]], self.sheets[self.sheet[i]])
+
+    def __iter__(self):
+        for i in range(len(self)): yield self.entry(i)
+
+
+class ResultSet:
+    """
+    A selection of rows over LedgerColumns, held as an index array. Slicing and
+    sorting only reorder the index; LedgerEntry objects are created on access.
+    """
+    __slots__ = ("columns", "index")
+
+    def __init__(self, columns, index=None):
+        self.columns = columns
+        self.index = np.arange(len(columns)) if index is None else index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        for i in self.index: yield self.columns.entry(i)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice): return ResultSet(self.columns, self.index[key])
+        return self.columns.entry(self.index[key])
+
+    def filter(self, mask):
+        """Keeps the rows where `mask` (aligned with the full columns) is True."""
+        return ResultSet(self.columns, self.index[mask[self.index]])
+
+    def sort_by_date(self, reverse=False):
+        """
+        Stable sort by date; rows without a date go last. reverse=True keeps
+        equal dates in their original order, like list.sort(reverse=True).
+        """
+        dates = self.columns.dates[self.index]
+        missing = np.isnat(dates)
+        keys = dates.astype(np.int64)
+        keys[missing] = 0
+        if reverse: keys = -keys
+        keys[missing] = np.iinfo(np.int64).max
+        return ResultSet(self.columns, self.index[np.argsort(keys, kind="stable")])
+
+    def column(self, name):
+        """One field for every selected row, e.g. rs.column("amounts")."""
+        values = getattr(self.columns, name)
+        if isinstance(values, list): return [values[i] for i in self.index]
+        return values[self.index]
+
+
+class RowIndex:
+    """
+    Rows of LedgerColumns grouped by (department, bucket): one index array
+    sorted by group plus the offset where each group starts. Fetching a group
+    is a slice, whatever the size of the ledger.
+    """
+    __slots__ = ("columns", "num_buckets", "order", "offsets")
+
+    def __init__(self, columns, rows, buckets, num_buckets):
+        self.columns = columns
+        self.num_buckets = num_buckets
+        keys = columns.dept[rows].astype(np.int64) * num_buckets + buckets
+        self.order = rows[np.argsort(keys, kind="stable")]
+        counts = np.bincount(keys, minlength=len(columns.departments) * num_buckets)
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def rows(self, sub_name, bucket=None):
+        """ResultSet of one department's rows in `bucket` (None: every bucket)."""
+        code = self.columns.dept_code(sub_name)
+        if code < 0: return ResultSet(self.columns, self.order[:0])
+        first = code * self.num_buckets + (bucket or 0)
+        last = first + 1 if bucket is not None else first + self.num_buckets
+        return ResultSet(self.columns, self.order[self.offsets[first]:self.offsets[last]])
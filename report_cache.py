@@ -0,0 +1,130 @@
+import os
+import re
+import time
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+# --- REPORT OUTPUT CACHE ---
+# Generated reports are stored under a key hashed from the report kind, its
+# parameters and the signatures of exactly the sheets it reads (see
+# LedgerCache.signature). A save to the active FY sheet therefore changes the
+# key of the reports reading that sheet and leaves the others valid.
+
+
+_ENTRY = re.compile(r"^[0-9a-f]{40}\.[a-z]+$")     # A finished cache file: <key><ext>
+_ORPHAN_AGE = 24 * 3600                            # Temp files older than this were left by a crash
+
+
+def report_key(kind, params, deps):
+    """Content address of one report: sha1 over kind, parameters and sheet signatures."""
+    return hashlib.sha1(repr((kind, params, deps)).encode("utf-8")).hexdigest()
+
+
+class ReportCache:
+    """
+    Two tiers: datasets (summary/detailed rows) in a small in-memory LRU, and
+    generated files (PDFs) in `cache_dir`, evicted least recently used once
+    the folder exceeds `max_bytes`. cache_dir=None keeps everything in memory
+    and never writes to disk (read-only ledgers, e.g. other offices).
+    """
+    def __init__(self, cache_dir=None, max_bytes=0, max_datasets=32):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_datasets = max_datasets
+        self._datasets = OrderedDict()
+        self._lock = threading.Lock()
+
+    # --- DATASETS (memory) ---
+    def get_data(self, key):
+        with self._lock:
+            if key not in self._datasets: return None
+            self._datasets.move_to_end(key)
+            return self._datasets[key]
+
+    def put_data(self, key, value):
+        with self._lock:
+            self._datasets[key] = value
+            self._datasets.move_to_end(key)
+            while len(self._datasets) > self.max_datasets: self._datasets.popitem(last=False)
+        return value
+
+    def dataset(self, key, compute):
+        cached = self.get_data(key)
+        return cached if cached is not None else self.put_data(key, compute())
+
+    # --- FILES (disk) ---
+    def _file_path(self, key, ext):
+        return os.path.join(self.cache_dir, f"{key}{ext}")
+
+    def get_file(self, key, ext):
+        """Path of the cached file (marked as recently used), or None."""
+        if not self.cache_dir: return None
+        path = self._file_path(key, ext)
+        try: os.utime(path)
+        except OSError: return None
+        return path
+
+    def put_file(self, key, ext, src):
+        """Copies a freshly generated file into the cache. Failures are ignored."""
+        if not self.cache_dir: return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = self._file_path(key, ext) + f".{threading.get_ident()}.tmp"
+            shutil.copyfile(src, tmp)
+            os.replace(tmp, self._file_path(key, ext))
+            self._evict()
+        except OSError: pass
+
+    def _evict(self):
+        # Only finished files count and go; temp files may still be written by another thread
+        entries, now = [], time.time()
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try: st = os.stat(path)
+            except OSError: continue
+            if _ENTRY.match(name): entries.append((st.st_mtime_ns, st.st_size, path))
+            elif now - st.st_mtime > _ORPHAN_AGE:
+                try: os.remove(path)
+                except OSError: pass
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes: break
+            try: os.remove(path)
+            except OSError: continue
+            total -= size
+
+    def prepare_file(self, key, ext, generate):
+        """
+        Generates the file for `key` straight into the cache (e.g. while the app
+        is idle) so the next fetch_file is a copy. Returns True if it is cached.
+        """
+        if not self.cache_dir: return False
+        if self.get_file(key, ext): return True
+        try: os.makedirs(self.cache_dir, exist_ok=True)
+        except OSError: return False
+        tmp = os.path.join(self.cache_dir, f"{key}.render{threading.get_ident()}{ext}")
+        try:
+            ok, res = generate(tmp)
+            if ok: self.put_file(key, ext, res)
+            return ok
+        finally:
+            try: os.remove(tmp)
+            except OSError: pass
+
+    def fetch_file(self, key, ext, dest, generate):
+        """
+        Copies the cached file for `key` to `dest`; on a miss calls
+        generate(dest) -> (ok, path_or_msg) and stores the result.
+        Returns (ok, path_or_msg) like the doc_gen functions.
+        """
+        cached = self.get_file(key, ext)
+        if cached:
+            try:
+                shutil.copyfile(cached, dest)
+                return True, os.path.abspath(dest)
+            except OSError: pass
+        ok, res = generate(dest)
+        if ok: self.put_file(key, ext, res)
+        return ok, res
@@ -0,0 +1,155 @@
+import os
+import shutil
+import argparse
+from copy import copy
+import openpyxl
+from config import Config
+
+# --- SHARDED LEDGER LAYOUT ---
+# Optional layout: data.xlsx keeps only the Limits sheet (the index) and every
+# fiscal year lives in its own workbook, data_years/Transactions_YYYY_YY.xlsx,
+# holding the one sheet of the same name. Saving an entry then only loads and
+# rewrites the current year's small file. The layout is in use whenever the
+# shard folder exists next to the ledger; `split` / `merge` below convert.
+
+
+def shard_dir(db_path):
+    stem = os.path.splitext(os.path.abspath(db_path))[0]
+    return stem + Config.SHARD_DIR_SUFFIX
+
+
+def is_sharded(db_path):
+    return os.path.isdir(shard_dir(db_path))
+
+
+def shard_path(db_path, sheet_name):
+    return os.path.join(shard_dir(db_path), f"{sheet_name}.xlsx")
+
+
+def shard_files(db_path):
+    """FY workbooks of a sharded ledger, oldest year first."""
+    folder = shard_dir(db_path)
+    try: names = os.listdir(folder)
+    except OSError: return []
+    return [os.path.join(folder, n) for n in sorted(names)
+            if n.startswith(Config.TXN_PREFIX) and n.lower().endswith(".xlsx")]
+
+
+def ledger_files(db_path):
+    """Every file making up the ledger: the main workbook first, then any shards."""
+    return [db_path] + shard_files(db_path)
+
+
+def sheet_file(db_path, sheet_name):
+    """File that holds (or will hold) `sheet_name`."""
+    if sheet_name.startswith(Config.TXN_PREFIX) and is_sharded(db_path):
+        return shard_path(db_path, sheet_name)
+    return db_path
+
+
+def open_sheet_book(db_path, sheet_name):
+    """
+    (workbook, path) to edit `sheet_name` in. For a sharded ledger that is the
+    year's own file, started empty if the year has none yet; save to `path`.
+    """
+    path = sheet_file(db_path, sheet_name)
+    if os.path.exists(path): return openpyxl.load_workbook(path), path
+    wb = openpyxl.Workbook()
+    wb.active.title = sheet_name
+    return wb, path
+
+
+# --- MIGRATION ---
+def split(db_path):
+    """
+    Moves every Transactions_ sheet of `db_path` into its own FY workbook.
+    Each shard is the original workbook with the other sheets deleted, so
+    formats and merged headers carry over unchanged.
+    """
+    if is_sharded(db_path): return False, "Ledger is already split by year."
+    folder = shard_dir(db_path)
+    tmp_folder, tmp_index = folder + ".tmp", db_path + ".tmp"
+    try:
+        wb = openpyxl.load_workbook(db_path)
+        year_sheets = [n for n in wb.sheetnames if n.startswith(Config.TXN_PREFIX)]
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+        os.makedirs(tmp_folder)
+
+        for name in year_sheets:
+            shard = openpyxl.load_workbook(db_path)
+            for other in list(shard.sheetnames):
+                if other != name: del shard[other]
+            shard.save(os.path.join(tmp_folder, f"{name}.xlsx"))
+
+        for name in year_sheets: del wb[name]
+        wb.save(tmp_index)
+        os.replace(tmp_folder, folder)
+        try: os.replace(tmp_index, db_path)
+        except OSError:
+            # data.xlsx could not be swapped (e.g. open in Excel): take the folder back out,
+            # or the app would report from the old year sheets while saving to the shards
+            os.replace(folder, tmp_folder)
+            raise
+    except PermissionError: return False, "Error: File open."
+    except Exception as e: return False, f"Error: {e}"
+    finally:
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+        if os.path.exists(tmp_index): os.remove(tmp_index)
+    return True, f"Split {len(year_sheets)} financial years into {folder}"
+
+
+def _copy_sheet(src, dest):
+    for row in src.iter_rows():
+        for cell in row:
+            new = dest.cell(row=cell.row, column=cell.column, value=cell.value)
+            if cell.has_style:
+                new.font = copy(cell.font)
+                new.border = copy(cell.border)
+                new.alignment = copy(cell.alignment)
+                new.fill = copy(cell.fill)
+                new.number_format = cell.number_format
+    for rng in src.merged_cells.ranges:
+        dest.merge_cells(str(rng))
+    for key, dim in src.column_dimensions.items():
+        dest.column_dimensions[key].width = dim.width
+
+
+def merge(db_path):
+    """Copies every FY workbook back into `db_path` and removes the shard folder."""
+    if not is_sharded(db_path): return False, "Ledger is not split by year."
+    folder = shard_dir(db_path)
+    aside, tmp_index = folder + ".merged", db_path + ".tmp"
+    try:
+        wb = openpyxl.load_workbook(db_path)
+        files = shard_files(db_path)
+        for path in files:
+            shard = openpyxl.load_workbook(path)
+            for ws in shard.worksheets:
+                if ws.title in wb.sheetnames: return False, f"Error: {ws.title} exists in both files."
+                _copy_sheet(ws, wb.create_sheet(ws.title))
+        wb.save(tmp_index)
+        # The folder goes aside first (fails while a year file is open), so the
+        # ledger is either still split or fully merged, never both at once
+        shutil.rmtree(aside, ignore_errors=True)
+        os.replace(folder, aside)
+        try: os.replace(tmp_index, db_path)
+        except OSError:
+            os.replace(aside, folder)
+            raise
+        shutil.rmtree(aside, ignore_errors=True)
+    except PermissionError: return False, "Error: File open."
+    except Exception as e: return False, f"Error: {e}"
+    finally:
+        if os.path.exists(tmp_index): os.remove(tmp_index)
+    return True, f"Merged {len(files)} financial years into {os.path.abspath(db_path)}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split the ledger into one workbook per FY, or merge it back.")
+    parser.add_argument("action", choices=["split", "merge"])
+    parser.add_argument("--db", default=Config.DB_FILENAME, help="Ledger workbook")
+    args = parser.parse_args()
+
+    ok, msg = (split if args.action == "split" else merge)(args.db)
+    print(msg)
+    raise SystemExit(0 if ok else 1)
@@ -1,7 +1,15 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import os
+import threading
 from config import Config
+from ledger import TYPE_ALLOC
+from fiscal import get_calendar, PERIOD_QUARTER, PERIOD_HALF, PERIOD_MONTH
+from consolidate import consolidate, generate_consolidated_pdf
+
+# Dashboard view choices -> report period
+PERIOD_VIEWS = {"Quarterly": PERIOD_QUARTER, "Half-yearly": PERIOD_HALF, "Monthly": PERIOD_MONTH}
+COMPARE_VIEW = "Year-over-Year"
 
 class DashboardView(tk.Frame):
     def __init__(self, parent, app_controller):
@@ -11,48 +19,224 @@ class DashboardView(tk.Frame):
         # Header
         top = tk.Frame(self, bg=Config.COLOR_PRIMARY, height=60)
         top.pack(fill="x")
-        tk.Label(top, text="Financial Dashboard (Quarterly)", bg=Config.COLOR_PRIMARY, fg="white", font=Config.FONT_HEADER).pack(side="left", padx=20, pady=15)
+        self.lbl_title = tk.Label(top, text="Financial Dashboard (Quarterly)", bg=Config.COLOR_PRIMARY, fg="white", font=Config.FONT_HEADER)
+        self.lbl_title.pack(side="left", padx=20, pady=15)
         tk.Button(top, text="← Back to Entry", command=lambda: self.controller.show_view("EntryView"), bg="white").pack(side="right", padx=10)
         tk.Button(top, text="Export PDF", command=self.export_pdf, bg=Config.COLOR_DANGER, fg="white", font=Config.FONT_BODY_BOLD).pack(side="right", padx=10)
+        tk.Button(top, text="Export Excel", command=self.export_xlsx, bg=Config.COLOR_SUCCESS, fg="white", font=Config.FONT_BODY_BOLD).pack(side="right", padx=10)
+        self.btn_consolidate = tk.Button(top, text="Consolidate Offices", command=self.consolidate_offices, bg="white")
+        self.btn_consolidate.pack(side="right", padx=10)
+
+        # Period selector
+        self.period_var = tk.StringVar(value="Quarterly")
+        self.period_combo = ttk.Combobox(top, textvariable=self.period_var, state="readonly", width=12, values=[*PERIOD_VIEWS, COMPARE_VIEW])
+        self.period_combo.pack(side="right", padx=10)
+        self.period_combo.bind("<<ComboboxSelected>>", lambda e: self.refresh())
+
+        # Table (columns are rebuilt for the selected period)
+        # COLS: Sub, Limit, <periods...>, Total, Bal
+        self.tree = ttk.Treeview(self, show="headings")
+        self.tree.pack(fill="both", expand=True, padx=20, pady=20)
+        self._build_columns(PERIOD_QUARTER)
+        self.showing_consolidated = False
+
+        # Drill-down: double-click a department cell to list the entries behind it
+        self.tree.tag_configure("entry", foreground="#555555")
+        self.tree.bind("<Double-1>", self.drill_down)
+        self._row_names = {}    # department row iid -> name
+        self._more = {}         # "more" row iid -> (department row iid, entries not shown yet)
+
+    def _build_columns(self, period):
+        labels = get_calendar().period_labels(period)
+        period_cols = [f"p{i}" for i in range(len(labels))]
+        cols = ("sub", "limit", *period_cols, "spent", "bal", "burn", "runout")
+        self.tree.configure(columns=cols)
 
-        # Table
-        # COLS: Sub, Limit, Q1, Q2, Q3, Q4, Total, Bal
-        cols = ("sub", "limit", "q1", "q2", "q3", "q4", "spent", "bal")
-        self.tree = ttk.Treeview(self, columns=cols, show="headings")
-        
         self.tree.heading("sub", text="Department")
         self.tree.heading("limit", text="Limit")
-        self.tree.heading("q1", text="Q1 (Apr-Jun)")
-        self.tree.heading("q2", text="Q2 (Jul-Sep)")
-        self.tree.heading("q3", text="Q3 (Oct-Dec)")
-        self.tree.heading("q4", text="Q4 (Jan-Mar)")
+        for col, label in zip(period_cols, labels):
+            self.tree.heading(col, text=label)
         self.tree.heading("spent", text="Total")
         self.tree.heading("bal", text="Balance")
-        
+        self.tree.heading("burn", text="Burn/Month")
+        self.tree.heading("runout", text="Runs Out")
+
         # Widths
         self.tree.column("sub", width=180)
+        num_width = 90 if len(labels) <= 4 else 60
         for c in cols[1:]:
-            self.tree.column(c, width=90, anchor="w")
-            
-        self.tree.pack(fill="both", expand=True, padx=20, pady=20)
+            self.tree.column(c, width=num_width, anchor="w")
+
+    def _build_compare_columns(self):
+        cols = ("sub", "fy", "opening", "q0", "q1", "q2", "q3", "alloc", "spent", "closing", "d_spent", "d_closing")
+        self.tree.configure(columns=cols)
+        labels = ["Department", "FY", "Opening", *get_calendar().period_names(), "Allocated", "Spent", "Closing",
+                  "Δ Spent", "Δ Closing"]
+        for col, label in zip(cols, labels):
+            self.tree.heading(col, text=label)
+            self.tree.column(col, width=85, anchor="w")
+        self.tree.column("sub", width=180)
+        self.tree.column("fy", width=60)
 
     def refresh(self):
+        view_name = self.period_var.get()
+        self.lbl_title.config(text=f"Financial Dashboard ({view_name})")
+        self.showing_consolidated = False
+        if view_name == COMPARE_VIEW:
+            self._build_compare_columns()
+            self._show_comparison(self.controller.system.get_year_comparison())
+            return
+        period = PERIOD_VIEWS[view_name]
+        self._build_columns(period)
+        self._show_rows(self.controller.system.get_summary_report(period),
+                        self.controller.system.get_burn_forecast())
+
+    def on_ledger_changed(self, changed_sheets, visible):
+        # Pushed by the file watcher; data is already parsed, this only re-renders
+        if visible and not self.showing_consolidated: self.refresh()
+
+    def _clear(self):
         for i in self.tree.get_children(): self.tree.delete(i)
-        data = self.controller.system.get_summary_report()
+        self._row_names, self._more = {}, {}
+
+    def _show_rows(self, data, forecast=()):
+        self._clear()
+        by_name = {f.name: f for f in forecast}
         for row in data:
-            # row is tuple: (Name, Limit, q1, q2, q3, q4, tot, bal)
-            fmt_row = [row[0]]
+            # row is a DepartmentSummary: (Name, Limit, *periods, tot, bal)
+            fmt_row = [row.name]
             for val in row[1:]:
                 fmt_row.append(self.controller.format_currency(val))
-            self.tree.insert("", "end", values=fmt_row)
+            # Burn rate columns (not available for the consolidated view)
+            f = by_name.get(row.name)
+            if f:
+                if f.days_left == 0: runs_out = "Exhausted"
+                else: runs_out = f.exhaustion.strftime("%d-%m-%Y") if f.exhaustion else "-"
+                fmt_row += [self.controller.format_currency(f.burn_rate), runs_out]
+            self._row_names[self.tree.insert("", "end", values=fmt_row)] = row.name
+
+    def drill_down(self, event):
+        # Expands (or collapses) the PPAs and allocations behind the clicked cell;
+        # the period columns list that period, the other columns the whole year
+        view = self.period_var.get()
+        if self.showing_consolidated or view not in PERIOD_VIEWS: return
+        iid = self.tree.identify_row(event.y)
+        if iid in self._more:
+            parent, entries = self._more.pop(iid)
+            self.tree.delete(iid)
+            self._insert_entries(parent, entries, PERIOD_VIEWS[view])
+            return
+        if iid not in self._row_names: return
+        children = self.tree.get_children(iid)
+        if children:
+            self.tree.delete(*children)
+            self._more = {k: v for k, v in self._more.items() if v[0] != iid}
+            return
+
+        col = self.tree.column(self.tree.identify_column(event.x), "id")
+        bucket = int(col[1:]) if col.startswith("p") else None
+        entries = self.controller.system.get_period_entries(self._row_names[iid], bucket, PERIOD_VIEWS[view])
+        if not len(entries): return
+        self._insert_entries(iid, entries, PERIOD_VIEWS[view])
+        self.tree.item(iid, open=True)
+
+    def _insert_entries(self, parent, entries, period):
+        # One page at a time; the last row loads the next page
+        cols = self.tree["columns"]
+        cal = get_calendar()
+        page, rest = entries[:Config.DRILLDOWN_PAGE], entries[Config.DRILLDOWN_PAGE:]
+        for e in page:
+            values = [""] * len(cols)
+            # Every indexed entry is dated: the amount goes under its own period column
+            values[0] = f"    {e.date.strftime('%d-%m-%Y')}  {e.reference}"
+            amt = self.controller.format_currency(e.amount)
+            values[cols.index(f"p{cal.period_index(e.date, period)}")] = f"+ {amt}" if e.type == TYPE_ALLOC else amt
+            self.tree.insert(parent, "end", values=values, tags=("entry",))
+        if len(rest):
+            more = self.tree.insert(parent, "end", values=[f"    ... {len(rest)} more (double-click)"], tags=("entry",))
+            self._more[more] = (parent, rest)
+
+    def _show_comparison(self, data):
+        self._clear()
+        fmt = self.controller.format_currency
+        prev_name = None
+        for row in data:
+            # row is a YearComparison; department name on its first year only
+            d_spent, d_closing = row.deltas[1:]
+            values = [row.name if row.name != prev_name else "", row.year, fmt(row.opening),
+                      *[fmt(v) for v in row.expenditure], fmt(row.allocated), fmt(row.spent), fmt(row.closing),
+                      ("+" if d_spent > 0 else "") + str(fmt(d_spent)), ("+" if d_closing > 0 else "") + str(fmt(d_closing))]
+            prev_name = row.name
+            self.tree.insert("", "end", values=values)
 
     def export_pdf(self):
-        # CHANGED: Now fetching detailed data specifically for the PDF
-        data = self.controller.system.get_detailed_report_data()
-        if not data: 
+        if self.period_var.get() == COMPARE_VIEW and not self.showing_consolidated:
+            ok, res = self.controller.system.create_comparison_pdf()
+            if ok: os.startfile(res)
+            else: messagebox.showerror("Error", res)
+            return
+
+        # Detailed data specifically for the PDF (reused from the report cache if unchanged)
+        if not self.controller.system.get_detailed_report_data():
             messagebox.showinfo("Info", "No data available to export.")
             return
             
-        ok, res = self.controller.system.create_dashboard_pdf(data)
+        ok, res = self.controller.system.create_detailed_pdf()
+        if ok: os.startfile(res)
+        else: messagebox.showerror("Error", res)
+
+    def export_xlsx(self):
+        # Dashboard (current period view) + quarterly running balance table
+        dest = filedialog.asksaveasfilename(title="Export Excel", defaultextension=".xlsx",
+                                            filetypes=[("Excel", "*.xlsx")])
+        if not dest: return
+        period = PERIOD_VIEWS.get(self.period_var.get(), PERIOD_QUARTER)
+        ok, res = self.controller.system.create_report_xlsx(period, filename=dest)
         if ok: os.startfile(res)
-        else: messagebox.showerror("Error", res)
\ No newline at end of file
+        else: messagebox.showerror("Error", res)
+
+    def consolidate_offices(self):
+        # Combines every office's ledger in a folder (quarterly view + PDF).
+        # Runs on a worker thread (it starts its own process pool); the UI stays usable.
+        directory = filedialog.askdirectory(title="Folder with office ledgers")
+        if not directory: return
+        self.config(cursor="watch")
+        self.btn_consolidate.config(state="disabled", text="Consolidating...")
+        result = {}
+
+        def work():
+            try:
+                report = consolidate(directory)
+                result["done"] = (report, generate_consolidated_pdf(report) if report.offices else None)
+            except Exception as e: result["done"] = (None, (False, f"Error: {e}"))
+        threading.Thread(target=work, daemon=True).start()
+        self.after(Config.WATCH_POLL_MS, self._consolidation_done, result)
+
+    def _consolidation_done(self, result):
+        if "done" not in result:
+            self.after(Config.WATCH_POLL_MS, self._consolidation_done, result)
+            return
+        self.config(cursor="")
+        self.btn_consolidate.config(state="normal", text="Consolidate Offices")
+        report, pdf = result["done"]
+        if report is None:
+            messagebox.showerror("Error", pdf[1])
+            return
+        if not report.offices:
+            messagebox.showinfo("Info", "No office ledgers found in that folder.")
+            return
+
+        self.period_var.set("Quarterly")
+        self.showing_consolidated = True
+        self.lbl_title.config(text=f"Consolidated Dashboard ({len(report.offices)} Offices)")
+        self._build_columns(PERIOD_QUARTER)
+        self._show_rows(report.summary)
+
+        ok, res = pdf
+        if not ok:
+            messagebox.showerror("Error", res)
+            return
+        if report.errors:
+            skipped = "\n".join(f"{os.path.basename(p)}: {e}" for p, e in report.errors.items())
+            messagebox.showwarning("Skipped", f"Some files were skipped:\n{skipped}")
+        os.startfile(res)
\ No newline at end of file
@@ -4,6 +4,7 @@ from tkcalendar import Calendar
 from datetime import datetime, date
 from num2words import num2words
 from config import Config
+import bulk_paste
 import os 
 
 # --- CUSTOM TOGGLE SWITCH CLASS ---
@@ -53,6 +54,8 @@ class EntryView(tk.Frame):
         self.controller = app_controller
         self.editing_item_iid = None
         self.is_alloc_mode = False 
+        self.session_total = 0
+        self.row_ppas = {}          # {tree item: PPA as typed}; Tk hands numeric-looking values back as ints
         self.setup_ui()
 
     def setup_ui(self):
@@ -83,6 +86,7 @@ class EntryView(tk.Frame):
         self.sub_combo = ttk.Combobox(left_panel, textvariable=self.sub_var, state="readonly", font=Config.FONT_ENTRY)
         self.sub_combo['values'] = self.controller.system.get_subsidiaries()
         self.sub_combo.pack(fill="x", pady=(5, 15))
+        self.sub_combo.bind("<<ComboboxSelected>>", self.update_balance_preview)
 
         self.ppa_frame = tk.Frame(left_panel, bg=Config.COLOR_BG_MAIN)
         self.ppa_frame.pack(fill="x", pady=(5, 15))
@@ -96,6 +100,8 @@ class EntryView(tk.Frame):
         self.ppa_entry.bind("<Button-1>", self.restore_ppa_style)
         self.lbl_ppa_preview = tk.Label(left_panel, text="", bg=Config.COLOR_BG_MAIN, fg=Config.COLOR_PRIMARY, font=Config.FONT_PREVIEW_LARGE)
         self.lbl_ppa_preview.pack(anchor="w", after=self.ppa_frame)
+        self.lbl_ppa_hint = tk.Label(left_panel, text="", bg=Config.COLOR_BG_MAIN, fg=Config.COLOR_TEXT_LIGHT, font=Config.FONT_SMALL, wraplength=350, justify="left")
+        self.lbl_ppa_hint.pack(anchor="w", after=self.lbl_ppa_preview)
 
         self.lbl_amt_title = tk.Label(left_panel, text="Amount (₹):", bg=Config.COLOR_BG_MAIN, font=Config.FONT_BODY)
         self.lbl_amt_title.pack(anchor="w")
@@ -103,8 +109,11 @@ class EntryView(tk.Frame):
         self.amount_entry = tk.Entry(left_panel, font=Config.FONT_ENTRY, validate="key", validatecommand=vcmd)
         self.amount_entry.pack(fill="x", pady=(5, 2))
         self.lbl_amt_words = tk.Label(left_panel, text="", bg=Config.COLOR_BG_MAIN, fg=Config.COLOR_AMOUNT_PREVIEW, font=Config.FONT_BODY_BOLD, wraplength=350, justify="left")
-        self.lbl_amt_words.pack(anchor="w", pady=(0, 15))
+        self.lbl_amt_words.pack(anchor="w", pady=(0, 2))
+        self.lbl_balance = tk.Label(left_panel, text="", bg=Config.COLOR_BG_MAIN, font=Config.FONT_SMALL, justify="left")
+        self.lbl_balance.pack(anchor="w", pady=(0, 13))
         self.amount_entry.bind("<KeyRelease>", self.update_amount_words)
+        self.amount_entry.bind("<KeyRelease>", self.update_balance_preview, add="+")
 
         tk.Label(left_panel, text="Date:", bg=Config.COLOR_BG_MAIN, font=Config.FONT_BODY).pack(anchor="w")
         date_frame = tk.Frame(left_panel, bg=Config.COLOR_BG_MAIN)
@@ -112,11 +121,14 @@ class EntryView(tk.Frame):
         self.date_entry = tk.Entry(date_frame, font=Config.FONT_ENTRY)
         self.date_entry.pack(side="left", fill="x", expand=True)
         self.date_entry.insert(0, date.today().strftime("%d-%m-%Y"))
+        self.date_entry.bind("<KeyRelease>", self.update_balance_preview)
         btn_cal = tk.Button(date_frame, text="📅", command=self.open_calendar, bg=Config.COLOR_PRIMARY, fg="white", font=Config.FONT_BODY)
         btn_cal.pack(side="left", padx=5)
 
         self.btn_submit = tk.Button(left_panel, text="Submit PPA (To Preview)", command=self.submit_data, bg=Config.COLOR_PRIMARY, fg=Config.COLOR_BG_WHITE, font=Config.FONT_SUBHEADER, height=2, cursor="hand2")
         self.btn_submit.pack(fill="x")
+        self.btn_paste = tk.Button(left_panel, text="📋 Paste PPA List", command=self.open_paste, bg=Config.COLOR_SECONDARY, fg="white", font=Config.FONT_SMALL, cursor="hand2")
+        self.btn_paste.pack(fill="x", pady=(5, 0))
         self.btn_cancel = tk.Button(left_panel, text="Cancel Editing", command=self.cancel_edit, bg=Config.COLOR_TEXT_LIGHT, fg=Config.COLOR_TEXT, font=Config.FONT_SMALL)
 
         nav_frame = tk.Frame(left_panel, bg=Config.COLOR_BG_MAIN)
@@ -161,13 +173,18 @@ class EntryView(tk.Frame):
             self.lbl_toggle.config(text="Allocation Mode: ON", fg=Config.COLOR_ALLOC_MODE)
             self.ppa_frame.pack_forget()
             self.lbl_ppa_preview.pack_forget()
+            self.lbl_ppa_hint.pack_forget()
             self.btn_submit.config(text="Add Allocation", bg=Config.COLOR_ALLOC_MODE)
+            self.btn_paste.config(state="disabled")
         else:
             self.lbl_header.config(text="Transaction Form")
             self.lbl_toggle.config(text="Allocation Mode: OFF", fg=Config.COLOR_TEXT_LIGHT)
             self.ppa_frame.pack(fill="x", pady=(5, 15), after=self.sub_combo) 
             self.lbl_ppa_preview.pack(anchor="w", after=self.ppa_frame)
+            self.lbl_ppa_hint.pack(anchor="w", after=self.lbl_ppa_preview)
             self.btn_submit.config(text="Submit PPA (To Preview)", bg=Config.COLOR_PRIMARY)
+            self.btn_paste.config(state="normal")
+        self.update_balance_preview()
 
     def on_ppa_change(self, *args):
         val = self.ppa_var.get().upper()
@@ -189,8 +206,51 @@ class EntryView(tk.Frame):
             self.lbl_ppa.config(text=f"PPA Number ({count}/13):", fg="black")
             color = Config.COLOR_PRIMARY
             
+        # 2. Duplicate check / existing matches from the PPA index
+        if count == 13 and is_alnum and self.show_ppa_duplicate(val):
+            color = Config.COLOR_DANGER
+        else:
+            self.show_ppa_matches(val)
+            
         self.lbl_ppa_preview.config(text=" ".join(val), fg=color)
 
+    def _session_ppas(self):
+        # PPAs already keyed in this session (except the row being edited)
+        return {ppa for i, ppa in self.row_ppas.items() if i != self.editing_item_iid}
+
+    def show_ppa_duplicate(self, val):
+        where = self.controller.system.get_ppa_index().lookup(val)
+        if where:
+            msg = f"Duplicate: PPA already saved in {where}"
+        elif val in self._session_ppas():
+            msg = "Duplicate: PPA already added in this session"
+        else:
+            near = self.controller.system.get_ppa_index().nearest(val)
+            hint = f"New PPA. Closest existing: {', '.join(near)}" if near else "New PPA."
+            self.lbl_ppa_hint.config(text=hint, fg=Config.COLOR_TEXT_LIGHT)
+            return False
+        self.lbl_ppa.config(text="PPA Number (Duplicate!):", fg=Config.COLOR_DANGER)
+        self.lbl_ppa_hint.config(text=msg, fg=Config.COLOR_DANGER)
+        return True
+
+    def show_ppa_matches(self, val):
+        if len(val) < Config.PPA_SUGGEST_MIN_CHARS or not val.isalnum():
+            self.lbl_ppa_hint.config(text="")
+            return
+        index = self.controller.system.get_ppa_index()
+        matches = index.complete(val)
+        if not matches:
+            self.lbl_ppa_hint.config(text="")
+            return
+        total = index.count_prefix(val)
+        more = f" (+{total - len(matches)} more)" if total > len(matches) else ""
+        self.lbl_ppa_hint.config(text=f"Existing: {', '.join(matches)}{more}", fg=Config.COLOR_TEXT_LIGHT)
+
+    def on_ledger_changed(self, changed_sheets, visible):
+        # Departments added to Limits in Excel show up without a restart
+        if Config.SHEET_LIMITS in changed_sheets:
+            self.sub_combo['values'] = self.controller.system.get_subsidiaries()
+
     def update_amount_words(self, e):
         try:
             amt = int(self.amount_entry.get())
@@ -212,6 +272,9 @@ class EntryView(tk.Frame):
             if not ppa_val or not ppa_val.isalnum() or len(ppa_val)!=13:
                 messagebox.showerror("Error", "Invalid PPA")
                 return
+            if ppa_val in self._session_ppas():
+                messagebox.showerror("Error", f"PPA {ppa_val} is already in this session.")
+                return
 
         try: 
             amt = int(amt_str)
@@ -223,10 +286,13 @@ class EntryView(tk.Frame):
         row_data = (sub, ppa_val, self.controller.format_currency(amt), date_str)
         
         if self.editing_item_iid:
+            delta = amt - self.controller.parse_currency(self.tree.item(self.editing_item_iid)['values'][2])
             self.tree.item(self.editing_item_iid, values=row_data)
+            self.row_ppas[self.editing_item_iid] = ppa_val
             self.cancel_edit()
         else:
-            self.tree.insert("", 0, values=row_data)
+            delta = amt
+            self.row_ppas[self.tree.insert("", 0, values=row_data)] = ppa_val
             self.sub_combo.config(state="disabled")
             self.toggle_btn.disable()
             self.amount_entry.delete(0, tk.END)
@@ -235,7 +301,77 @@ class EntryView(tk.Frame):
                 self.ppa_entry.config(fg=Config.COLOR_DIM_TEXT)
                 self.ppa_entry.focus_set()
                 self.ppa_entry.select_range(0, tk.END)
-        self.update_total()
+        self.update_total(delta)
+
+    def open_paste(self):
+        sub = self.sub_var.get()
+        if not sub:
+            messagebox.showerror("Error", "Select the Department first")
+            return
+        top = tk.Toplevel(self)
+        top.title(f"Paste PPA List: {sub}")
+        top.geometry(f"+{self.winfo_rootx() + 120}+{self.winfo_rooty() + 80}")
+        # Modal: the Department and mode stay as checked until the dialog closes
+        top.transient(self)
+        top.grab_set()
+        tk.Label(top, text="One PPA per line: PPA number, amount, date (dd-mm-yyyy; the form's date if left out).\n"
+                           "Cells copied from Excel, or values separated by commas or spaces.",
+                 font=Config.FONT_SMALL, justify="left").pack(anchor="w", padx=10, pady=(10, 5))
+        txt = tk.Text(top, width=60, height=14, font=Config.FONT_MONO)
+        txt.pack(fill="both", expand=True, padx=10)
+        try: txt.insert("1.0", self.clipboard_get())
+        except tk.TclError: pass
+        lbl_result = tk.Label(top, text="", font=Config.FONT_SMALL, justify="left", anchor="w", wraplength=480)
+        lbl_result.pack(fill="x", padx=10, pady=5)
+        problems = tk.Text(top, width=60, height=6, font=Config.FONT_SMALL, fg=Config.COLOR_DANGER, state="disabled")
+
+        def check():
+            try: default_date = datetime.strptime(self.date_entry.get(), "%d-%m-%Y").date()
+            except ValueError: default_date = None
+            rows = self.tree.get_children()
+            batch_date = datetime.strptime(self.tree.item(rows[0])['values'][3], "%d-%m-%Y").date() if rows else None
+            return bulk_paste.check_paste(self.controller.system, sub, txt.get("1.0", tk.END), self._session_ppas(),
+                                          self.session_total, batch_date, default_date)
+
+        def show(result, added=False):
+            fmt = self.controller.format_currency
+            verb = "Added" if added else "Valid"
+            text = f"{verb}: {len(result.rows)} PPA(s), {fmt(result.total)}"
+            if result.sheet_name: text += f" to {result.sheet_name}, {fmt(result.available)} of the limit left"
+            if result.rejected: text += f"   ·   {len(result.rejected)} line(s) need fixing"
+            lbl_result.config(text=text, fg=Config.COLOR_WARNING if result.rejected else Config.COLOR_SUCCESS)
+            problems.config(state="normal")
+            problems.delete("1.0", tk.END)
+            problems.insert("1.0", "\n".join(f"Line {r.line}: {r.text}  ({r.reason})" for r in result.rejected))
+            problems.config(state="disabled")
+            if result.rejected: problems.pack(fill="x", padx=10, after=lbl_result)
+            else: problems.pack_forget()
+
+        def add():
+            result = check()
+            self.add_pasted_rows(sub, result.rows)
+            show(result, added=True)
+            # Only the lines still to fix stay in the box
+            txt.delete("1.0", tk.END)
+            txt.insert("1.0", "\n".join(r.text for r in result.rejected))
+            if not result.rejected: top.destroy()
+
+        btns = tk.Frame(top)
+        btns.pack(side="bottom", fill="x", padx=10, pady=10)
+        tk.Button(btns, text="Check", command=lambda: show(check()), bg=Config.COLOR_SECONDARY, fg="white", font=Config.FONT_SMALL).pack(side="left")
+        tk.Button(btns, text="Add Valid PPAs (To Preview)", command=add, bg=Config.COLOR_PRIMARY, fg="white", font=Config.FONT_SMALL).pack(side="right")
+        txt.focus_set()
+
+    def add_pasted_rows(self, sub, rows):
+        if not rows: return
+        # Pasted order, on top of the list like keyed entries; the total is updated once
+        fmt = self.controller.format_currency
+        for i, row in enumerate(rows):
+            item = self.tree.insert("", i, values=(sub, row.ppa, fmt(row.amount), row.date.strftime("%d-%m-%Y")))
+            self.row_ppas[item] = row.ppa
+        self.sub_combo.config(state="disabled")
+        self.toggle_btn.disable()
+        self.update_total(sum(row.amount for row in rows))
 
     def validate_data(self):
         if not self.tree.get_children(): return
@@ -249,7 +385,7 @@ class EntryView(tk.Frame):
             if not target_sub: target_sub = v[0]
             amt = self.controller.parse_currency(v[2])
             dt = datetime.strptime(v[3], "%d-%m-%Y").date()
-            batch.append((v[1], dt, amt))
+            batch.append((self.row_ppas[item], dt, amt))
         
         if is_alloc_batch:
             ok, msg = self.controller.system.save_allocation_batch(target_sub, batch)
@@ -261,6 +397,8 @@ class EntryView(tk.Frame):
             self.controller.is_session_saved = True
             self.btn_submit.config(state="disabled")
             self.btn_val.config(state="disabled")
+            self.btn_paste.config(state="disabled")
+            self.update_balance_preview()
             if not is_alloc_batch:
                 self.btn_exp.config(state="normal", bg=Config.COLOR_SUCCESS)
         else:
@@ -268,6 +406,7 @@ class EntryView(tk.Frame):
 
     def restart_session(self):
         for i in self.tree.get_children(): self.tree.delete(i)
+        self.row_ppas.clear()
         self.sub_combo.config(state="readonly")
         self.sub_var.set("")
         self.ppa_var.set("")
@@ -282,8 +421,10 @@ class EntryView(tk.Frame):
         
         self.btn_submit.config(state="normal", bg=Config.COLOR_PRIMARY)
         self.btn_val.config(state="normal")
+        self.btn_paste.config(state="normal")
         self.btn_exp.config(state="disabled", bg=Config.COLOR_TEXT_LIGHT)
         self.restore_ppa_style(None)
+        self.session_total = 0
         self.update_total()
         self.lbl_ppa.config(text="PPA Number (0/13):", fg="black") # Reset label text
 
@@ -299,13 +440,40 @@ class EntryView(tk.Frame):
             self.date_entry.delete(0, tk.END)
             self.date_entry.insert(0, cal.get_date())
             top.destroy()
+            self.update_balance_preview()
         tk.Button(top, text="Confirm", command=set_date, bg=Config.COLOR_PRIMARY, fg="white").pack(pady=5)
 
-    def update_total(self):
-        total = 0
-        for item in self.tree.get_children():
-            total += self.controller.parse_currency(self.tree.item(item)['values'][2])
-        self.lbl_total.config(text=f"Session Total: {self.controller.format_currency(total)}")
+    def update_total(self, delta=0):
+        # Running total: each insert/edit/delete passes its change instead of re-reading every row
+        self.session_total += delta
+        self.lbl_total.config(text=f"Session Total: {self.controller.format_currency(self.session_total)}")
+        self.update_balance_preview()
+
+    def update_balance_preview(self, e=None):
+        # Live headroom from in-memory counters: Limit - FY spend - session - amount typed
+        sub = self.sub_var.get()
+        if not sub or self.is_alloc_mode or self.controller.is_session_saved:
+            self.lbl_balance.config(text="")
+            return
+        try: typed = int(self.amount_entry.get() or 0)
+        except ValueError: typed = 0
+        try: date_obj = datetime.strptime(self.date_entry.get(), "%d-%m-%Y")
+        except ValueError: date_obj = None
+
+        pending = self.session_total
+        if self.editing_item_iid:
+            pending -= self.controller.parse_currency(self.tree.item(self.editing_item_iid)['values'][2])
+        info = self.controller.system.precheck_limit(sub, pending + typed, date_obj)
+
+        fmt = self.controller.format_currency
+        before = info["available"] + typed
+        if info["ok"]:
+            text = f"Available: {fmt(before)}   After this entry: {fmt(info['available'])}"
+            color = Config.COLOR_WARNING if typed and info["available"] < typed else Config.COLOR_SUCCESS
+        else:
+            text = f"Available: {fmt(max(before, 0))}   Exceeds limit by {fmt(-info['available'])}"
+            color = Config.COLOR_DANGER
+        self.lbl_balance.config(text=text, fg=color)
 
     def export_word(self):
         if not self.tree.get_children(): return
@@ -313,7 +481,7 @@ class EntryView(tk.Frame):
         if first[1] == "ALLOCATION":
             messagebox.showinfo("Info", "Allocation entries do not generate notings.")
             return
-        batch = [(self.tree.item(i)['values'][1], self.tree.item(i)['values'][2]) for i in self.tree.get_children()]
+        batch = [(self.row_ppas[i], self.tree.item(i)['values'][2]) for i in self.tree.get_children()]
         ok, res = self.controller.system.create_word_advice(first[0], first[3], batch)
         if ok: os.startfile(res)
         else: messagebox.showerror("Error", res)
@@ -328,8 +496,10 @@ class EntryView(tk.Frame):
     def delete_row(self):
         sel = self.tree.selection()
         if sel:
+            amt = self.controller.parse_currency(self.tree.item(sel[0])['values'][2])
             self.tree.delete(sel[0])
-            self.update_total()
+            self.row_ppas.pop(sel[0], None)
+            self.update_total(-amt)
             if not self.tree.get_children():
                 self.sub_combo.config(state="readonly")
                 self.toggle_btn.config(state="normal")
@@ -345,7 +515,7 @@ class EntryView(tk.Frame):
                 if not self.is_alloc_mode: self.toggle_btn.toggle()
             else:
                 if self.is_alloc_mode: self.toggle_btn.toggle()
-                self.ppa_var.set(v[1])
+                self.ppa_var.set(self.row_ppas[sel[0]])
             self.amount_entry.delete(0, tk.END)
             self.amount_entry.insert(0, str(self.controller.parse_currency(v[2])))
             self.date_entry.delete(0, tk.END)
@@ -353,6 +523,7 @@ class EntryView(tk.Frame):
             self.btn_submit.config(text="Update Entry", bg=Config.COLOR_WARNING)
             self.btn_cancel.pack(pady=5)
             self.update_amount_words(None)
+            self.update_balance_preview()
             self.restore_ppa_style(None)
 
     def cancel_edit(self):
@@ -362,6 +533,7 @@ class EntryView(tk.Frame):
         self.btn_cancel.pack_forget()
         self.ppa_var.set("")
         self.amount_entry.delete(0, tk.END)
+        self.update_balance_preview()
 
     def restore_ppa_style(self, e):
         self.ppa_entry.config(fg="black")
@@ -1,7 +1,9 @@
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, messagebox, filedialog
+import os
 from datetime import datetime
 from config import Config
+from fiscal import get_calendar
 
 class HistoryView(tk.Frame):
     def __init__(self, parent, app_controller):
@@ -27,7 +29,7 @@ class HistoryView(tk.Frame):
         tk.Label(f_frame, text="Quarter:", bg=Config.COLOR_BG_MAIN).pack(side="left", padx=(10, 0))
         self.q_var = tk.StringVar()
         self.q_combo = ttk.Combobox(f_frame, textvariable=self.q_var, state="readonly", width=10)
-        self.q_combo['values'] = ["All", "Q1", "Q2", "Q3", "Q4"]
+        self.q_combo['values'] = ["All"] + get_calendar().period_names()
         self.q_combo.current(0)
         self.q_combo.pack(side="left", padx=5)
 
@@ -37,6 +39,8 @@ class HistoryView(tk.Frame):
         tk.Entry(f_frame, textvariable=self.ppa_var, width=15).pack(side="left")
         
         tk.Button(f_frame, text="Search", command=self.run_search, bg=Config.COLOR_PRIMARY, fg="white").pack(side="left", padx=20)
+        tk.Button(f_frame, text="Export Ledger", command=self.export_ledger, bg=Config.COLOR_SECONDARY, fg="white").pack(side="left")
+        tk.Button(f_frame, text="Statement PDF", command=self.export_statement, bg=Config.COLOR_SECONDARY, fg="white").pack(side="left", padx=5)
 
         # Table
         cols = ("sub", "ppa", "date", "amt")
@@ -63,6 +67,15 @@ class HistoryView(tk.Frame):
         self.combo.current(0)
         self.run_search()
 
+    def on_ledger_changed(self, changed_sheets, visible):
+        # Pushed by the file watcher: keep the user's filters, just re-run them
+        if not visible: return
+        current = self.dept_var.get()
+        subs = ["All Departments"] + self.controller.system.get_subsidiaries()
+        self.combo['values'] = subs
+        if current not in subs: self.combo.current(0)
+        self.run_search()
+
     def run_search(self):
         for i in self.tree.get_children(): self.tree.delete(i)
         d_val = self.dept_var.get()
@@ -72,6 +85,27 @@ class HistoryView(tk.Frame):
         data = self.controller.system.search_transactions(subsidiary=d_val, ppa_text=p_val, quarter=q_val)
         
         for row in data:
-            dt = row[2].strftime("%d-%m-%Y") if isinstance(row[2], datetime) else str(row[2])
-            amt = self.controller.format_currency(row[3])
-            self.tree.insert("", "end", values=(row[0], row[1], dt, amt))
\ No newline at end of file
+            dt = row.date.strftime("%d-%m-%Y") if isinstance(row.date, datetime) else str(row.date)
+            amt = self.controller.format_currency(row.amount)
+            self.tree.insert("", "end", values=(row.department, row.reference, dt, amt))
+
+    def export_ledger(self):
+        # Exports ALL fiscal years, narrowed by the same filters as the search
+        dest = filedialog.asksaveasfilename(
+            title="Export Ledger", defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("Excel", "*.xlsx"), ("JSON Lines", "*.jsonl"), ("Parquet", "*.parquet"), ("Arrow", "*.arrow")])
+        if not dest: return
+        ok, msg = self.controller.system.export_ledger(
+            dest, subsidiary=self.dept_var.get(), ppa_text=self.ppa_var.get().strip(), quarter=self.q_var.get())
+        if ok: messagebox.showinfo("Export", msg)
+        else: messagebox.showerror("Error", msg)
+
+    def export_statement(self):
+        # Full statement (all years) of the selected department with running balance
+        d_val = self.dept_var.get()
+        if not d_val or d_val == "All Departments":
+            messagebox.showwarning("Statement", "Select a department first.")
+            return
+        ok, res = self.controller.system.create_statement_pdf(d_val)
+        if ok: os.startfile(res)
+        else: messagebox.showerror("Error", res)
@@ -0,0 +1,116 @@
+import os
+import sys
+import struct
+import select
+import ctypes
+import threading
+from config import Config
+import shards
+
+# inotify event masks (linux/inotify.h)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_NONBLOCK = 0o4000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_inotify():
+    """libc's inotify functions on Linux, otherwise None (we fall back to polling)."""
+    if not sys.platform.startswith("linux"): return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError): return None
+
+
+class LedgerWatcher(threading.Thread):
+    """
+    Watches data.xlsx (and its per-year files, if split) from a daemon thread and
+    calls `on_change()` (on this thread) once a file has been rewritten and has
+    stopped changing.
+    Uses inotify on the folder where available (Excel saves via a temp file +
+    rename), otherwise polls the file's mtime/size every WATCH_INTERVAL seconds.
+    """
+    def __init__(self, path, on_change):
+        super().__init__(daemon=True)
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self._stop_event = threading.Event()
+        self._last_stat = self._stat()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _stat(self):
+        # mtime/size of data.xlsx and, if the ledger is split by year, of every year's file
+        try:
+            stats = []
+            for path in shards.ledger_files(self.path):
+                st = os.stat(path)
+                stats.append((path, st.st_mtime_ns, st.st_size))
+            return tuple(stats)
+        except OSError: return None
+
+    def _settle_and_notify(self):
+        # Wait until the save is complete (stat unchanged for one debounce period)
+        stat = self._stat()
+        while not self._stop_event.wait(Config.WATCH_DEBOUNCE):
+            newer = self._stat()
+            if newer == stat: break
+            stat = newer
+        if stat is not None and stat != self._last_stat:
+            self._last_stat = stat
+            try: self.on_change()
+            except Exception: pass
+
+    def run(self):
+        libc = _load_inotify()
+        fd = libc.inotify_init1(_IN_NONBLOCK) if libc else -1
+        watches = {}
+        if fd >= 0:
+            mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE | _IN_MODIFY
+            # The ledger's folder (data.xlsx itself, or the year folder appearing) ...
+            folder = os.path.dirname(self.path)
+            names = {os.path.basename(self.path).encode(), os.path.basename(shards.shard_dir(self.path)).encode()}
+            wd = libc.inotify_add_watch(fd, folder.encode(), mask)
+            if wd >= 0: watches[wd] = names
+            # ... and any per-year file of a ledger split by year
+            if shards.is_sharded(self.path):
+                wd = libc.inotify_add_watch(fd, shards.shard_dir(self.path).encode(), mask)
+                if wd >= 0: watches[wd] = None
+            if not watches:
+                os.close(fd)
+                fd = -1
+        try:
+            if fd >= 0: self._run_inotify(fd, watches)
+            else: self._run_polling()
+        finally:
+            if fd >= 0: os.close(fd)
+
+    def _run_polling(self):
+        while not self._stop_event.wait(Config.WATCH_INTERVAL):
+            if self._stat() != self._last_stat:
+                self._settle_and_notify()
+
+    def _run_inotify(self, fd, watches):
+        # watches: {watch descriptor: file names of interest, or None for any .xlsx}
+        while not self._stop_event.is_set():
+            ready, _, _ = select.select([fd], [], [], Config.WATCH_INTERVAL)
+            if not ready: continue
+            try: data = os.read(fd, 64 * 1024)
+            except BlockingIOError: continue
+            touched = False
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                names = watches.get(wd)
+                if (name in names) if names is not None else name.lower().endswith(b".xlsx"): touched = True
+                offset += length
+            if touched: self._settle_and_notify()
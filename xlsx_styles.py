@@ -0,0 +1,215 @@
+import os
+import time
+import argparse
+from collections import namedtuple
+import openpyxl
+from openpyxl.styles import NamedStyle, Font, Alignment, Border, Side, Protection
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.styles.fills import DEFAULT_EMPTY_FILL, DEFAULT_GRAY_FILL
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.styles.numbers import BUILTIN_FORMATS_MAX_SIZE
+from openpyxl.styles.named_styles import NamedStyleList
+from openpyxl.utils.indexed_list import IndexedList
+from config import Config
+import shards
+
+# --- LEDGER CELL STYLES ---
+# Cells written by the app take one of these named styles instead of a new
+# Font/Border/number format each, so a sheet only ever references a handful of
+# style records. compact() below rewrites existing ledgers the same way: style
+# tables rebuilt from what the cells actually use (duplicates merged, unused
+# records and named styles dropped) and formatted but empty rows/columns past
+# the data removed, since they make every load walk (and max_row count) them.
+
+DATE_FORMAT = "DD-MM-YYYY"
+AMOUNT_FORMAT = '"₹" #,##0'
+
+HEADER = "Ledger Header"        # Department title and column headings of an FY sheet
+TEXT = "Ledger Text"            # PPA number
+DATE = "Ledger Date"
+AMOUNT = "Ledger Amount"
+BOLD_HEADING = "Bold Heading"   # Limits: "1st allocation" / "Date_1" headings
+PLAIN_DATE = "Plain Date"      # Limits: allocation dates
+
+_THIN = Side(style="thin")
+_BOX = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+_CENTER = Alignment(horizontal="center", vertical="center")
+_BOLD = Font(bold=True)
+# name: (font, border, alignment, number format)
+_STYLES = {
+    HEADER: (_BOLD, _BOX, _CENTER, "General"),
+    TEXT: (DEFAULT_FONT, _BOX, Alignment(), "General"),
+    DATE: (DEFAULT_FONT, _BOX, Alignment(), DATE_FORMAT),
+    AMOUNT: (DEFAULT_FONT, _BOX, Alignment(), AMOUNT_FORMAT),
+    BOLD_HEADING: (_BOLD, DEFAULT_BORDER, Alignment(), "General"),
+    PLAIN_DATE: (DEFAULT_FONT, DEFAULT_BORDER, Alignment(), DATE_FORMAT),
+}
+
+
+def use_styles(wb):
+    """Registers the ledger's named styles in `wb` (once); cells then take them by name."""
+    have = set(wb.named_styles)
+    for name, (font, border, alignment, number_format) in _STYLES.items():
+        if name in have: continue
+        wb.add_named_style(NamedStyle(name, font=font, border=border, alignment=alignment,
+                                      number_format=number_format))
+
+
+# --- COMPACTION ---
+# compact_styles rewrites openpyxl's internal style tables directly (there is
+# no public API for it), so it only runs on the openpyxl series it was written
+# against (requirements.txt pins the exact version), and every compacted file
+# is read back and compared with the original before it replaces it.
+OPENPYXL_SERIES = "3.1."
+
+Compaction = namedtuple("Compaction", ["file", "size_before", "size_after", "load_before", "load_after",
+                                       "styles_before", "styles_after", "cells_trimmed"])
+
+
+def trim_sheet(ws):
+    """
+    Deletes the cells, row heights and column widths past the last row/column
+    holding a value (or a merged header). Returns the number of cells removed.
+    """
+    last_row = last_col = 0
+    for (r, c), cell in ws._cells.items():
+        if cell.value is not None:
+            last_row, last_col = max(last_row, r), max(last_col, c)
+    for rng in ws.merged_cells.ranges:
+        last_row, last_col = max(last_row, rng.max_row), max(last_col, rng.max_col)
+
+    extra = [key for key in ws._cells if key[0] > last_row or key[1] > last_col]
+    for key in extra: del ws._cells[key]
+    for r in [r for r in ws.row_dimensions if r > last_row]: del ws.row_dimensions[r]
+    for letter in [k for k, dim in ws.column_dimensions.items() if (dim.min or 0) > last_col]:
+        del ws.column_dimensions[letter]
+    return len(extra)
+
+
+def _styled_objects(wb):
+    """Everything holding a StyleArray: cells, row and column formats."""
+    for ws in wb.worksheets:
+        yield from ws._cells.values()
+        yield from ws.row_dimensions.values()
+        yield from ws.column_dimensions.values()
+
+
+def compact_styles(wb):
+    """
+    Rebuilds the style tables of `wb` (fonts, fills, borders, number formats,
+    alignments, protections, cell and named styles) from the records its cells
+    and rows/columns use, merging duplicates. Cells look the same afterwards;
+    those matching one of the ledger styles are switched to it.
+    """
+    used = {}
+    for obj in _styled_objects(wb):
+        if obj._style: used.setdefault(tuple(obj._style), None)
+
+    fonts = IndexedList([DEFAULT_FONT])
+    fills = IndexedList([DEFAULT_EMPTY_FILL, DEFAULT_GRAY_FILL])
+    borders = IndexedList([DEFAULT_BORDER])
+    alignments = IndexedList([Alignment()])
+    protections = IndexedList([Protection()])
+    number_formats = IndexedList()
+
+    # Named styles: Normal (index 0) plus those still referenced
+    named_ids = sorted({0} | {key[8] for key in used})
+    old_named = wb._named_styles
+    named = NamedStyleList([old_named[i] for i in named_ids if i < len(old_named)])
+    named_map = {old: new for new, old in enumerate(named_ids)}
+
+    def number_format(fmt_id):
+        if fmt_id < BUILTIN_FORMATS_MAX_SIZE: return fmt_id
+        return number_formats.add(wb._number_formats[fmt_id - BUILTIN_FORMATS_MAX_SIZE]) + BUILTIN_FORMATS_MAX_SIZE
+
+    for key in used:
+        font, fill, border, fmt, protection, alignment, pivot, quote, xf = key
+        used[key] = StyleArray([fonts.add(wb._fonts[font]), fills.add(wb._fills[fill]),
+                                borders.add(wb._borders[border]), number_format(fmt),
+                                protections.add(wb._protections[protection]),
+                                alignments.add(wb._alignments[alignment]), pivot, quote, named_map.get(xf, 0)])
+
+    wb._fonts, wb._fills, wb._borders = fonts, fills, borders
+    wb._alignments, wb._protections, wb._number_formats = alignments, protections, number_formats
+    wb._named_styles = named
+    for style in named: style.bind(wb)      # Re-adds each named style's records to the new tables
+
+    # Cells formatted by hand (or by older versions) exactly like a ledger style take that style
+    use_styles(wb)
+    looks = {tuple(style._style)[:6]: style._style.xfId for style in wb._named_styles if style.name in _STYLES}
+    for array in used.values():
+        if array.xfId == 0 and tuple(array)[:6] in looks: array.xfId = looks[tuple(array)[:6]]
+    wb._cell_styles = IndexedList([StyleArray()])
+    for obj in _styled_objects(wb):
+        if obj._style: obj._style = StyleArray(used[tuple(obj._style)])
+
+
+def _contents(wb):
+    """{sheet: (values and number formats of every non-empty cell, merged ranges)} of `wb`."""
+    contents = {}
+    for ws in wb.worksheets:
+        cells = {key: (cell.value, cell.number_format) for key, cell in ws._cells.items() if cell.value is not None}
+        contents[ws.title] = (cells, sorted(str(rng) for rng in ws.merged_cells.ranges))
+    return contents
+
+
+def _load(path):
+    t = time.perf_counter()
+    wb = openpyxl.load_workbook(path)
+    return wb, time.perf_counter() - t
+
+
+def compact_file(path):
+    """Compacts one workbook in place (written to a temp file, then swapped in). Returns a Compaction."""
+    size_before = os.path.getsize(path)
+    wb, load_before = _load(path)
+    styles_before = len(wb._cell_styles)
+    before = _contents(wb)
+    trimmed = sum(trim_sheet(ws) for ws in wb.worksheets)
+    compact_styles(wb)
+    tmp = path + ".compact.tmp"
+    try:
+        wb.save(tmp)
+        with open(tmp, "rb") as f: check = openpyxl.load_workbook(f)     # By handle: the name is not .xlsx
+        same = _contents(check) == before
+        if not same: raise ValueError("compacted copy does not match the original; file left unchanged")
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
+    styles_after = len(wb._cell_styles)     # Filled in by the save
+    wb.close()
+    _, load_after = _load(path)
+    return Compaction(path, size_before, os.path.getsize(path), load_before, load_after,
+                      styles_before, styles_after, trimmed)
+
+
+def compact(db_path=None):
+    """
+    Compacts every file of the ledger (data.xlsx and any per-year files).
+    Returns (ok, message, [Compaction]). Close the app and Excel first.
+    """
+    db_path = db_path or Config.DB_FILENAME
+    results = []
+    if not openpyxl.__version__.startswith(OPENPYXL_SERIES):
+        return False, f"Error: compaction needs openpyxl {OPENPYXL_SERIES}x (installed: {openpyxl.__version__}).", results
+    for path in shards.ledger_files(db_path):
+        try: results.append(compact_file(path))
+        except PermissionError: return False, f"Error: {os.path.basename(path)} is open.", results
+        except Exception as e: return False, f"Error: {os.path.basename(path)}: {e}", results
+    saved = sum(r.size_before - r.size_after for r in results)
+    return True, f"Compacted {len(results)} file(s), {saved / 1024:.0f} KB smaller.", results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge duplicate cell styles and trim empty formatted cells.")
+    parser.add_argument("--db", default=Config.DB_FILENAME, help="Ledger workbook")
+    args = parser.parse_args()
+
+    ok, msg, results = compact(args.db)
+    for r in results:
+        print(f"{os.path.basename(r.file)}: size {r.size_before / 1024:.0f} -> {r.size_after / 1024:.0f} KB, "
+              f"load {r.load_before:.2f} -> {r.load_after:.2f} s, cell styles {r.styles_before} -> {r.styles_after}, "
+              f"{r.cells_trimmed} empty cells removed")
+    print(msg)
+    raise SystemExit(0 if ok else 2)